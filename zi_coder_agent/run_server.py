@@ -1,5 +1,33 @@
-from zi_coder_agent.api_server import create_app
+import argparse
+
+from zi_coder_agent.api_server import create_app, run_production
+from zi_coder_agent.api_server.serving import (
+    DEFAULT_HOST,
+    DEFAULT_PORT,
+    DEFAULT_THREADS,
+    DEFAULT_TIMEOUT,
+    DEFAULT_WORKERS,
+)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the Zi Coder Agent API server.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Number of worker processes (production mode)")
+    parser.add_argument("--threads", type=int, default=DEFAULT_THREADS,
+                        help="Number of request threads per worker (production mode)")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT,
+                        help="Seconds a request may run before its worker is recycled")
+    parser.add_argument("--dev", action="store_true",
+                        help="Run Flask's development server with debugging enabled")
+    return parser.parse_args()
 
 if __name__ == "__main__":
+    args = parse_args()
     app = create_app()
-    app.run(debug=True, host="0.0.0.0", port=5000)
+    if args.dev:
+        app.run(debug=True, host=args.host, port=args.port, threaded=True)
+    else:
+        run_production(app, host=args.host, port=args.port, workers=args.workers,
+                       threads=args.threads, timeout=args.timeout)
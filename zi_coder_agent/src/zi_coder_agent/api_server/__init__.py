@@ -5,14 +5,45 @@ This module implements API endpoints using Flask to interact with all other comp
 It is designed with future extensibility in mind, following SOLID principles.
 """
 
-from flask import Flask, jsonify, request
+import json
+import logging
+import os
+import queue
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_swagger_ui import get_swaggerui_blueprint
 from typing import Optional
-from ..model_management import ModelMarketplace
-from ..mcp_server_management import MCPServerMarketplace
-from ..cache_management import CacheToolMarketplace
-from ..worker_management import QueueToolMarketplace
+from ..model_management import (
+    ModelMarketplace, CircuitOpenError, ModelBusyError, ContextOverflowError,
+    MODEL_BATCH_MAX_SIZE, MODEL_BATCH_WINDOW, MODEL_CACHE_TTL, MODEL_ROUTING_STRATEGY,
+    MODEL_SEMANTIC_CACHE_TTL
+)
+from ..mcp_server_management import MCPServerMarketplace, MCP_RESULT_CACHE_STORE
+from ..cache_management import (
+    CacheToolMarketplace, InMemoryCacheDriver, CACHE_NEAR_TTL, CACHE_NEAR_MAX_ENTRIES,
+    CACHE_NEAR_MAX_BYTES, CACHE_CODEC, CACHE_COMPRESS_THRESHOLD, CACHE_COMPRESSION_LEVEL
+)
+from ..worker_management import (
+    QueueToolMarketplace, QueueFullError, LocalWorkerDriver, LocalResultBackend, ResultHandle,
+    is_terminal_status, WORKER_RESULT_STORE
+)
 from ..database import DatabaseManager, get_db
+from .serving import create_asgi_app, run_production
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of keys accepted by a bulk cache request
+CACHE_BULK_MAX_KEYS = int(os.environ.get('CACHE_BULK_MAX_KEYS', '1000'))
+
+# Maximum number of tasks accepted by a bulk queue request
+QUEUE_BULK_MAX_TASKS = int(os.environ.get('QUEUE_BULK_MAX_TASKS', '1000'))
+
+# Longest time a task wait request is held open, and the keepalive interval of task event streams
+QUEUE_WAIT_MAX_TIMEOUT = float(os.environ.get('QUEUE_WAIT_MAX_TIMEOUT', '60'))
+QUEUE_EVENTS_KEEPALIVE = float(os.environ.get('QUEUE_EVENTS_KEEPALIVE', '15'))
+
+# Maximum number of tool calls accepted by a batch MCP request
+MCP_BATCH_MAX_CALLS = int(os.environ.get('MCP_BATCH_MAX_CALLS', '100'))
 
 def create_app() -> Flask:
     """
@@ -23,12 +54,40 @@ def create_app() -> Flask:
     """
     app = Flask(__name__)
     
+    if WORKER_RESULT_STORE == 'cache' and CACHE_CODEC == 'raw':
+        raise ValueError(
+            "WORKER_RESULT_STORE=cache needs a CACHE_CODEC that stores dicts, not 'raw'"
+        )
+    
     # Initialize system components
     model_marketplace = ModelMarketplace()
     mcp_marketplace = MCPServerMarketplace()
     cache_marketplace = CacheToolMarketplace()
     queue_marketplace = QueueToolMarketplace()
     db_manager = DatabaseManager()
+    cache_marketplace.register_driver('memory', InMemoryCacheDriver)
+    if WORKER_RESULT_STORE == 'cache':
+        queue_marketplace.register_driver('local', lambda: LocalWorkerDriver(
+            result_backend=LocalResultBackend(cache=cache_marketplace)
+        ))
+    else:
+        queue_marketplace.register_driver('local', LocalWorkerDriver)
+    queue_marketplace.set_active_driver(os.environ.get('QUEUE_DRIVER', 'local'))
+    cache_marketplace.set_active_driver(os.environ.get('CACHE_DRIVER', 'memory'))
+    if MCP_RESULT_CACHE_STORE == 'cache':
+        mcp_marketplace.enable_result_cache(cache_marketplace)
+    if CACHE_CODEC:
+        cache_marketplace.enable_serialization(CACHE_CODEC, CACHE_COMPRESS_THRESHOLD,
+                                               CACHE_COMPRESSION_LEVEL)
+    if CACHE_NEAR_TTL > 0:
+        cache_marketplace.enable_near_cache(CACHE_NEAR_TTL, CACHE_NEAR_MAX_ENTRIES,
+                                            CACHE_NEAR_MAX_BYTES)
+    if MODEL_BATCH_MAX_SIZE > 1:
+        model_marketplace.enable_batching(MODEL_BATCH_MAX_SIZE, MODEL_BATCH_WINDOW)
+    if MODEL_CACHE_TTL > 0:
+        model_marketplace.enable_response_cache(cache_marketplace, MODEL_CACHE_TTL)
+    if MODEL_SEMANTIC_CACHE_TTL > 0:
+        model_marketplace.enable_semantic_cache(ttl=MODEL_SEMANTIC_CACHE_TTL)
     
     # Swagger UI setup
     SWAGGER_URL = '/swagger'
@@ -42,18 +101,21 @@ def create_app() -> Flask:
     )
     app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
     
-    # Connect to database on startup
+    # Connect to database and create the schema once per process
+    if not db_manager.initialize():
+        logger.warning("Database is not ready; initialization is retried on the next request")
+    app.extensions['db_manager'] = db_manager
+    
     @app.before_request
-    def initialize_system():
-        """Initialize system components before the first request."""
-        db_manager.connect()
-        db_manager.create_all()
+    def ensure_database():
+        """Retry a failed database initialization; a no-op once it succeeded."""
+        db_manager.initialize()
     
-    # Close database connection on shutdown
+    # Return the request's pooled connection when the application context is torn down
     @app.teardown_appcontext
-    def shutdown_system(exception=None):
-        """Shutdown system components when the application context is torn down."""
-        db_manager.disconnect()
+    def release_db_session(exception=None):
+        """Release the scoped database session at the end of each request."""
+        db_manager.remove_session()
     
     # API Endpoints for Model Management
     @app.route('/api/models/register', methods=['POST'])
@@ -86,17 +148,164 @@ def create_app() -> Flask:
     
     @app.route('/api/models/query', methods=['POST'])
     def query_model():
-        """Send a query to the active model driver."""
+        """Send a query to the requested or active model driver or group."""
         data = request.get_json()
         input_data = data.get('input')
         if not input_data:
             return jsonify({'error': 'Missing input data'}), 400
+        model = data.get('model')
+        
+        if data.get('stream'):
+            try:
+                chunks = model_marketplace.stream(input_data, model=model)
+            except (CircuitOpenError, ModelBusyError) as e:
+                return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
+            if chunks is None:
+                return jsonify({'error': 'No active model driver or query failed'}), 400
+            return Response(stream_with_context(_sse_events(chunks)),
+                            mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
         
-        result = model_marketplace.query(input_data)
+        try:
+            result = model_marketplace.query(input_data, model=model)
+        except (CircuitOpenError, ModelBusyError) as e:
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
+        except TimeoutError as e:
+            return jsonify({'error': str(e)}), 504
         if result is not None:
             return jsonify({'result': result}), 200
         return jsonify({'error': 'No active model driver or query failed'}), 400
     
+    @app.route('/api/models/contexts', methods=['POST'])
+    def create_model_context():
+        """Open a context handle kept on the server across model queries."""
+        data = request.get_json() or {}
+        try:
+            context = model_marketplace.create_context(data.get('model'), data.get('deltas'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if context is not None:
+            return jsonify({'context': context}), 201
+        return jsonify({'error': 'No active model driver or no such model'}), 400
+    
+    @app.route('/api/models/contexts/<string:handle>', methods=['GET'])
+    def get_model_context(handle):
+        """Describe a context handle."""
+        context = model_marketplace.get_context(handle)
+        if context is not None:
+            return jsonify({'context': context}), 200
+        return jsonify({'error': f'Context {handle} not found'}), 404
+    
+    @app.route('/api/models/contexts/<string:handle>', methods=['PATCH'])
+    def update_model_context(handle):
+        """Apply deltas to a context handle."""
+        data = request.get_json() or {}
+        if 'deltas' not in data:
+            return jsonify({'error': 'Missing deltas'}), 400
+        try:
+            context = model_marketplace.update_context(handle, data['deltas'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if context is not None:
+            return jsonify({'context': context}), 200
+        return jsonify({'error': f'Context {handle} not found'}), 404
+    
+    @app.route('/api/models/contexts/<string:handle>', methods=['DELETE'])
+    def delete_model_context(handle):
+        """Close a context handle."""
+        if model_marketplace.delete_context(handle):
+            return jsonify({'message': f'Context {handle} deleted'}), 200
+        return jsonify({'error': f'Context {handle} not found'}), 404
+    
+    @app.route('/api/models/contexts/<string:handle>/query', methods=['POST'])
+    def query_model_context(handle):
+        """Apply deltas to a context handle and query its model with the assembled prompt."""
+        data = request.get_json() or {}
+        if model_marketplace.get_context(handle) is None:
+            return jsonify({'error': f'Context {handle} not found'}), 404
+        try:
+            result = model_marketplace.query_context(handle, data.get('deltas'),
+                                                     data.get('record_response', True))
+        except ContextOverflowError as e:
+            return jsonify({'error': str(e)}), 413
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except (CircuitOpenError, ModelBusyError) as e:
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
+        except TimeoutError as e:
+            return jsonify({'error': str(e)}), 504
+        if result is not None:
+            return jsonify(result), 200
+        return jsonify({'error': 'No active model driver or query failed'}), 400
+    
+    @app.route('/api/models/groups', methods=['POST'])
+    def register_model_group():
+        """Register a group of model drivers that share its queries."""
+        data = request.get_json()
+        name = data.get('name')
+        members = data.get('members')
+        if not name or not isinstance(members, list):
+            return jsonify({'error': 'Missing name or members'}), 400
+        try:
+            model_marketplace.register_group(name, members, data.get('weights'),
+                                             data.get('strategy', MODEL_ROUTING_STRATEGY))
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({'message': f'Model group {name} registered'}), 200
+    
+    @app.route('/api/models/routing', methods=['GET'])
+    def get_model_routing_stats():
+        """Get the model groups and the load of each model driver."""
+        return jsonify({'routing': model_marketplace.get_routing_stats()}), 200
+    
+    @app.route('/api/models/health', methods=['GET'])
+    def get_model_health():
+        """Get the limits, load and circuit breaker state of every model driver."""
+        return jsonify({'drivers': model_marketplace.get_driver_health()}), 200
+    
+    @app.route('/api/models/limits/<string:name>', methods=['PUT'])
+    def configure_model_limits(name):
+        """Set the concurrency limit, deadline and circuit breaker of a model driver."""
+        data = request.get_json()
+        try:
+            options = {
+                key: cast(data[key]) for key, cast in (
+                    ('max_concurrency', int), ('timeout', float),
+                    ('failure_threshold', int), ('reset_timeout', float),
+                    ('token_budget', int)
+                ) if data.get(key) is not None
+            }
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid limits'}), 400
+        if any(value < 0 for value in options.values()):
+            return jsonify({'error': 'Limits must not be negative'}), 400
+        if model_marketplace.configure_driver_limits(name, **options):
+            return jsonify({'message': f'Limits of model driver {name} set'}), 200
+        return jsonify({'error': f'Driver {name} not found'}), 404
+    
+    @app.route('/api/models/breakers/<string:name>/reset', methods=['POST'])
+    def reset_model_breaker(name):
+        """Close the circuit breaker of a model driver."""
+        if model_marketplace.reset_circuit_breaker(name):
+            return jsonify({'message': f'Circuit breaker of model driver {name} reset'}), 200
+        return jsonify({'error': f'Driver {name} not found'}), 404
+    
+    @app.route('/api/models/cache/stats', methods=['GET'])
+    def get_model_cache_stats():
+        """Get hit and miss statistics of the model response cache."""
+        stats = model_marketplace.get_cache_stats()
+        if stats is not None:
+            return jsonify({'stats': stats}), 200
+        return jsonify({'error': 'Model response cache is disabled'}), 404
+    
+    @app.route('/api/models/semantic_cache/stats', methods=['GET'])
+    def get_model_semantic_cache_stats():
+        """Get hit and miss statistics of the model semantic cache."""
+        stats = model_marketplace.get_semantic_cache_stats()
+        if stats is not None:
+            return jsonify({'stats': stats}), 200
+        return jsonify({'error': 'Model semantic cache is disabled'}), 404
+    
     # API Endpoints for MCP Server Management
     @app.route('/api/mcp_servers/register', methods=['POST'])
     def register_mcp_server_driver():
@@ -122,29 +331,113 @@ def create_app() -> Flask:
     @app.route('/api/mcp_servers/tools', methods=['GET'])
     def get_mcp_tools():
         """Get available tools from the active MCP server."""
-        tools = mcp_marketplace.get_tools()
+        tools = mcp_marketplace.get_tools(refresh=_refresh_requested())
         if tools is not None:
             return jsonify({'tools': tools}), 200
         return jsonify({'error': 'No active MCP server driver'}), 400
     
+    @app.route('/api/mcp_servers/tools/<string:tool_name>', methods=['GET'])
+    def get_mcp_tool(tool_name):
+        """Get the definition of a tool from the MCP server that provides it."""
+        tool = mcp_marketplace.get_tool(tool_name, server=request.args.get('server'))
+        if tool is not None:
+            return jsonify({'tool': tool}), 200
+        return jsonify({'error': f'Tool {tool_name} not found'}), 404
+    
     @app.route('/api/mcp_servers/resources', methods=['GET'])
     def get_mcp_resources():
         """Get available resources from the active MCP server."""
-        resources = mcp_marketplace.get_resources()
+        resources = mcp_marketplace.get_resources(refresh=_refresh_requested())
         if resources is not None:
             return jsonify({'resources': resources}), 200
         return jsonify({'error': 'No active MCP server driver'}), 400
     
     @app.route('/api/mcp_servers/tool/<string:tool_name>', methods=['POST'])
     def use_mcp_tool(tool_name):
-        """Use a specific tool from the active MCP server."""
+        """Use a specific tool, routed to the MCP server that provides it."""
         data = request.get_json()
         arguments = data.get('arguments', {})
-        result = mcp_marketplace.use_tool(tool_name, arguments)
+        result = mcp_marketplace.use_tool(tool_name, arguments, server=data.get('server'))
         if result is not None:
             return jsonify({'result': result}), 200
         return jsonify({'error': 'No active MCP server driver or tool execution failed'}), 400
     
+    @app.route('/api/mcp_servers/tool_batch', methods=['POST'])
+    def use_mcp_tools():
+        """Run several tool calls concurrently, optionally streaming each outcome."""
+        data = request.get_json()
+        calls = data.get('calls')
+        if not isinstance(calls, list) or not calls:
+            return jsonify({'error': 'Missing calls'}), 400
+        if len(calls) > MCP_BATCH_MAX_CALLS:
+            return jsonify({'error': f'At most {MCP_BATCH_MAX_CALLS} calls per request'}), 400
+        if not all(isinstance(call, dict) and call.get('tool_name') for call in calls):
+            return jsonify({'error': 'Every call needs a tool_name'}), 400
+        
+        options = {}
+        try:
+            if data.get('max_concurrency') is not None:
+                options['max_concurrency'] = int(data['max_concurrency'])
+            if 'timeout' in data:
+                options['timeout'] = None if data['timeout'] is None else float(data['timeout'])
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid max_concurrency or timeout'}), 400
+        
+        if data.get('stream', False):
+            outcomes = mcp_marketplace.iter_tool_results(calls, **options)
+            return Response(stream_with_context(_tool_batch_events(outcomes)),
+                            mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        return jsonify({'results': mcp_marketplace.use_tools(calls, **options)}), 200
+    
+    @app.route('/api/mcp_servers/connect_all', methods=['POST'])
+    def connect_all_mcp_servers():
+        """Connect to every registered MCP server."""
+        return jsonify({'servers': mcp_marketplace.connect_all()}), 200
+    
+    @app.route('/api/mcp_servers/sessions', methods=['GET'])
+    def get_mcp_sessions():
+        """Get the state of the session pool of every registered MCP server."""
+        return jsonify({'servers': mcp_marketplace.get_session_status()}), 200
+    
+    @app.route('/api/mcp_servers/tool_index', methods=['GET'])
+    def get_mcp_tool_index():
+        """Get the servers providing each tool across all registered MCP servers."""
+        index = mcp_marketplace.get_tool_index(refresh=_refresh_requested())
+        return jsonify({'tools': index.to_dict()}), 200
+    
+    @app.route('/api/mcp_servers/catalog/invalidate', methods=['POST'])
+    def invalidate_mcp_catalogs():
+        """Drop cached MCP tool and resource catalogs."""
+        data = request.get_json(silent=True) or {}
+        mcp_marketplace.invalidate_catalogs(data.get('server'), data.get('kind'))
+        return jsonify({'message': 'MCP catalogs invalidated'}), 200
+    
+    @app.route('/api/mcp_servers/result_cache', methods=['GET'])
+    def get_mcp_result_cache_stats():
+        """Get statistics and rules of the MCP result cache."""
+        return jsonify({'stats': mcp_marketplace.get_result_cache_stats()}), 200
+    
+    @app.route('/api/mcp_servers/result_cache/rules/<string:tool_name>', methods=['PUT'])
+    def set_mcp_tool_cache_rule(tool_name):
+        """Set how long the results of a tool are cached."""
+        data = request.get_json()
+        try:
+            ttl = float(data['ttl'])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({'error': 'Missing or invalid ttl'}), 400
+        if ttl < 0:
+            return jsonify({'error': 'ttl must not be negative'}), 400
+        mcp_marketplace.set_tool_cache_rule(tool_name, ttl, data.get('server'))
+        return jsonify({'message': f'Cache rule for tool {tool_name} set'}), 200
+    
+    @app.route('/api/mcp_servers/result_cache/invalidate', methods=['POST'])
+    def invalidate_mcp_results():
+        """Drop cached MCP tool results and resource contents."""
+        data = request.get_json(silent=True) or {}
+        mcp_marketplace.invalidate_results(data.get('server'))
+        return jsonify({'message': 'MCP results invalidated'}), 200
+    
     # API Endpoints for Cache Management
     @app.route('/api/cache/register', methods=['POST'])
     def register_cache_driver():
@@ -189,6 +482,59 @@ def create_app() -> Flask:
             return jsonify({'value': value}), 200
         return jsonify({'error': 'Key not found or no active cache driver'}), 404
     
+    @app.route('/api/cache/bulk/get', methods=['POST'])
+    def get_cache_values():
+        """Get several values from the cache."""
+        data = request.get_json()
+        keys = data.get('keys')
+        if not isinstance(keys, list) or not keys:
+            return jsonify({'error': 'Missing keys'}), 400
+        if not all(isinstance(key, str) for key in keys):
+            return jsonify({'error': 'Keys must be strings'}), 400
+        if len(keys) > CACHE_BULK_MAX_KEYS:
+            return jsonify({'error': f'At most {CACHE_BULK_MAX_KEYS} keys per request'}), 400
+        
+        values = cache_marketplace.get_many(keys)
+        missing = [key for key in keys if key not in values]
+        return jsonify({'values': values, 'missing': missing}), 200
+    
+    @app.route('/api/cache/bulk/set', methods=['POST'])
+    def set_cache_values():
+        """Set several values in the cache."""
+        data = request.get_json()
+        items = data.get('items')
+        ttl = data.get('ttl')
+        if not isinstance(items, dict) or not items:
+            return jsonify({'error': 'Missing items'}), 400
+        if len(items) > CACHE_BULK_MAX_KEYS:
+            return jsonify({'error': f'At most {CACHE_BULK_MAX_KEYS} keys per request'}), 400
+        
+        if cache_marketplace.set_many(items, ttl):
+            return jsonify({'message': f'Cache values set for {len(items)} keys'}), 200
+        return jsonify({'error': 'No active cache driver or set operation failed'}), 400
+    
+    @app.route('/api/cache/bulk/delete', methods=['POST'])
+    def delete_cache_values():
+        """Delete several values from the cache."""
+        data = request.get_json()
+        keys = data.get('keys')
+        if not isinstance(keys, list) or not keys:
+            return jsonify({'error': 'Missing keys'}), 400
+        if not all(isinstance(key, str) for key in keys):
+            return jsonify({'error': 'Keys must be strings'}), 400
+        if len(keys) > CACHE_BULK_MAX_KEYS:
+            return jsonify({'error': f'At most {CACHE_BULK_MAX_KEYS} keys per request'}), 400
+        
+        return jsonify({'deleted': cache_marketplace.delete_many(keys)}), 200
+    
+    @app.route('/api/cache/stats', methods=['GET'])
+    def get_cache_stats():
+        """Get statistics from the active cache driver."""
+        stats = cache_marketplace.get_stats()
+        if stats is not None:
+            return jsonify({'stats': stats}), 200
+        return jsonify({'error': 'No active cache driver or statistics not supported'}), 404
+    
     # API Endpoints for Worker Management
     @app.route('/api/queue/register', methods=['POST'])
     def register_queue_driver():
@@ -218,10 +564,23 @@ def create_app() -> Flask:
         task_name = data.get('task_name')
         args = data.get('args', [])
         kwargs = data.get('kwargs', {})
+        priority = data.get('priority')
+        idempotency_key = data.get('idempotency_key') or request.headers.get('Idempotency-Key')
+        deduplicate = bool(data.get('deduplicate', False))
         if not task_name:
             return jsonify({'error': 'Missing task_name'}), 400
+        error = _task_options_error(data)
+        if error:
+            return jsonify({'error': error}), 400
         
-        task_id = queue_marketplace.enqueue_task(task_name, args, kwargs)
+        try:
+            task_id = queue_marketplace.enqueue_task(task_name, args, kwargs, priority=priority,
+                                                     idempotency_key=idempotency_key,
+                                                     deduplicate=deduplicate)
+        except QueueFullError as e:
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         if task_id:
             return jsonify({'task_id': task_id}), 200
         return jsonify({'error': 'No active queue driver or enqueue failed'}), 400
@@ -234,8 +593,256 @@ def create_app() -> Flask:
             return jsonify({'status': status}), 200
         return jsonify({'error': 'Task not found or no active queue driver'}), 404
     
+    @app.route('/api/queue/bulk/enqueue', methods=['POST'])
+    def enqueue_tasks():
+        """Enqueue several tasks in one request."""
+        data = request.get_json()
+        tasks = data.get('tasks')
+        if not isinstance(tasks, list) or not tasks:
+            return jsonify({'error': 'Missing tasks'}), 400
+        if len(tasks) > QUEUE_BULK_MAX_TASKS:
+            return jsonify({'error': f'At most {QUEUE_BULK_MAX_TASKS} tasks per request'}), 400
+        if not all(isinstance(task, dict) and task.get('task_name') for task in tasks):
+            return jsonify({'error': 'Every task needs a task_name'}), 400
+        error = next(filter(None, map(_task_options_error, tasks)), None)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        try:
+            task_ids = queue_marketplace.enqueue_many(tasks)
+        except QueueFullError as e:
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if task_ids is not None:
+            return jsonify({'task_ids': task_ids}), 200
+        return jsonify({'error': 'No active queue driver or enqueue failed'}), 400
+    
+    @app.route('/api/queue/bulk/status', methods=['POST'])
+    def get_tasks_status():
+        """Get the status of several tasks in one request."""
+        data = request.get_json()
+        task_ids = data.get('task_ids')
+        if not isinstance(task_ids, list) or not task_ids:
+            return jsonify({'error': 'Missing task_ids'}), 400
+        if len(task_ids) > QUEUE_BULK_MAX_TASKS:
+            return jsonify({'error': f'At most {QUEUE_BULK_MAX_TASKS} tasks per request'}), 400
+        
+        statuses = queue_marketplace.get_status_many(task_ids)
+        missing = [task_id for task_id in task_ids if task_id not in statuses]
+        return jsonify({'statuses': statuses, 'missing': missing}), 200
+    
+    @app.route('/api/queue/result/<string:task_id>', methods=['GET'])
+    def get_task_result(task_id):
+        """Get the result of a completed task."""
+        result = queue_marketplace.get_task_result(task_id)
+        if isinstance(result, ResultHandle):
+            mimetype = 'text/plain' if result.encoding else 'application/octet-stream'
+            return Response(result.iter_chunks(), mimetype=mimetype,
+                            headers={'Content-Length': str(result.size)})
+        if result is not None:
+            return jsonify({'result': result}), 200
+        return jsonify({'error': 'Result not available or no active queue driver'}), 404
+    
+    @app.route('/api/queue/wait/<string:task_id>', methods=['GET'])
+    def wait_for_task(task_id):
+        """Wait until a task finishes or the timeout expires, then return its status."""
+        timeout = min(request.args.get('timeout', 30, type=float), QUEUE_WAIT_MAX_TIMEOUT)
+        status = queue_marketplace.get_task_status(task_id)
+        if status is None:
+            return jsonify({'error': 'Task not found or no active queue driver'}), 404
+        
+        if not is_terminal_status(status):
+            future = queue_marketplace.get_task_future(task_id)
+            try:
+                status = future.result(timeout=timeout)
+            except FutureTimeoutError:
+                future.cancel()
+                return jsonify({'status': queue_marketplace.get_task_status(task_id),
+                                'done': False}), 200
+        return jsonify({'status': status, 'done': True,
+                        'result': _result_payload(queue_marketplace, task_id)}), 200
+    
+    @app.route('/api/queue/events/<string:task_id>', methods=['GET'])
+    def stream_task_events(task_id):
+        """Stream the status changes of a task as server-sent events."""
+        status = queue_marketplace.get_task_status(task_id)
+        if status is None:
+            return jsonify({'error': 'Task not found or no active queue driver'}), 404
+        
+        updates = queue.Queue()
+        unsubscribe = queue_marketplace.subscribe(task_id, lambda _, update: updates.put(update))
+        return Response(
+            stream_with_context(
+                _task_events(queue_marketplace, task_id, status, updates, unsubscribe)
+            ),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        )
+    
+    @app.route('/api/queue/workflows', methods=['POST'])
+    def submit_workflow():
+        """Start a workflow of dependent tasks."""
+        data = request.get_json()
+        steps = data.get('steps')
+        if not isinstance(steps, dict) or not steps:
+            return jsonify({'error': 'Missing steps'}), 400
+        
+        try:
+            workflow_id = queue_marketplace.submit_workflow(steps)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if workflow_id:
+            return jsonify({'workflow_id': workflow_id}), 200
+        return jsonify({'error': 'No active queue driver'}), 400
+    
+    @app.route('/api/queue/workflows/<string:workflow_id>', methods=['GET'])
+    def get_workflow_status(workflow_id):
+        """Get the aggregate and per-step status of a workflow."""
+        status = queue_marketplace.get_workflow_status(workflow_id)
+        if status is not None:
+            return jsonify({'status': status}), 200
+        return jsonify({'error': 'Workflow not found'}), 404
+    
+    @app.route('/api/queue/workflows/<string:workflow_id>/results', methods=['GET'])
+    def get_workflow_results(workflow_id):
+        """Get the results of the completed steps of a workflow."""
+        results = queue_marketplace.get_workflow_results(workflow_id)
+        status = queue_marketplace.get_workflow_status(workflow_id)
+        if results is None or status is None:
+            return jsonify({'error': 'Workflow not found'}), 404
+        payload = {
+            name: _result_json(result, status['steps'][name]['task_id'])
+            for name, result in results.items()
+        }
+        return jsonify({'status': status['status'], 'results': payload}), 200
+    
     return app
 
+def _refresh_requested() -> bool:
+    """Check whether the request asks to bypass cached data with ?refresh=true."""
+    return request.args.get('refresh', 'false').lower() == 'true'
+
+def _task_options_error(task: dict) -> Optional[str]:
+    """
+    Check the types of a task's args, kwargs and priority.
+    
+    Args:
+        task: The task as sent by the client.
+        
+    Returns:
+        Optional[str]: Description of the first invalid option, or None if all are valid.
+    """
+    if not isinstance(task.get('args', []), list):
+        return 'args must be a list'
+    if not isinstance(task.get('kwargs', {}), dict):
+        return 'kwargs must be an object'
+    priority = task.get('priority')
+    if priority is not None and (not isinstance(priority, int) or isinstance(priority, bool)):
+        return 'priority must be an integer'
+    return None
+
+def _result_payload(queue_marketplace, task_id):
+    """
+    Get a task result for a JSON response.
+    
+    Results stored on disk are described by their handle together with the URL that
+    streams their content, instead of being loaded into memory.
+    
+    Args:
+        queue_marketplace: The marketplace the task was enqueued with.
+        task_id: The ID of the task.
+        
+    Returns:
+        Any: The task result, or a description of a result stored on disk.
+    """
+    return _result_json(queue_marketplace.get_task_result(task_id), task_id)
+
+def _result_json(result, task_id):
+    """Describe a result stored on disk by its handle and URL; other results are unchanged."""
+    if isinstance(result, ResultHandle):
+        return dict(result.to_dict(), url=f'/api/queue/result/{task_id}')
+    return result
+
+def _task_events(queue_marketplace, task_id, status, updates, unsubscribe):
+    """
+    Format the status changes of a task as server-sent events.
+    
+    Each distinct status is sent as a ``status`` event. When the task finishes, a final
+    ``done`` event carries its result. Comment lines keep idle connections open.
+    
+    Args:
+        queue_marketplace: The marketplace the task was enqueued with.
+        task_id: The ID of the task to report on.
+        status: The task status when the stream was opened.
+        updates: Queue receiving status changes from the task subscription.
+        unsubscribe: Function cancelling the task subscription.
+        
+    Yields:
+        str: Encoded server-sent events.
+    """
+    try:
+        last_sent = None
+        while True:
+            if status.get('status') != last_sent:
+                last_sent = status.get('status')
+                yield f"event: status\ndata: {json.dumps(status)}\n\n"
+            if is_terminal_status(status):
+                result = _result_payload(queue_marketplace, task_id)
+                yield f"event: done\ndata: {json.dumps({'result': result})}\n\n"
+                return
+            try:
+                status = updates.get(timeout=QUEUE_EVENTS_KEEPALIVE)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+    finally:
+        unsubscribe()
+
+def _tool_batch_events(outcomes):
+    """
+    Format the outcomes of batched tool calls as server-sent events.
+    
+    Each outcome is sent as a ``result`` event as soon as its call finishes, followed
+    by a final ``done`` event.
+    
+    Args:
+        outcomes: Iterator over tool call outcomes in completion order.
+        
+    Yields:
+        str: Encoded server-sent events.
+    """
+    count = 0
+    for outcome in outcomes:
+        count += 1
+        yield f"event: result\ndata: {json.dumps(outcome)}\n\n"
+    yield f"event: done\ndata: {json.dumps({'count': count})}\n\n"
+
+def _sse_events(chunks):
+    """
+    Format response chunks as server-sent events.
+    
+    Each chunk is sent as a ``data`` event, followed by a final ``done`` event, or an
+    ``error`` event if the driver fails part-way through the response.
+    
+    Args:
+        chunks: Iterator over response chunks.
+        
+    Yields:
+        str: Encoded server-sent events.
+    """
+    try:
+        for chunk in chunks:
+            yield f"data: {json.dumps({'chunk': chunk})}\n\n"
+    except Exception as e:
+        yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+        return
+    finally:
+        # A client disconnect closes this generator; pass it on to free the driver
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+    yield "event: done\ndata: {}\n\n"
+
 # Placeholder for dynamic driver import - to be implemented based on driver_path
 def import_driver(driver_path: str) -> Optional[type]:
     """
@@ -0,0 +1,153 @@
+"""
+API Server Serving Module
+
+This module provides production serving entry points for the Flask application.
+Requests are handled by a multi-threaded server so that long model and tool round trips
+only occupy one thread instead of stalling the whole process.
+
+The application keeps its state in process: the active drivers, the memory cache, the
+local task queue, MCP session pools and model context handles. Requests that depend on
+each other must reach the same process, so the server runs a single worker process by
+default and scales with threads.
+"""
+
+import logging
+import os
+from typing import Any, Callable, Optional
+
+from flask import Flask
+
+from ..database import engine
+
+DEFAULT_HOST = os.environ.get("ZI_SERVER_HOST", "0.0.0.0")
+DEFAULT_PORT = int(os.environ.get("ZI_SERVER_PORT", "5000"))
+DEFAULT_WORKERS = int(os.environ.get("ZI_SERVER_WORKERS", "1"))
+DEFAULT_THREADS = int(os.environ.get("ZI_SERVER_THREADS", "64"))
+DEFAULT_TIMEOUT = int(os.environ.get("ZI_SERVER_TIMEOUT", "300"))
+
+logger = logging.getLogger(__name__)
+
+def create_asgi_app(app_factory: Optional[Callable[[], Flask]] = None,
+                    threads: int = DEFAULT_THREADS) -> Any:
+    """
+    Create an ASGI application wrapping the Flask application.
+
+    The wrapped application can be served by an ASGI server such as uvicorn, e.g.
+    ``uvicorn --factory zi_coder_agent.api_server:create_asgi_app``. Blocking
+    handlers run concurrently on a pool of ``threads`` threads, so slow upstream calls
+    neither block the event loop nor wait for each other.
+
+    Args:
+        app_factory: Callable returning the Flask application. Defaults to create_app.
+        threads: Number of threads running requests.
+
+    Returns:
+        Any: ASGI application callable.
+
+    Raises:
+        RuntimeError: If the optional a2wsgi dependency is not installed.
+    """
+    try:
+        from a2wsgi import WSGIMiddleware
+    except ImportError as e:
+        raise RuntimeError(
+            "ASGI serving requires the 'a2wsgi' package; install zi-coder-agent[serve]"
+        ) from e
+    if app_factory is None:
+        from . import create_app
+        app_factory = create_app
+    return WSGIMiddleware(app_factory(), workers=threads)
+
+def _run_gunicorn(app: Flask, host: str, port: int, workers: int, threads: int,
+                  timeout: int) -> None:
+    """Serve the application with gunicorn's threaded workers."""
+    from gunicorn.app.base import BaseApplication
+
+    class _GunicornApplication(BaseApplication):
+        def __init__(self, application: Flask, options: dict):
+            self._application = application
+            self._options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self._options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self._application
+
+    def post_fork(server, worker):
+        # Connections opened by the parent before forking must not be shared by workers
+        engine.dispose(close=False)
+
+    options = {
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "threads": threads,
+        "worker_class": "gthread",
+        "timeout": timeout,
+        "keepalive": 5,
+        "post_fork": post_fork,
+    }
+    _GunicornApplication(app, options).run()
+
+def _run_waitress(app: Flask, host: str, port: int, threads: int, timeout: int) -> None:
+    """Serve the application with waitress, used where gunicorn is unavailable."""
+    from waitress import serve
+
+    serve(app, host=host, port=port, threads=threads, channel_timeout=timeout)
+
+def run_production(
+    app: Flask,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    workers: int = DEFAULT_WORKERS,
+    threads: int = DEFAULT_THREADS,
+    timeout: int = DEFAULT_TIMEOUT,
+) -> str:
+    """
+    Serve the application with a production WSGI server.
+
+    gunicorn is preferred and runs ``workers`` processes with ``threads`` threads each.
+    waitress is used as a fallback (e.g. on Windows) and runs a single process with
+    ``threads`` threads. Since every process keeps its own state, more than one worker
+    only suits deployments whose clients do not depend on state kept by an earlier
+    request, and a warning is logged.
+
+    Args:
+        app: The Flask application to serve.
+        host: Interface to bind to.
+        port: Port to bind to.
+        workers: Number of worker processes (gunicorn only).
+        threads: Number of request threads per worker.
+        timeout: Seconds a request may run before the worker is recycled.
+
+    Returns:
+        str: Name of the server that was used.
+
+    Raises:
+        RuntimeError: If no supported production server is installed.
+    """
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        if workers > 1:
+            logger.warning(
+                "Running %d worker processes; drivers, caches, queued tasks and contexts "
+                "are kept per process, so related requests may reach different workers",
+                workers
+            )
+        _run_gunicorn(app, host, port, workers, threads, timeout)
+        return "gunicorn"
+    try:
+        import waitress  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        _run_waitress(app, host, port, threads, timeout)
+        return "waitress"
+    raise RuntimeError(
+        "Production serving requires 'gunicorn' or 'waitress'; install zi-coder-agent[serve]"
+    )
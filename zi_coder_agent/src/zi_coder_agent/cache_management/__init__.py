@@ -5,8 +5,19 @@ This module provides a pluggable driver system for connecting to caching databas
 It is designed with extensibility in mind, following SOLID principles.
 """
 
+import logging
+import math
+import random
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Type, Optional, Any
+from typing import Callable, Dict, Iterable, Type, Optional, Any
+from .single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Marks values stored by get_or_compute together with their refresh metadata
+_ENVELOPE_MARKER = "__zi_cache_envelope__"
 
 class CacheDriver(ABC):
     """Abstract base class for cache drivers."""
@@ -71,6 +82,67 @@ class CacheDriver(ABC):
             bool: True if clear operation was successful, False otherwise.
         """
         pass
+    
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Retrieve several values from the cache.
+        
+        Drivers whose backend supports pipelined or multi-key reads should override
+        this. The default implementation calls get() for each key.
+        
+        Args:
+            keys: The keys of the cache entries to retrieve.
+            
+        Returns:
+            Dict[str, Any]: Values of the keys that were found.
+        """
+        values = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                values[key] = value
+        return values
+    
+    def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """
+        Set several values in the cache.
+        
+        Drivers whose backend supports pipelined or multi-key writes should override
+        this. The default implementation calls set() for each item.
+        
+        Args:
+            items: Mapping of keys to the values to store.
+            ttl: Time to live in seconds, if applicable, applied to every item.
+            
+        Returns:
+            bool: True if every set operation was successful, False otherwise.
+        """
+        results = [self.set(key, value, ttl) for key, value in items.items()]
+        return all(results)
+    
+    def delete_many(self, keys: Iterable[str]) -> int:
+        """
+        Delete several values from the cache.
+        
+        Drivers whose backend supports pipelined or multi-key deletes should override
+        this. The default implementation calls delete() for each key.
+        
+        Args:
+            keys: The keys of the cache entries to delete.
+            
+        Returns:
+            int: Number of entries that were deleted.
+        """
+        return sum(1 for key in keys if self.delete(key))
+    
+    def get_stats(self) -> Optional[dict]:
+        """
+        Get driver statistics such as hit, miss and eviction counters.
+        
+        Returns:
+            Optional[dict]: Driver statistics, or None if the driver does not track any.
+        """
+        return None
 
 class CacheToolMarketplace:
     """Manages multiple cache drivers for different caching systems."""
@@ -78,6 +150,10 @@ class CacheToolMarketplace:
     def __init__(self):
         self._drivers: Dict[str, CacheDriver] = {}
         self._active_driver: Optional[CacheDriver] = None
+        self._active_name: Optional[str] = None
+        self._near_cache_options: Optional[dict] = None
+        self._serializer = None
+        self._single_flight = SingleFlight()
     
     def register_driver(self, name: str, driver: Type[CacheDriver]) -> None:
         """
@@ -100,10 +176,75 @@ class CacheToolMarketplace:
             bool: True if driver was set successfully, False otherwise.
         """
         if name in self._drivers:
-            self._active_driver = self._drivers[name]
+            self._active_name = name
+            self._active_driver = self._build_active_driver()
             return True
         return False
     
+    def _build_active_driver(self) -> Optional[CacheDriver]:
+        """Wrap the active registered driver in the enabled serialization and near-cache layers."""
+        if self._active_name is None:
+            return None
+        driver = self._drivers[self._active_name]
+        if self._serializer is not None:
+            driver = SerializingCacheDriver(driver, self._serializer)
+        if self._near_cache_options is not None:
+            driver = TieredCacheDriver(driver, **self._near_cache_options)
+        return driver
+    
+    def enable_near_cache(self, local_ttl: float = 5, max_entries: int = 1024,
+                          max_bytes: int = 32 * 1024 * 1024) -> None:
+        """
+        Serve hot keys from a bounded in-process tier in front of the active driver.
+        
+        The near-cache applies to the active driver and to any driver activated later.
+        Deletes and clears through the marketplace invalidate the local tier.
+        
+        Args:
+            local_ttl: Maximum time to live of local entries in seconds.
+            max_entries: Maximum number of entries in the local tier.
+            max_bytes: Maximum estimated size of the local tier in bytes.
+        """
+        self._near_cache_options = {
+            "local_ttl": local_ttl, "max_entries": max_entries, "max_bytes": max_bytes
+        }
+        self._active_driver = self._build_active_driver()
+    
+    def disable_near_cache(self) -> None:
+        """
+        Send every cache operation straight to the active driver.
+        """
+        self._near_cache_options = None
+        self._active_driver = self._build_active_driver()
+    
+    def enable_serialization(self, codec: str = "json", compress_threshold: int = 1024,
+                             compression_level: int = 6) -> None:
+        """
+        Encode values with a codec, compressing large payloads, before they reach the driver.
+        
+        Serialization applies to the active driver and to any driver activated later.
+        When the near-cache is enabled, its local tier keeps decoded values.
+        
+        Args:
+            codec: Name of the codec, one of "json", "msgpack" or "raw". The raw codec
+                only stores str and bytes, so it cannot be used with get_or_compute.
+            compress_threshold: Payloads of at least this many bytes are compressed;
+                a negative value disables compression.
+            compression_level: zlib compression level from 1 (fastest) to 9 (smallest).
+            
+        Raises:
+            ValueError: If the codec is unknown.
+        """
+        self._serializer = Serializer(codec, compress_threshold, compression_level)
+        self._active_driver = self._build_active_driver()
+    
+    def disable_serialization(self) -> None:
+        """
+        Pass values to the active driver without encoding them.
+        """
+        self._serializer = None
+        self._active_driver = self._build_active_driver()
+    
     def connect(self) -> bool:
         """
         Connect to the active cache driver.
@@ -180,3 +321,159 @@ class CacheToolMarketplace:
         if self._active_driver:
             return self._active_driver.clear()
         return False
+    
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Retrieve several values from the active cache driver.
+        
+        Args:
+            keys: The keys of the cache entries to retrieve.
+            
+        Returns:
+            Dict[str, Any]: Values of the keys that were found, empty if no active driver.
+        """
+        if self._active_driver:
+            return self._active_driver.get_many(keys)
+        return {}
+    
+    def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """
+        Set several values in the active cache driver.
+        
+        Args:
+            items: Mapping of keys to the values to store.
+            ttl: Time to live in seconds, if applicable, applied to every item.
+            
+        Returns:
+            bool: True if every set operation was successful, False otherwise.
+        """
+        if self._active_driver:
+            return self._active_driver.set_many(items, ttl)
+        return False
+    
+    def delete_many(self, keys: Iterable[str]) -> int:
+        """
+        Delete several values from the active cache driver.
+        
+        Args:
+            keys: The keys of the cache entries to delete.
+            
+        Returns:
+            int: Number of entries that were deleted, 0 if no active driver.
+        """
+        if self._active_driver:
+            return self._active_driver.delete_many(keys)
+        return 0
+    
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: Optional[int] = None,
+        early_refresh_beta: float = 0.0,
+        stale_ttl: Optional[int] = None,
+    ) -> Optional[Any]:
+        """
+        Retrieve a value, computing and storing it on a miss with single-flight protection.
+        
+        Concurrent misses for the same key in this process run ``compute`` once; the
+        other callers wait for its result instead of recomputing it. Values are stored
+        with their expiry and computation time in a dict, so they should be read back
+        through get_or_compute, and serialization must use a codec that encodes dicts.
+        
+        Args:
+            key: The key of the cache entry.
+            compute: Callable producing the value on a miss. None results are not stored.
+            ttl: Time to live in seconds, if applicable.
+            early_refresh_beta: When above 0, a caller may recompute the value shortly
+                before it expires, with a probability that grows as expiry approaches and
+                with the cost of the computation (probabilistic early expiration). 1.0 is
+                a typical value; larger values refresh earlier.
+            stale_ttl: When set, an expired value is kept for this many extra seconds and
+                returned immediately while a background thread recomputes it.
+                
+        Returns:
+            Optional[Any]: The cached or computed value.
+            
+        Raises:
+            ValueError: If serialization uses a codec that only encodes str and bytes.
+        """
+        if self._serializer is not None and not self._serializer.structured:
+            raise ValueError("get_or_compute stores dict entries, which the configured "
+                             "cache codec cannot encode; use the json or msgpack codec")
+        entry = self.get(key)
+        if entry is not None:
+            value, delta, expires_at = self._unwrap(entry)
+            if expires_at is None:
+                return value
+            now = time.time()
+            if now < expires_at:
+                if early_refresh_beta > 0 and now - delta * early_refresh_beta * \
+                        math.log(1.0 - random.random()) >= expires_at:
+                    computed, refreshed = self._single_flight.try_do(
+                        key, lambda: self._compute_and_store(key, compute, ttl, stale_ttl)
+                    )
+                    if computed and refreshed is not None:
+                        return refreshed
+                return value
+            if stale_ttl:
+                self._refresh_in_background(key, compute, ttl, stale_ttl)
+                return value
+        return self._single_flight.do(
+            key, lambda: self._compute_and_store(key, compute, ttl, stale_ttl)
+        )
+    
+    def _compute_and_store(self, key: str, compute: Callable[[], Any], ttl: Optional[int],
+                           stale_ttl: Optional[int]) -> Optional[Any]:
+        """Run a computation and store its result with refresh metadata."""
+        started = time.monotonic()
+        value = compute()
+        if value is None:
+            return None
+        delta = time.monotonic() - started
+        expires_at = time.time() + ttl if ttl else None
+        envelope = {_ENVELOPE_MARKER: True, "value": value, "delta": delta,
+                    "expires_at": expires_at}
+        self.set(key, envelope, ttl + stale_ttl if ttl and stale_ttl else ttl)
+        return value
+    
+    def _refresh_in_background(self, key: str, compute: Callable[[], Any], ttl: Optional[int],
+                               stale_ttl: Optional[int]) -> None:
+        """Recompute a stale value in a background thread unless a refresh is in progress."""
+        if self._single_flight.in_flight(key):
+            return
+        
+        def refresh():
+            try:
+                self._single_flight.try_do(
+                    key, lambda: self._compute_and_store(key, compute, ttl, stale_ttl)
+                )
+            except Exception:
+                logger.exception("Background refresh of cache key %s failed", key)
+        
+        threading.Thread(target=refresh, daemon=True).start()
+    
+    @staticmethod
+    def _unwrap(entry: Any):
+        """Split a stored entry into its value, computation time and expiry."""
+        if isinstance(entry, dict) and entry.get(_ENVELOPE_MARKER):
+            return entry["value"], entry["delta"], entry["expires_at"]
+        return entry, 0.0, None
+    
+    def get_stats(self) -> Optional[dict]:
+        """
+        Get statistics from the active cache driver.
+        
+        Returns:
+            Optional[dict]: Driver statistics, or None if no active driver or not supported.
+        """
+        if self._active_driver:
+            return self._active_driver.get_stats()
+        return None
+
+from .memory import InMemoryCacheDriver, estimate_size
+from .serialization import (
+    Codec, JSONCodec, MsgpackCodec, RawCodec, CODECS, Serializer, SerializingCacheDriver,
+    CACHE_CODEC, CACHE_COMPRESS_THRESHOLD, CACHE_COMPRESSION_LEVEL
+)
+from .tiered import TieredCacheDriver, CACHE_NEAR_TTL, CACHE_NEAR_MAX_ENTRIES, CACHE_NEAR_MAX_BYTES
@@ -0,0 +1,275 @@
+"""
+In-Memory Cache Driver Module
+
+This module provides a first-party, in-process cache driver with LRU eviction, per-key
+TTL and hard limits on entry count and estimated memory use. It needs no external
+service, which makes it suitable for single-node deployments and tests.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from . import CacheDriver
+
+# In-memory cache configuration
+CACHE_MEMORY_MAX_ENTRIES = int(os.environ.get("CACHE_MEMORY_MAX_ENTRIES", "10000"))
+CACHE_MEMORY_MAX_BYTES = int(os.environ.get("CACHE_MEMORY_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_MEMORY_SWEEP_INTERVAL = float(os.environ.get("CACHE_MEMORY_SWEEP_INTERVAL", "60"))
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """
+    Estimate the memory used by a cached value in bytes.
+
+    Containers are walked a few levels deep; the result is an approximation intended
+    for enforcing memory limits, not an exact measurement.
+
+    Args:
+        value: The value to measure.
+
+    Returns:
+        int: Estimated size in bytes.
+    """
+    size = sys.getsizeof(value)
+    if _depth >= 4:
+        return size
+    if isinstance(value, dict):
+        size += sum(
+            estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1) for k, v in value.items()
+        )
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _depth + 1) for item in value)
+    return size
+
+class InMemoryCacheDriver(CacheDriver):
+    """
+    Thread-safe in-process cache with O(1) LRU operations and per-key TTL.
+
+    Entries are kept in an OrderedDict in least-recently-used order. Expired entries
+    are removed lazily when read and by a periodic sweep that runs during writes at
+    most once per sweep interval. When a write would exceed the entry or byte limit,
+    the least recently used entries are evicted.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = CACHE_MEMORY_MAX_ENTRIES,
+        max_bytes: int = CACHE_MEMORY_MAX_BYTES,
+        sweep_interval: float = CACHE_MEMORY_SWEEP_INTERVAL,
+        default_ttl: Optional[int] = None,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries kept in the cache.
+            max_bytes: Maximum estimated size of all cached values in bytes.
+            sweep_interval: Minimum seconds between sweeps for expired entries.
+            default_ttl: TTL in seconds applied when set() is called without one.
+        """
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._sweep_interval = sweep_interval
+        self._default_ttl = default_ttl
+        # key -> (value, expires_at or None, estimated size)
+        self._entries: "OrderedDict[str, Tuple[Any, Optional[float], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._last_sweep = time.monotonic()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def connect(self) -> bool:
+        """Establish connection to the cache; always succeeds for an in-process cache."""
+        return True
+
+    def disconnect(self) -> bool:
+        """Disconnect from the cache; cached entries are kept."""
+        return True
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        """
+        Set a value in the cache.
+
+        Args:
+            key: The key for the cache entry.
+            value: The value to store.
+            ttl: Time to live in seconds, if applicable.
+
+        Returns:
+            bool: True if set operation was successful, False if the value is larger
+                than the cache's byte limit.
+        """
+        size = estimate_size(value)
+        if size > self._max_bytes:
+            return False
+        ttl = ttl if ttl is not None else self._default_ttl
+        now = time.monotonic()
+        expires_at = now + ttl if ttl else None
+        with self._lock:
+            self._maybe_sweep(now)
+            self._remove(key)
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._entries) > self._max_entries or self._bytes > self._max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+        return True
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Retrieve a value from the cache.
+
+        Args:
+            key: The key of the cache entry to retrieve.
+
+        Returns:
+            Optional[Any]: The value if found and not expired, None otherwise.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def delete(self, key: str) -> bool:
+        """
+        Delete a value from the cache.
+
+        Args:
+            key: The key of the cache entry to delete.
+
+        Returns:
+            bool: True if an unexpired entry existed and was deleted, False otherwise.
+        """
+        with self._lock:
+            return self._delete_live(key, time.monotonic())
+
+    def clear(self) -> bool:
+        """
+        Clear all cache entries.
+
+        Returns:
+            bool: True if clear operation was successful, False otherwise.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        return True
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Retrieve several values under a single lock acquisition.
+
+        Args:
+            keys: The keys of the cache entries to retrieve.
+
+        Returns:
+            Dict[str, Any]: Values of the keys that were found and not expired.
+        """
+        values = {}
+        with self._lock:
+            for key in keys:
+                value = self.get(key)
+                if value is not None:
+                    values[key] = value
+        return values
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """
+        Set several values under a single lock acquisition.
+
+        Args:
+            items: Mapping of keys to the values to store.
+            ttl: Time to live in seconds, if applicable, applied to every item.
+
+        Returns:
+            bool: True if every value was stored, False if any exceeded the byte limit.
+        """
+        with self._lock:
+            results = [self.set(key, value, ttl) for key, value in items.items()]
+        return all(results)
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        """
+        Delete several values under a single lock acquisition.
+
+        Args:
+            keys: The keys of the cache entries to delete.
+
+        Returns:
+            int: Number of unexpired entries that were deleted.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return sum(1 for key in keys if self._delete_live(key, now))
+
+    def purge_expired(self) -> int:
+        """
+        Remove every expired entry.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                key for key, (_, expires_at, _) in self._entries.items()
+                if expires_at is not None and expires_at <= now
+            ]
+            for key in expired:
+                self._remove(key)
+            self._stats["expirations"] += len(expired)
+            self._last_sweep = now
+        return len(expired)
+
+    def get_stats(self) -> dict:
+        """
+        Get cache statistics.
+
+        Returns:
+            dict: Hit, miss, eviction and expiration counters, and current usage.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        stats["max_entries"] = self._max_entries
+        stats["max_bytes"] = self._max_bytes
+        return stats
+
+    def _maybe_sweep(self, now: float) -> None:
+        """Purge expired entries if the sweep interval has elapsed. Caller holds the lock."""
+        if now - self._last_sweep >= self._sweep_interval:
+            self.purge_expired()
+
+    def _delete_live(self, key: str, now: float) -> bool:
+        """Remove an entry; return True only if it had not expired. Caller holds the lock."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        self._remove(key)
+        if entry[1] is not None and entry[1] <= now:
+            self._stats["expirations"] += 1
+            return False
+        return True
+
+    def _remove(self, key: str) -> bool:
+        """Remove an entry and release its size. Caller holds the lock."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[2]
+        return True
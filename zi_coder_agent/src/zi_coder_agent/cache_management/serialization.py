@@ -0,0 +1,302 @@
+"""
+Cache Serialization Module
+
+This module encodes cached values into compact byte envelopes using a selectable codec,
+compressing payloads above a size threshold. The envelope records the codec and the
+compression used, so values are decoded transparently on read.
+"""
+
+import json
+import os
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Optional, Type
+
+from . import CacheDriver
+
+# Serialization configuration; the API server enables serialization when a codec is set
+CACHE_CODEC = os.environ.get("CACHE_CODEC", "")
+CACHE_COMPRESS_THRESHOLD = int(os.environ.get("CACHE_COMPRESS_THRESHOLD", "1024"))
+CACHE_COMPRESSION_LEVEL = int(os.environ.get("CACHE_COMPRESSION_LEVEL", "6"))
+
+# Envelope layout: magic (2 bytes), codec id (1 byte), flags (1 byte), payload
+_MAGIC = b"ZC"
+_HEADER_SIZE = 4
+_FLAG_ZLIB = 0x01
+
+class Codec(ABC):
+    """Abstract base class for value codecs."""
+
+    name = ""
+    codec_id = 0
+    # Whether the codec encodes dicts and lists, not only str and bytes
+    structured = True
+
+    @abstractmethod
+    def encode(self, value: Any) -> bytes:
+        """
+        Encode a value to bytes.
+
+        Args:
+            value: The value to encode.
+
+        Returns:
+            bytes: The encoded value.
+        """
+        pass
+
+    @abstractmethod
+    def decode(self, data: bytes) -> Any:
+        """
+        Decode bytes produced by encode.
+
+        Args:
+            data: The encoded value.
+
+        Returns:
+            Any: The decoded value.
+        """
+        pass
+
+class JSONCodec(Codec):
+    """Encodes JSON-compatible values as compact UTF-8 JSON."""
+
+    name = "json"
+    codec_id = 1
+
+    def encode(self, value: Any) -> bytes:
+        """Encode a value as compact UTF-8 JSON."""
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    def decode(self, data: bytes) -> Any:
+        """Decode UTF-8 JSON."""
+        return json.loads(data.decode("utf-8"))
+
+class MsgpackCodec(Codec):
+    """Encodes values with MessagePack; requires the optional msgpack package."""
+
+    name = "msgpack"
+    codec_id = 2
+
+    def __init__(self):
+        """
+        Initialize the codec.
+
+        Raises:
+            RuntimeError: If the msgpack package is not installed.
+        """
+        try:
+            import msgpack
+        except ImportError as e:
+            raise RuntimeError("The msgpack codec requires the 'msgpack' package") from e
+        self._msgpack = msgpack
+
+    def encode(self, value: Any) -> bytes:
+        """Encode a value with MessagePack, keeping str and bytes distinct."""
+        return self._msgpack.packb(value, use_bin_type=True)
+
+    def decode(self, data: bytes) -> Any:
+        """Decode MessagePack, returning str for text values."""
+        return self._msgpack.unpackb(data, raw=False)
+
+class RawCodec(Codec):
+    """Stores str and bytes values without any structural encoding."""
+
+    name = "raw"
+    codec_id = 3
+    structured = False
+    _BYTES = b"\x00"
+    _STR = b"\x01"
+
+    def encode(self, value: Any) -> bytes:
+        """
+        Encode a str or bytes value behind a one-byte type marker.
+
+        Raises:
+            TypeError: If the value is neither str nor bytes.
+        """
+        if isinstance(value, bytes):
+            return self._BYTES + value
+        if isinstance(value, str):
+            return self._STR + value.encode("utf-8")
+        raise TypeError(f"The raw codec only stores str and bytes, not {type(value).__name__}")
+
+    def decode(self, data: bytes) -> Any:
+        """Decode a value produced by encode back to str or bytes."""
+        if data[:1] == self._STR:
+            return data[1:].decode("utf-8")
+        return data[1:]
+
+CODECS: Dict[str, Type[Codec]] = {
+    codec.name: codec for codec in (JSONCodec, MsgpackCodec, RawCodec)
+}
+
+class Serializer:
+    """Encodes values into envelopes with the selected codec and optional compression."""
+
+    def __init__(self, codec: str = "json", compress_threshold: int = CACHE_COMPRESS_THRESHOLD,
+                 compression_level: int = CACHE_COMPRESSION_LEVEL):
+        """
+        Initialize the serializer.
+
+        Args:
+            codec: Name of the codec used to encode values.
+            compress_threshold: Payloads of at least this many bytes are compressed;
+                a negative value disables compression.
+            compression_level: zlib compression level from 1 (fastest) to 9 (smallest).
+
+        Raises:
+            ValueError: If the codec is unknown.
+        """
+        if codec not in CODECS:
+            raise ValueError(f"Unknown cache codec '{codec}'; expected one of {sorted(CODECS)}")
+        self._codec = CODECS[codec]()
+        self._decoders: Dict[int, Codec] = {self._codec.codec_id: self._codec}
+        self._compress_threshold = compress_threshold
+        self._compression_level = compression_level
+        self._lock = threading.Lock()
+        self._stats = {"encoded_bytes": 0, "stored_bytes": 0, "compressed": 0}
+
+    def dumps(self, value: Any) -> bytes:
+        """
+        Encode a value into an envelope.
+
+        Args:
+            value: The value to encode.
+
+        Returns:
+            bytes: Envelope containing the codec id, flags and payload.
+        """
+        payload = self._codec.encode(value)
+        encoded_size = len(payload)
+        flags = 0
+        if 0 <= self._compress_threshold <= encoded_size:
+            compressed = zlib.compress(payload, self._compression_level)
+            if len(compressed) < encoded_size:
+                payload = compressed
+                flags |= _FLAG_ZLIB
+        with self._lock:
+            self._stats["encoded_bytes"] += encoded_size
+            self._stats["stored_bytes"] += len(payload)
+            self._stats["compressed"] += 1 if flags & _FLAG_ZLIB else 0
+        return _MAGIC + bytes((self._codec.codec_id, flags)) + payload
+
+    @property
+    def structured(self) -> bool:
+        """Whether the codec encodes dicts and lists, not only str and bytes."""
+        return self._codec.structured
+
+    def loads(self, data: Any) -> Any:
+        """
+        Decode an envelope; values that are not envelopes are returned unchanged.
+
+        Args:
+            data: The stored value.
+
+        Returns:
+            Any: The decoded value.
+        """
+        if not isinstance(data, (bytes, bytearray)) or data[:2] != _MAGIC or \
+                len(data) < _HEADER_SIZE:
+            return data
+        codec_id, flags = data[2], data[3]
+        payload = bytes(data[_HEADER_SIZE:])
+        if flags & _FLAG_ZLIB:
+            payload = zlib.decompress(payload)
+        return self._decoder(codec_id).decode(payload)
+
+    def _decoder(self, codec_id: int) -> Codec:
+        """Get the codec for an id, so values written with another codec stay readable."""
+        codec = self._decoders.get(codec_id)
+        if codec is None:
+            codec_class = next(
+                (cls for cls in CODECS.values() if cls.codec_id == codec_id), None
+            )
+            if codec_class is None:
+                raise ValueError(f"Unknown cache codec id {codec_id}")
+            codec = self._decoders[codec_id] = codec_class()
+        return codec
+
+    def get_stats(self) -> dict:
+        """
+        Get serialization statistics.
+
+        Returns:
+            dict: Encoded and stored byte counts, compressed value count and the
+                overall compression ratio.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats["codec"] = self._codec.name
+        stats["compression_ratio"] = (
+            stats["encoded_bytes"] / stats["stored_bytes"] if stats["stored_bytes"] else 1.0
+        )
+        return stats
+
+class SerializingCacheDriver(CacheDriver):
+    """Encodes values with a Serializer before passing them to another cache driver."""
+
+    def __init__(self, inner: CacheDriver, serializer: Serializer):
+        """
+        Initialize the driver.
+
+        Args:
+            inner: The driver that stores the encoded values.
+            serializer: The serializer used to encode and decode values.
+        """
+        self._inner = inner
+        self._serializer = serializer
+
+    @property
+    def inner(self) -> CacheDriver:
+        """The driver storing the encoded values."""
+        return self._inner
+
+    def connect(self) -> bool:
+        """Establish connection to the inner cache."""
+        return self._inner.connect()
+
+    def disconnect(self) -> bool:
+        """Disconnect from the inner cache."""
+        return self._inner.disconnect()
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        """Encode a value and store it in the inner cache."""
+        return self._inner.set(key, self._serializer.dumps(value), ttl)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Retrieve and decode a value from the inner cache."""
+        value = self._inner.get(key)
+        if value is None:
+            return None
+        return self._serializer.loads(value)
+
+    def delete(self, key: str) -> bool:
+        """Delete a value from the inner cache."""
+        return self._inner.delete(key)
+
+    def clear(self) -> bool:
+        """Clear all entries of the inner cache."""
+        return self._inner.clear()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Retrieve and decode several values from the inner cache."""
+        return {
+            key: self._serializer.loads(value) for key, value in self._inner.get_many(keys).items()
+        }
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """Encode several values and store them in the inner cache."""
+        encoded = {key: self._serializer.dumps(value) for key, value in items.items()}
+        return self._inner.set_many(encoded, ttl)
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        """Delete several values from the inner cache."""
+        return self._inner.delete_many(keys)
+
+    def get_stats(self) -> Optional[dict]:
+        """Get inner driver statistics together with serialization statistics."""
+        stats = dict(self._inner.get_stats() or {})
+        stats["serialization"] = self._serializer.get_stats()
+        return stats
@@ -0,0 +1,89 @@
+"""
+Single-Flight Module
+
+This module coalesces concurrent computations of the same key, so that when a popular
+cache entry is missing only one caller recomputes it while the others wait for that
+result.
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Tuple
+
+class SingleFlight:
+    """Runs at most one computation per key at a time and shares its outcome."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+
+    def do(self, key: str, compute: Callable[[], Any]) -> Any:
+        """
+        Compute the value for a key, or wait for a computation already in progress.
+
+        Args:
+            key: Identifier of the computation.
+            compute: Callable producing the value.
+
+        Returns:
+            Any: The computed value. Exceptions raised by compute are raised in every
+                caller waiting on the same key.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        return self._run(key, future, compute)
+
+    def try_do(self, key: str, compute: Callable[[], Any]) -> Tuple[bool, Any]:
+        """
+        Compute the value for a key unless a computation is already in progress.
+
+        Args:
+            key: Identifier of the computation.
+            compute: Callable producing the value.
+
+        Returns:
+            Tuple[bool, Any]: (True, value) if this call computed the value, or
+                (False, None) if another caller is already computing it.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return False, None
+        return True, self._run(key, future, compute)
+
+    def in_flight(self, key: str) -> bool:
+        """
+        Check whether a computation for a key is in progress.
+
+        Args:
+            key: Identifier of the computation.
+
+        Returns:
+            bool: True if a computation is in progress, False otherwise.
+        """
+        with self._lock:
+            return key in self._in_flight
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        """Return the in-flight future for a key and whether the caller leads it."""
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._in_flight[key] = future
+            return future, True
+
+    def _run(self, key: str, future: Future, compute: Callable[[], Any]) -> Any:
+        """Run the computation as the leader and publish its outcome."""
+        try:
+            value = compute()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
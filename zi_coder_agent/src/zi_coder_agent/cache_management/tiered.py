@@ -0,0 +1,188 @@
+"""
+Tiered Cache Driver Module
+
+This module provides a two-tier cache driver that keeps a small, bounded in-process
+near-cache in front of any other cache driver, so that hot keys are served without a
+round trip to the remote cache.
+"""
+
+import os
+from typing import Any, Dict, Iterable, Optional
+
+from . import CacheDriver
+from .memory import InMemoryCacheDriver
+
+# Near-cache configuration; the API server enables the near-cache when the TTL is above 0
+CACHE_NEAR_TTL = float(os.environ.get("CACHE_NEAR_TTL", "0"))
+CACHE_NEAR_MAX_ENTRIES = int(os.environ.get("CACHE_NEAR_MAX_ENTRIES", "1024"))
+CACHE_NEAR_MAX_BYTES = int(os.environ.get("CACHE_NEAR_MAX_BYTES", str(32 * 1024 * 1024)))
+
+class TieredCacheDriver(CacheDriver):
+    """
+    Read-through, write-through cache combining a local tier with a remote driver.
+
+    Reads are served from the local tier when possible and fall back to the remote
+    driver, populating the local tier on a hit. Writes go to the remote driver first
+    and then to the local tier. Local entries live for at most ``local_ttl`` seconds,
+    which bounds how stale a key can be when another process changes it remotely.
+    """
+
+    def __init__(
+        self,
+        remote: CacheDriver,
+        local_ttl: float = 5,
+        max_entries: int = CACHE_NEAR_MAX_ENTRIES,
+        max_bytes: int = CACHE_NEAR_MAX_BYTES,
+    ):
+        """
+        Initialize the tiered cache.
+
+        Args:
+            remote: The driver holding the authoritative cache entries.
+            local_ttl: Maximum time to live of local entries in seconds.
+            max_entries: Maximum number of entries in the local tier.
+            max_bytes: Maximum estimated size of the local tier in bytes.
+        """
+        self._remote = remote
+        self._local_ttl = local_ttl
+        self._local = InMemoryCacheDriver(max_entries=max_entries, max_bytes=max_bytes,
+                                          sweep_interval=max(local_ttl, 1))
+
+    @property
+    def remote(self) -> CacheDriver:
+        """The driver behind the local tier."""
+        return self._remote
+
+    def connect(self) -> bool:
+        """Establish connection to the remote cache."""
+        return self._remote.connect()
+
+    def disconnect(self) -> bool:
+        """Disconnect from the remote cache and drop the local tier."""
+        self._local.clear()
+        return self._remote.disconnect()
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        """
+        Set a value in the remote cache and the local tier.
+
+        Args:
+            key: The key for the cache entry.
+            value: The value to store.
+            ttl: Time to live in seconds, if applicable.
+
+        Returns:
+            bool: True if the remote set operation was successful, False otherwise.
+        """
+        if not self._remote.set(key, value, ttl):
+            self._local.delete(key)
+            return False
+        self._local.set(key, value, self._local_entry_ttl(ttl))
+        return True
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Retrieve a value from the local tier, falling back to the remote cache.
+
+        Args:
+            key: The key of the cache entry to retrieve.
+
+        Returns:
+            Optional[Any]: The value if found, None otherwise.
+        """
+        value = self._local.get(key)
+        if value is not None:
+            return value
+        value = self._remote.get(key)
+        if value is not None:
+            self._local.set(key, value, self._local_entry_ttl(None))
+        return value
+
+    def delete(self, key: str) -> bool:
+        """
+        Delete a value from both tiers.
+
+        Args:
+            key: The key of the cache entry to delete.
+
+        Returns:
+            bool: True if the remote deletion was successful, False otherwise.
+        """
+        self._local.delete(key)
+        return self._remote.delete(key)
+
+    def clear(self) -> bool:
+        """
+        Clear both tiers.
+
+        Returns:
+            bool: True if the remote clear operation was successful, False otherwise.
+        """
+        self._local.clear()
+        return self._remote.clear()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Retrieve several values, fetching only local misses from the remote cache.
+
+        Args:
+            keys: The keys of the cache entries to retrieve.
+
+        Returns:
+            Dict[str, Any]: Values of the keys that were found.
+        """
+        keys = list(keys)
+        values = self._local.get_many(keys)
+        missing = [key for key in keys if key not in values]
+        if missing:
+            remote_values = self._remote.get_many(missing)
+            if remote_values:
+                self._local.set_many(remote_values, self._local_entry_ttl(None))
+            values.update(remote_values)
+        return values
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """
+        Set several values in the remote cache and the local tier.
+
+        Args:
+            items: Mapping of keys to the values to store.
+            ttl: Time to live in seconds, if applicable, applied to every item.
+
+        Returns:
+            bool: True if the remote set operation was successful, False otherwise.
+        """
+        if not self._remote.set_many(items, ttl):
+            self._local.delete_many(items)
+            return False
+        self._local.set_many(items, self._local_entry_ttl(ttl))
+        return True
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        """
+        Delete several values from both tiers.
+
+        Args:
+            keys: The keys of the cache entries to delete.
+
+        Returns:
+            int: Number of entries deleted from the remote cache.
+        """
+        keys = list(keys)
+        self._local.delete_many(keys)
+        return self._remote.delete_many(keys)
+
+    def get_stats(self) -> Optional[dict]:
+        """
+        Get statistics for both tiers.
+
+        Returns:
+            dict: Local tier statistics and, if available, remote driver statistics.
+        """
+        return {"local": self._local.get_stats(), "remote": self._remote.get_stats()}
+
+    def _local_entry_ttl(self, ttl: Optional[int]) -> float:
+        """Local entries never outlive the remote entry or the local TTL."""
+        if ttl:
+            return min(ttl, self._local_ttl)
+        return self._local_ttl
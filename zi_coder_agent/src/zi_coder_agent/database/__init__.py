@@ -5,9 +5,12 @@ This module provides the database access layer using SQLAlchemy as the ORM and A
 It is designed to manage database connections and operations for the application.
 """
 
+import logging
+import threading
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
 from typing import Optional
 
 # Database configuration
@@ -16,9 +19,51 @@ DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///test.db")
 if "pytest" in os.environ.get("PYTEST_CURRENT_TEST", ""):
     DATABASE_URL = "sqlite:///test.db"
 
+# Connection pool configuration
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+
+logger = logging.getLogger(__name__)
+
+# Whether the schema was created in this process; shared by every DatabaseManager
+_initialized = False
+_init_lock = threading.Lock()
+
+def build_engine(
+    database_url: str = DATABASE_URL,
+    pool_size: int = DB_POOL_SIZE,
+    max_overflow: int = DB_MAX_OVERFLOW,
+    pool_pre_ping: bool = DB_POOL_PRE_PING,
+    pool_recycle: int = DB_POOL_RECYCLE,
+    echo: bool = True,
+) -> Engine:
+    """
+    Create a long-lived, pooled SQLAlchemy engine.
+    
+    Args:
+        database_url: SQLAlchemy database URL.
+        pool_size: Number of connections kept open in the pool.
+        max_overflow: Connections allowed above pool_size under burst load.
+        pool_pre_ping: Whether to test connections for liveness on checkout.
+        pool_recycle: Seconds after which a pooled connection is replaced (-1 disables).
+        echo: Whether to log emitted SQL statements.
+        
+    Returns:
+        Engine: Configured SQLAlchemy engine.
+    """
+    options = {"echo": echo, "pool_pre_ping": pool_pre_ping, "pool_recycle": pool_recycle}
+    # SQLite uses a file or memory based pool that does not accept sizing arguments
+    if not database_url.startswith("sqlite"):
+        options["pool_size"] = pool_size
+        options["max_overflow"] = max_overflow
+    return create_engine(database_url, **options)
+
 # SQLAlchemy setup
-engine = create_engine(DATABASE_URL, echo=True)
+engine = build_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ScopedSession = scoped_session(SessionLocal)
 Base = declarative_base()
 
 def get_db():
@@ -40,20 +85,53 @@ class DatabaseManager:
     def __init__(self):
         self._engine = engine
         self._session_factory = SessionLocal
+        self._scoped_session = ScopedSession
         self._current_session: Optional[SessionLocal] = None
     
+    def initialize(self) -> bool:
+        """
+        Verify connectivity and create the schema once per process.
+        
+        Once it succeeded, calls from any manager in the process are no-ops, so this is
+        safe to call from every application factory invocation and request without
+        re-reflecting metadata. A failed initialization is logged and retried by the
+        next call.
+        
+        Returns:
+            bool: True if the database is ready, False otherwise.
+        """
+        global _initialized
+        if _initialized:
+            return True
+        with _init_lock:
+            if _initialized:
+                return True
+            if not self.connect():
+                return False
+            try:
+                self.create_all()
+            except Exception:
+                logger.exception("Creating the database schema failed")
+                return False
+            _initialized = True
+            return True
+    
     def connect(self) -> bool:
         """
         Establish a connection to the database.
         
+        The connection is returned to the pool immediately; it only serves to
+        verify that the database is reachable.
+        
         Returns:
             bool: True if connection was successful, False otherwise.
         """
         try:
-            self._engine.connect()
+            connection = self._engine.connect()
+            connection.close()
             return True
         except Exception as e:
-            print(f"Database connection failed: {e}")
+            logger.error("Database connection failed: %s", e)
             return False
     
     def disconnect(self) -> bool:
@@ -63,14 +141,17 @@ class DatabaseManager:
         Returns:
             bool: True if disconnection was successful, False otherwise.
         """
+        global _initialized
         try:
             if self._current_session:
                 self._current_session.close()
                 self._current_session = None
+            self._scoped_session.remove()
             self._engine.dispose()
+            _initialized = False
             return True
         except Exception as e:
-            print(f"Database disconnection failed: {e}")
+            logger.error("Database disconnection failed: %s", e)
             return False
     
     def get_session(self) -> SessionLocal:
@@ -84,6 +165,21 @@ class DatabaseManager:
             self._current_session = self._session_factory()
         return self._current_session
     
+    def get_scoped_session(self):
+        """
+        Get the session bound to the current thread or request scope.
+        
+        Returns:
+            Session: A SQLAlchemy session checked out from the shared pool.
+        """
+        return self._scoped_session()
+    
+    def remove_session(self) -> None:
+        """
+        Close the current scoped session and return its connection to the pool.
+        """
+        self._scoped_session.remove()
+    
     def create_all(self) -> None:
         """
         Create all database tables defined in the models.
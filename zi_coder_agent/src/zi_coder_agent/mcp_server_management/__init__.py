@@ -5,8 +5,30 @@ This module provides a pluggable driver system for managing connections to multi
 It is designed with extensibility in mind, following SOLID principles and MCP specifications.
 """
 
+import logging
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Type, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Type, Optional
+
+from .routing import ToolIndex, run_concurrently, tool_name, MCP_MAX_PARALLEL_SERVERS
+from .catalog import CatalogCache, MCP_CATALOG_TTL, TOOLS, RESOURCES
+from .fanout import (
+    iter_tool_calls, MCP_FANOUT_MAX_WORKERS, MCP_FANOUT_CONCURRENCY, MCP_FANOUT_TIMEOUT
+)
+from .memo import (
+    ResultCache, arguments_hash, parse_tool_rules, is_read_only, MCP_TOOL_CACHE_TTL,
+    MCP_RESOURCE_CACHE_TTL, MCP_TOOL_CACHE_RULES, MCP_RESULT_CACHE_MAX_BYTES,
+    MCP_RESULT_CACHE_STORE
+)
+from .sessions import (
+    SessionPool, SessionManager, SessionUnavailableError, MCP_SESSION_POOL_SIZE,
+    MCP_SESSION_MAX_IN_FLIGHT, MCP_SESSION_ACQUIRE_TIMEOUT, MCP_KEEPALIVE_INTERVAL,
+    MCP_SESSION_MAINTAIN_INTERVAL, MCP_RECONNECT_BACKOFF_BASE, MCP_RECONNECT_BACKOFF_MAX
+)
+
+logger = logging.getLogger(__name__)
 
 class MCPServerDriver(ABC):
     """Abstract base class for MCP server drivers."""
@@ -40,23 +62,87 @@ class MCPServerDriver(ABC):
     def access_resource(self, uri: str) -> dict:
         """Access a specific resource from the MCP server."""
         pass
+    
+    def set_list_changed_listener(self, listener: Optional[Callable[[str], None]]) -> bool:
+        """
+        Report list-changed notifications from the MCP server to a listener.
+        
+        Drivers receiving notifications/tools/list_changed or
+        notifications/resources/list_changed from their server should override this
+        and call the listener with "tools" or "resources". The default implementation
+        does not support notifications, and cached catalogs expire by TTL only.
+        
+        Args:
+            listener: Called with the kind of list that changed, or None to remove
+                the listener.
+            
+        Returns:
+            bool: True if the driver reports list changes, False otherwise.
+        """
+        return False
+    
+    def ping(self) -> bool:
+        """
+        Check that the session to the MCP server is alive.
+        
+        Called on idle connected sessions to keep them warm. Drivers should override
+        this to send an MCP ping request; the default implementation assumes the
+        session is healthy, so failures are only detected when a call fails.
+        
+        Returns:
+            bool: True if the server answered, False otherwise.
+        """
+        return True
 
 class MCPServerMarketplace:
-    """Manages multiple MCP server drivers for different MCP servers."""
+    """
+    Manages multiple MCP server drivers for different MCP servers.
+    
+    Tool calls are routed to the server providing the tool through an index merged
+    from the tool catalogs of all registered servers, so calls to different servers
+    can run concurrently. The active driver handles calls for tools outside the index
+    and is preferred when several servers provide the same tool.
+    """
     
     def __init__(self):
         self._drivers: Dict[str, MCPServerDriver] = {}
         self._active_driver: Optional[MCPServerDriver] = None
+        self._active_name: Optional[str] = None
+        self._tool_index: Optional[ToolIndex] = None
+        self._tool_index_built_at = 0.0
+        self._index_lock = threading.Lock()
+        self._catalogs = CatalogCache()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._results = ResultCache()
+        self._sessions = SessionManager()
     
-    def register_driver(self, name: str, driver: Type[MCPServerDriver]) -> None:
+    def register_driver(self, name: str, driver: Type[MCPServerDriver],
+                        pool_size: Optional[int] = None) -> None:
         """
         Register a new MCP server driver.
         
         Args:
             name: Unique identifier for the driver.
             driver: The driver class to register.
+            pool_size: Number of sessions kept to the server; defaults to
+                MCP_SESSION_POOL_SIZE.
         """
-        self._drivers[name] = driver()
+        pool = SessionPool(driver, size=pool_size or MCP_SESSION_POOL_SIZE)
+        replaced = self._sessions.add(name, pool)
+        if replaced is not None:
+            for session in replaced.sessions:
+                session.driver.set_list_changed_listener(None)
+            replaced.close()
+        self._drivers[name] = pool.primary
+        if self._active_name == name:
+            self._active_driver = pool.primary
+        for session in pool.sessions:
+            session.driver.set_list_changed_listener(
+                lambda kind, name=name: self._on_list_changed(name, kind)
+            )
+        self._catalogs.invalidate(name)
+        self._results.invalidate(name)
+        self._tool_index = None
     
     def set_active_driver(self, name: str) -> bool:
         """
@@ -70,78 +156,365 @@ class MCPServerMarketplace:
         """
         if name in self._drivers:
             self._active_driver = self._drivers[name]
+            self._active_name = name
             return True
         return False
     
     def connect(self) -> bool:
         """
-        Connect to the active MCP server driver.
+        Connect the sessions of the active MCP server driver and keep them alive.
         
         Returns:
             bool: True if connection was successful, False otherwise.
         """
         if self._active_driver:
-            return self._active_driver.connect()
+            self._sessions.start()
+            return self._sessions.get(self._active_name).connect()
         return False
     
     def disconnect(self) -> bool:
         """
-        Disconnect from the active MCP server driver.
+        Disconnect the sessions of the active MCP server driver.
         
         Returns:
             bool: True if disconnection was successful, False otherwise.
         """
         if self._active_driver:
-            return self._active_driver.disconnect()
+            return self._sessions.get(self._active_name).disconnect()
         return False
     
-    def get_tools(self) -> Optional[list]:
+    def get_tools(self, refresh: bool = False) -> Optional[list]:
         """
         Retrieve available tools from the active MCP server driver.
         
+        Args:
+            refresh: Fetch the catalog from the server instead of the cache.
+            
         Returns:
             Optional[list]: List of tools, or None if no active driver.
         """
         if self._active_driver:
-            return self._active_driver.get_tools()
+            return self._get_catalog(self._active_name, TOOLS, refresh)
         return None
     
-    def get_resources(self) -> Optional[list]:
+    def get_resources(self, refresh: bool = False) -> Optional[list]:
         """
         Retrieve available resources from the active MCP server driver.
         
+        Args:
+            refresh: Fetch the catalog from the server instead of the cache.
+            
         Returns:
             Optional[list]: List of resources, or None if no active driver.
         """
         if self._active_driver:
-            return self._active_driver.get_resources()
+            return self._get_catalog(self._active_name, RESOURCES, refresh)
         return None
     
-    def use_tool(self, tool_name: str, arguments: dict) -> Optional[dict]:
+    def get_tool(self, tool_name: str, server: Optional[str] = None) -> Optional[Any]:
+        """
+        Look up the definition of a tool by name.
+        
+        Args:
+            tool_name: Name of the tool.
+            server: Name of the server to look in, overriding the tool index.
+            
+        Returns:
+            Optional[Any]: The tool definition, or None if no server provides the tool.
+        """
+        name = self._driver_name(self._route_tool(tool_name, server))
+        if name is None:
+            return None
+        return self._catalogs.find_tool(name, tool_name, self._fetcher(name, TOOLS))
+    
+    def invalidate_catalogs(self, server: Optional[str] = None, kind: Optional[str] = None) -> None:
         """
-        Use a specific tool from the active MCP server driver.
+        Drop cached tool and resource catalogs so they are fetched again on next use.
+        
+        Args:
+            server: Server whose catalogs are dropped, or None for every server.
+            kind: "tools" or "resources", or None for both.
+        """
+        self._catalogs.invalidate(server, kind)
+        if kind in (None, TOOLS):
+            self._tool_index = None
+    
+    def use_tool(self, tool_name: str, arguments: dict,
+                 server: Optional[str] = None) -> Optional[dict]:
+        """
+        Use a specific tool, routed to the MCP server that provides it.
+        
+        Results of tools with a cache rule, or annotated as read-only when a read-only
+        TTL is configured, are served from the result cache while they are fresh.
         
         Args:
             tool_name: Name of the tool to use.
             arguments: Arguments to pass to the tool.
+            server: Name of the server to use, overriding the tool index.
             
         Returns:
-            Optional[dict]: Result from the tool, or None if no active driver.
+            Optional[dict]: Result from the tool, or None if no server handles the tool.
         """
-        if self._active_driver:
-            return self._active_driver.use_tool(tool_name, arguments)
-        return None
+        name = self._driver_name(self._route_tool(tool_name, server))
+        if name is None:
+            return None
+        ttl = self._results.ttl_for_tool(
+            name, tool_name,
+            lambda: self._catalogs.find_tool(name, tool_name, self._fetcher(name, TOOLS))
+        )
+        return self._results.call_tool(
+            name, tool_name, arguments, ttl,
+            lambda: self._call(name, lambda driver: driver.use_tool(tool_name, arguments))
+        )
+    
+    def iter_tool_results(self, calls: List[dict], max_concurrency: int = MCP_FANOUT_CONCURRENCY,
+                          timeout: Optional[float] = MCP_FANOUT_TIMEOUT) -> Iterator[dict]:
+        """
+        Run several tool calls concurrently and yield each outcome as soon as it is ready.
+        
+        Args:
+            calls: Tool invocations, each a dict with a "tool_name" and optional
+                "arguments", "server" and "id".
+            max_concurrency: Maximum number of calls in flight at the same time.
+            timeout: Seconds each call may run, or None for no limit.
+            
+        Yields:
+            dict: Outcome of a call with its "index" in calls, "id", "tool_name",
+                "status" (ok, error or timeout), "result" or "error", and "elapsed".
+        """
+        return iter_tool_calls(
+            self._get_executor(),
+            lambda name, arguments, server: self.use_tool(name, arguments, server),
+            calls, max_concurrency, timeout,
+        )
     
-    def access_resource(self, uri: str) -> Optional[dict]:
+    def use_tools(self, calls: List[dict], max_concurrency: int = MCP_FANOUT_CONCURRENCY,
+                  timeout: Optional[float] = MCP_FANOUT_TIMEOUT) -> List[dict]:
+        """
+        Run several tool calls concurrently and wait for all of them.
+        
+        Failed or timed-out calls do not affect the others; their outcomes report the
+        error instead of a result.
+        
+        Args:
+            calls: Tool invocations, each a dict with a "tool_name" and optional
+                "arguments", "server" and "id".
+            max_concurrency: Maximum number of calls in flight at the same time.
+            timeout: Seconds each call may run, or None for no limit.
+            
+        Returns:
+            List[dict]: Outcomes in the order of the calls.
+        """
+        outcomes = list(self.iter_tool_results(calls, max_concurrency, timeout))
+        return sorted(outcomes, key=lambda outcome: outcome["index"])
+    
+    def access_resource(self, uri: str, server: Optional[str] = None) -> Optional[dict]:
         """
         Access a specific resource from the active MCP server driver.
         
+        Resource contents are served from the result cache while they are fresh when a
+        resource TTL is configured.
+        
         Args:
             uri: URI of the resource to access.
+            server: Name of the server to read from instead of the active driver.
             
         Returns:
             Optional[dict]: Resource data, or None if no active driver.
         """
-        if self._active_driver:
-            return self._active_driver.access_resource(uri)
-        return None
+        name = self._driver_name(self._drivers.get(server) if server else self._active_driver)
+        if name is None:
+            return None
+        return self._results.read_resource(
+            name, uri, lambda: self._call(name, lambda driver: driver.access_resource(uri))
+        )
+    
+    def enable_result_cache(self, cache: Any = None, tool_ttl: Optional[float] = None,
+                            resource_ttl: Optional[float] = None) -> None:
+        """
+        Configure memoization of tool results and resource reads.
+        
+        Args:
+            cache: Cache backend providing get and set, such as CacheToolMarketplace;
+                None keeps the current backend.
+            tool_ttl: Seconds results of tools annotated as read-only are cached.
+            resource_ttl: Seconds resource contents are cached.
+        """
+        if cache is not None:
+            self._results.set_backend(cache)
+        if tool_ttl is not None:
+            self._results.tool_ttl = tool_ttl
+        if resource_ttl is not None:
+            self._results.resource_ttl = resource_ttl
+    
+    def set_tool_cache_rule(self, tool_name: str, ttl: float, server: Optional[str] = None) -> None:
+        """
+        Set how long the results of a tool are cached, overriding its annotations.
+        
+        Args:
+            tool_name: Name of the tool.
+            ttl: Seconds results are cached; 0 disables caching of the tool.
+            server: Server the rule applies to, or None for every server.
+        """
+        self._results.set_rule(tool_name, ttl, server)
+    
+    def invalidate_results(self, server: Optional[str] = None) -> None:
+        """
+        Drop cached tool results and resource contents.
+        
+        Args:
+            server: Server whose results are dropped, or None for every server.
+        """
+        self._results.invalidate(server)
+    
+    def get_result_cache_stats(self) -> dict:
+        """
+        Get statistics of the result cache.
+        
+        Returns:
+            dict: Hit and miss counts, TTLs and tool rules.
+        """
+        return self._results.get_stats()
+    
+    def connect_all(self) -> Dict[str, bool]:
+        """
+        Connect the sessions of every registered MCP server concurrently and keep them alive.
+        
+        Returns:
+            Dict[str, bool]: Whether the connection to each server succeeded.
+        """
+        self._sessions.start()
+        outcomes = run_concurrently({
+            name: self._sessions.get(name).connect for name in self._drivers
+        })
+        self._tool_index = None
+        return {
+            name: not isinstance(outcome, Exception) and bool(outcome)
+            for name, outcome in outcomes.items()
+        }
+    
+    def disconnect_all(self) -> Dict[str, bool]:
+        """
+        Disconnect from every registered MCP server concurrently.
+        
+        Returns:
+            Dict[str, bool]: Whether disconnecting from each server succeeded.
+        """
+        outcomes = run_concurrently({
+            name: self._sessions.get(name).disconnect for name in self._drivers
+        })
+        return {
+            name: not isinstance(outcome, Exception) and bool(outcome)
+            for name, outcome in outcomes.items()
+        }
+    
+    def get_session_status(self) -> Dict[str, dict]:
+        """
+        Describe the session pool of every registered MCP server.
+        
+        Returns:
+            Dict[str, dict]: Whether each pool is connected, and the state, calls in
+                flight and failures of each of its sessions.
+        """
+        return self._sessions.to_dict()
+    
+    def get_all_tools(self) -> Dict[str, list]:
+        """
+        Retrieve the tools of every registered MCP server concurrently.
+        
+        Returns:
+            Dict[str, list]: Tools of each server; servers that fail are left out.
+        """
+        outcomes = run_concurrently({
+            name: (lambda name=name: self._get_catalog(name, TOOLS)) for name in self._drivers
+        })
+        return {
+            name: tools for name, tools in outcomes.items() if not isinstance(tools, Exception)
+        }
+    
+    def get_tool_index(self, refresh: bool = False) -> ToolIndex:
+        """
+        Get the index of the tools of all registered servers, building it if needed.
+        
+        Args:
+            refresh: Rebuild the index from the servers' current tool catalogs.
+            
+        Returns:
+            ToolIndex: Index mapping tool names to the servers providing them.
+        """
+        if refresh:
+            self._catalogs.invalidate(kind=TOOLS)
+        index = self._tool_index
+        if index is not None and not refresh and not self._tool_index_expired():
+            return index
+        with self._index_lock:
+            if self._tool_index is None or refresh or self._tool_index_expired():
+                self._tool_index = ToolIndex(self.get_all_tools())
+                self._tool_index_built_at = time.monotonic()
+            return self._tool_index
+    
+    def _tool_index_expired(self) -> bool:
+        """
+        The index is rebuilt when the catalogs it was built from may have expired.
+        
+        Without a catalog TTL the index is kept until it is invalidated, so routing a
+        tool call does not fetch the catalog of every server.
+        """
+        if self._catalogs.ttl <= 0:
+            return False
+        return time.monotonic() - self._tool_index_built_at >= self._catalogs.ttl
+    
+    def _get_catalog(self, name: str, kind: str, refresh: bool = False) -> list:
+        """Get a server catalog through the catalog cache."""
+        if refresh:
+            self.invalidate_catalogs(name, kind)
+        return self._catalogs.get(name, kind, self._fetcher(name, kind))
+    
+    def _fetcher(self, name: str, kind: str) -> Callable[[], list]:
+        """Get a callable fetching a server catalog through its session pool."""
+        if kind == TOOLS:
+            return lambda: self._call(name, lambda driver: driver.get_tools())
+        return lambda: self._call(name, lambda driver: driver.get_resources())
+    
+    def _call(self, name: str, operation: Callable[[MCPServerDriver], Any]) -> Any:
+        """Run an operation on a session of a server, or return None if none is available."""
+        try:
+            return self._sessions.get(name).call(operation)
+        except SessionUnavailableError as e:
+            logger.error("MCP server %s is unavailable: %s", name, e)
+            return None
+    
+    def _on_list_changed(self, name: str, kind: str) -> None:
+        """Drop the catalog a server reported as changed.
+        
+        Cached tool results of the server are dropped too when its resources changed.
+        """
+        self.invalidate_catalogs(name, kind)
+        if kind in (None, RESOURCES):
+            self._results.invalidate(name)
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the thread pool running batched tool calls, creating it on first use."""
+        with self._index_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=MCP_FANOUT_MAX_WORKERS,
+                                                    thread_name_prefix="mcp-tool")
+            return self._executor
+    
+    def _driver_name(self, driver: Optional[MCPServerDriver]) -> Optional[str]:
+        """Get the name a driver instance is registered under."""
+        if driver is None:
+            return None
+        if driver is self._active_driver:
+            return self._active_name
+        return next((name for name, d in self._drivers.items() if d is driver), None)
+    
+    def _route_tool(self, tool_name: str, server: Optional[str]) -> Optional[MCPServerDriver]:
+        """Get the driver that handles a tool call."""
+        if server:
+            return self._drivers.get(server)
+        if len(self._drivers) > 1:
+            resolved = self.get_tool_index().resolve(tool_name, self._active_name)
+            if resolved:
+                return self._drivers[resolved]
+        return self._active_driver
@@ -0,0 +1,113 @@
+"""
+MCP Catalog Cache Module
+
+This module caches the tool and resource catalogs of MCP servers, so that listing tools
+before an agent step does not need a round trip to the server. Catalogs expire after a
+TTL and are invalidated when a server reports that its lists changed. Tools are also
+indexed by name for constant-time lookup.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..cache_management.single_flight import SingleFlight
+from .routing import tool_name
+
+# Catalog cache configuration; a TTL of 0 disables caching
+MCP_CATALOG_TTL = float(os.environ.get("MCP_CATALOG_TTL", "300"))
+
+# Catalog kinds
+TOOLS = "tools"
+RESOURCES = "resources"
+
+class CatalogCache:
+    """Caches the tool and resource catalogs of each MCP server."""
+
+    def __init__(self, ttl: float = MCP_CATALOG_TTL):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl: Seconds a catalog is served from the cache before it is fetched again.
+        """
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        # (server, kind) -> (catalog, fetched_at)
+        self._catalogs: Dict[Tuple[str, str], Tuple[list, float]] = {}
+        self._tool_maps: Dict[str, Dict[str, Any]] = {}
+        self._single_flight = SingleFlight()
+
+    @property
+    def ttl(self) -> float:
+        """Seconds a catalog is served from the cache."""
+        return self._ttl
+
+    def get(self, server: str, kind: str, fetch: Callable[[], list]) -> list:
+        """
+        Get a catalog, fetching it if it is missing or expired.
+
+        Concurrent misses for the same catalog share a single fetch.
+
+        Args:
+            server: Name of the server.
+            kind: TOOLS or RESOURCES.
+            fetch: Callable fetching the catalog from the server.
+
+        Returns:
+            list: The catalog.
+        """
+        with self._lock:
+            entry = self._catalogs.get((server, kind))
+        if entry is not None and time.monotonic() - entry[1] < self._ttl:
+            return entry[0]
+        return self._single_flight.do(f"{server}:{kind}", lambda: self._fetch(server, kind, fetch))
+
+    def find_tool(self, server: str, name: str, fetch: Callable[[], list]) -> Optional[Any]:
+        """
+        Look up a tool of a server by name.
+
+        Args:
+            server: Name of the server.
+            name: Name of the tool.
+            fetch: Callable fetching the tool catalog from the server.
+
+        Returns:
+            Optional[Any]: The tool definition, or None if the server has no such tool.
+        """
+        catalog = self.get(server, TOOLS, fetch)
+        with self._lock:
+            tool_map = self._tool_maps.get(server)
+        if tool_map is None:
+            tool_map = _index_tools(catalog)
+        return tool_map.get(name)
+
+    def invalidate(self, server: Optional[str] = None, kind: Optional[str] = None) -> None:
+        """
+        Drop cached catalogs so they are fetched again on next use.
+
+        Args:
+            server: Server whose catalogs are dropped, or None for every server.
+            kind: TOOLS or RESOURCES, or None for both.
+        """
+        with self._lock:
+            for key in list(self._catalogs):
+                if (server is None or key[0] == server) and (kind is None or key[1] == kind):
+                    del self._catalogs[key]
+                    if key[1] == TOOLS:
+                        self._tool_maps.pop(key[0], None)
+
+    def _fetch(self, server: str, kind: str, fetch: Callable[[], list]) -> list:
+        """Fetch a catalog and store it unless caching is disabled."""
+        catalog = fetch()
+        if self._ttl > 0 and catalog is not None:
+            with self._lock:
+                self._catalogs[(server, kind)] = (catalog, time.monotonic())
+                if kind == TOOLS:
+                    self._tool_maps[server] = _index_tools(catalog)
+        return catalog
+
+def _index_tools(catalog: Optional[list]) -> Dict[str, Any]:
+    """Map tool names to their definitions."""
+    return {tool_name(tool): tool for tool in catalog or () if tool_name(tool) is not None}
@@ -0,0 +1,100 @@
+"""
+MCP Tool Fan-Out Module
+
+This module runs batches of independent tool calls concurrently, under a limit on the
+number of calls in flight and a timeout per call, and reports each outcome as soon as
+the call finishes.
+"""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Fan-out configuration
+MCP_FANOUT_MAX_WORKERS = int(os.environ.get("MCP_FANOUT_MAX_WORKERS", "32"))
+MCP_FANOUT_CONCURRENCY = int(os.environ.get("MCP_FANOUT_CONCURRENCY", "8"))
+MCP_FANOUT_TIMEOUT = float(os.environ.get("MCP_FANOUT_TIMEOUT", "30"))
+
+# Outcome states
+OK = "ok"
+ERROR = "error"
+TIMEOUT = "timeout"
+
+def iter_tool_calls(
+    executor: Executor,
+    use_tool: Callable[[str, dict, Optional[str]], Any],
+    calls: List[dict],
+    max_concurrency: int = MCP_FANOUT_CONCURRENCY,
+    timeout: Optional[float] = MCP_FANOUT_TIMEOUT,
+) -> Iterator[dict]:
+    """
+    Run tool calls concurrently and yield each outcome when it is ready.
+
+    A call that exceeds the timeout is reported as timed out and stops counting
+    against the concurrency limit; its thread finishes in the background because a
+    running call cannot be interrupted.
+
+    Args:
+        executor: Executor running the calls.
+        use_tool: Callable taking a tool name, arguments and optional server name.
+        calls: Tool invocations, each a dict with a "tool_name" and optional
+            "arguments", "server" and "id".
+        max_concurrency: Maximum number of calls in flight at the same time.
+        timeout: Seconds each call may run, or None for no limit.
+
+    Yields:
+        dict: Outcome of a call with its "index" in calls, "id", "tool_name",
+            "status" (ok, error or timeout), "result" or "error", and "elapsed" seconds.
+    """
+    pending = iter(enumerate(calls))
+    in_flight: Dict[Future, tuple] = {}
+
+    def submit_next() -> bool:
+        try:
+            index, call = next(pending)
+        except StopIteration:
+            return False
+        future = executor.submit(use_tool, call["tool_name"], call.get("arguments") or {},
+                                 call.get("server"))
+        in_flight[future] = (index, call, time.monotonic())
+        return True
+
+    while len(in_flight) < max(max_concurrency, 1) and submit_next():
+        pass
+    while in_flight:
+        now = time.monotonic()
+        wait_for = None
+        if timeout is not None:
+            deadline = min(started for _, _, started in in_flight.values()) + timeout
+            wait_for = max(deadline - now, 0)
+        done, _ = wait(list(in_flight), timeout=wait_for, return_when=FIRST_COMPLETED)
+        now = time.monotonic()
+        finished = list(done)
+        if timeout is not None:
+            finished += [
+                future for future, (_, _, started) in in_flight.items()
+                if future not in done and now - started >= timeout
+            ]
+        for future in finished:
+            index, call, started = in_flight.pop(future)
+            yield _outcome(index, call, future, now - started)
+            submit_next()
+
+def _outcome(index: int, call: dict, future: Future, elapsed: float) -> dict:
+    """Describe the outcome of a finished or timed-out call."""
+    outcome = {"index": index, "id": call.get("id"), "tool_name": call["tool_name"],
+               "elapsed": elapsed}
+    if not future.done():
+        future.cancel()
+        outcome.update(status=TIMEOUT, error="Tool call timed out")
+        return outcome
+    error = future.exception()
+    if error is not None:
+        outcome.update(status=ERROR, error=f"{type(error).__name__}: {error}")
+    elif future.result() is None:
+        outcome.update(status=ERROR,
+                       error="No MCP server handles the tool or tool execution failed")
+    else:
+        outcome.update(status=OK, result=future.result())
+    return outcome
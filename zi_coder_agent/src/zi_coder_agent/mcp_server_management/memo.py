@@ -0,0 +1,261 @@
+"""
+MCP Result Cache Module
+
+This module memoizes the results of idempotent MCP tool calls and resource reads, so
+that repeated read-only calls across agent turns are answered without a round trip to
+the server. Caching is opt-in: tool results are cached per tool by explicit rules, or
+for tools the server annotates as read-only when a default TTL is configured, and
+resource reads are cached when a resource TTL is configured.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..cache_management.memory import InMemoryCacheDriver
+from ..cache_management.single_flight import SingleFlight
+
+# Result cache configuration; a TTL of 0 disables caching
+MCP_TOOL_CACHE_TTL = float(os.environ.get("MCP_TOOL_CACHE_TTL", "0"))
+MCP_RESOURCE_CACHE_TTL = float(os.environ.get("MCP_RESOURCE_CACHE_TTL", "0"))
+MCP_TOOL_CACHE_RULES = os.environ.get("MCP_TOOL_CACHE_RULES", "")
+MCP_RESULT_CACHE_MAX_BYTES = int(
+    os.environ.get("MCP_RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+)
+MCP_RESULT_CACHE_STORE = os.environ.get("MCP_RESULT_CACHE_STORE", "memory")
+
+def arguments_hash(arguments: Optional[dict]) -> str:
+    """
+    Hash tool arguments independently of key order.
+
+    Args:
+        arguments: Arguments of a tool call.
+
+    Returns:
+        str: Hex digest identifying the arguments.
+    """
+    content = json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def parse_tool_rules(spec: str) -> Dict[Tuple[Optional[str], str], float]:
+    """
+    Parse tool cache rules of the form ``tool=ttl`` or ``server/tool=ttl``.
+
+    Args:
+        spec: Comma-separated rules, for example "read_file=60,git/git_log=10".
+
+    Returns:
+        Dict[Tuple[Optional[str], str], float]: TTL for each (server, tool) pair; the
+            server is None for rules that apply to every server.
+
+    Raises:
+        ValueError: If a rule is malformed.
+    """
+    rules = {}
+    for rule in filter(None, (part.strip() for part in spec.split(","))):
+        target, sep, ttl = rule.partition("=")
+        if not sep or not target.strip():
+            raise ValueError(f"Invalid tool cache rule '{rule}'")
+        server, _, tool = target.strip().rpartition("/")
+        rules[(server or None, tool)] = float(ttl)
+    return rules
+
+def is_read_only(tool: Any) -> bool:
+    """
+    Check whether a tool definition carries the MCP read-only annotation.
+
+    Args:
+        tool: A catalog entry, either a dict or an object with ``annotations``.
+
+    Returns:
+        bool: True if the tool is annotated with ``readOnlyHint``.
+    """
+    annotations = tool.get("annotations") if isinstance(tool, dict) else \
+        getattr(tool, "annotations", None)
+    if isinstance(annotations, dict):
+        return bool(annotations.get("readOnlyHint"))
+    return bool(getattr(annotations, "readOnlyHint", False))
+
+class ResultCache:
+    """
+    Caches tool results and resource contents per server.
+
+    Entries are stored in a cache backend under keys that include a generation number
+    per server; invalidating a server bumps its generation, so its old entries are no
+    longer read and expire on their own. None results and exceptions are not cached,
+    and concurrent misses for the same key share a single call.
+    """
+
+    def __init__(self, cache: Any = None, tool_ttl: float = MCP_TOOL_CACHE_TTL,
+                 resource_ttl: float = MCP_RESOURCE_CACHE_TTL,
+                 rules: Optional[Dict[Tuple[Optional[str], str], float]] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            cache: Cache backend providing get and set, such as CacheToolMarketplace.
+                Defaults to a private in-memory cache.
+            tool_ttl: Seconds results of tools annotated as read-only are cached.
+            resource_ttl: Seconds resource contents are cached.
+            rules: TTL for each (server, tool) pair, overriding the annotations; a
+                server of None applies to every server and a TTL of 0 disables caching.
+        """
+        self._cache = cache if cache is not None else InMemoryCacheDriver(
+            max_bytes=MCP_RESULT_CACHE_MAX_BYTES
+        )
+        self.tool_ttl = tool_ttl
+        self.resource_ttl = resource_ttl
+        self._rules = dict(rules if rules is not None else parse_tool_rules(MCP_TOOL_CACHE_RULES))
+        self._lock = threading.Lock()
+        self._epoch = 0
+        self._generations: Dict[str, int] = {}
+        self._stats = {"hits": 0, "misses": 0}
+        self._single_flight = SingleFlight()
+
+    def set_backend(self, cache: Any) -> None:
+        """
+        Store entries in another cache backend.
+
+        Args:
+            cache: Cache backend providing get and set.
+        """
+        self._cache = cache
+        self.invalidate()
+
+    def set_rule(self, tool_name: str, ttl: float, server: Optional[str] = None) -> None:
+        """
+        Set how long the results of a tool are cached.
+
+        Args:
+            tool_name: Name of the tool.
+            ttl: Seconds results are cached; 0 disables caching of the tool.
+            server: Server the rule applies to, or None for every server.
+        """
+        with self._lock:
+            self._rules[(server, tool_name)] = ttl
+
+    def rules(self) -> Dict[str, float]:
+        """
+        Describe the tool rules.
+
+        Returns:
+            Dict[str, float]: TTL of each rule, keyed by ``tool`` or ``server/tool``.
+        """
+        with self._lock:
+            return {
+                f"{server}/{tool}" if server else tool: ttl
+                for (server, tool), ttl in self._rules.items()
+            }
+
+    def ttl_for_tool(self, server: str, tool_name: str,
+                     definition: Callable[[], Any]) -> float:
+        """
+        Get how long the results of a tool are cached.
+
+        Args:
+            server: Name of the server handling the call.
+            tool_name: Name of the tool.
+            definition: Callable returning the tool definition; it is only called
+                when no rule applies and read-only tools are cached.
+
+        Returns:
+            float: Seconds the result is cached, or 0 if it is not cached.
+        """
+        with self._lock:
+            for key in ((server, tool_name), (None, tool_name)):
+                if key in self._rules:
+                    return self._rules[key]
+        if self.tool_ttl > 0 and is_read_only(definition() or {}):
+            return self.tool_ttl
+        return 0
+
+    def call_tool(self, server: str, tool_name: str, arguments: Optional[dict], ttl: float,
+                  call: Callable[[], Any]) -> Any:
+        """
+        Get a cached tool result, or call the tool and cache its result.
+
+        Args:
+            server: Name of the server handling the call.
+            tool_name: Name of the tool.
+            arguments: Arguments of the call.
+            ttl: Seconds the result is cached; 0 calls the tool without caching.
+            call: Callable running the tool call.
+
+        Returns:
+            Any: The tool result.
+        """
+        if ttl <= 0:
+            return call()
+        return self._get_or_call(
+            self._key(server, "tool", f"{tool_name}:{arguments_hash(arguments)}"), ttl, call
+        )
+
+    def read_resource(self, server: str, uri: str, read: Callable[[], Any]) -> Any:
+        """
+        Get cached resource contents, or read the resource and cache its contents.
+
+        Args:
+            server: Name of the server providing the resource.
+            uri: URI of the resource.
+            read: Callable reading the resource.
+
+        Returns:
+            Any: The resource contents.
+        """
+        if self.resource_ttl <= 0:
+            return read()
+        return self._get_or_call(self._key(server, "resource", uri), self.resource_ttl, read)
+
+    def invalidate(self, server: Optional[str] = None) -> None:
+        """
+        Stop serving cached results.
+
+        Args:
+            server: Server whose results are dropped, or None for every server.
+        """
+        with self._lock:
+            if server is None:
+                self._epoch += 1
+            else:
+                self._generations[server] = self._generations.get(server, 0) + 1
+
+    def get_stats(self) -> dict:
+        """
+        Get cache statistics.
+
+        Returns:
+            dict: Hit and miss counts, TTLs and tool rules.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        return dict(stats, tool_ttl=self.tool_ttl, resource_ttl=self.resource_ttl,
+                    rules=self.rules())
+
+    def _key(self, server: str, kind: str, name: str) -> str:
+        with self._lock:
+            generation = f"{self._epoch}.{self._generations.get(server, 0)}"
+        return f"mcp:{generation}:{server}:{kind}:{name}"
+
+    def _get_or_call(self, key: str, ttl: float, call: Callable[[], Any]) -> Any:
+        value = self._cache.get(key)
+        if value is not None:
+            self._count("hits")
+            return value
+        return self._single_flight.do(key, lambda: self._call_and_store(key, ttl, call))
+
+    def _call_and_store(self, key: str, ttl: float, call: Callable[[], Any]) -> Any:
+        value = self._cache.get(key)
+        if value is not None:
+            self._count("hits")
+            return value
+        self._count("misses")
+        value = call()
+        if value is not None:
+            self._cache.set(key, value, ttl)
+        return value
+
+    def _count(self, stat: str) -> None:
+        with self._lock:
+            self._stats[stat] += 1
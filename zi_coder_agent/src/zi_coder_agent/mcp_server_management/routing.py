@@ -0,0 +1,113 @@
+"""
+MCP Tool Routing Module
+
+This module merges the tool catalogs of several MCP servers into one index, so that a
+tool call can be routed to the server providing the tool, and runs calls against
+several servers concurrently.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# Maximum number of servers contacted concurrently
+MCP_MAX_PARALLEL_SERVERS = int(os.environ.get("MCP_MAX_PARALLEL_SERVERS", "8"))
+
+def tool_name(tool: Any) -> Optional[str]:
+    """
+    Get the name of a tool from a server's tool catalog.
+
+    Args:
+        tool: A catalog entry, either a tool name or a dict or object with a name.
+
+    Returns:
+        Optional[str]: The tool name, or None if the entry has no name.
+    """
+    if isinstance(tool, str):
+        return tool
+    if isinstance(tool, dict):
+        return tool.get("name")
+    return getattr(tool, "name", None)
+
+def run_concurrently(calls: Dict[str, Callable[[], Any]],
+                     max_workers: int = MCP_MAX_PARALLEL_SERVERS) -> Dict[str, Any]:
+    """
+    Run several calls on a thread pool and collect their outcomes.
+
+    Args:
+        calls: Mapping of names to the callables to run.
+        max_workers: Maximum number of calls running at the same time.
+
+    Returns:
+        Dict[str, Any]: Return value of each call, or the exception it raised.
+    """
+    if len(calls) <= 1:
+        # Avoid starting a thread pool for a single call
+        return {name: _run(call) for name, call in calls.items()}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(calls))) as executor:
+        futures = {name: executor.submit(_run, call) for name, call in calls.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+def _run(call: Callable[[], Any]) -> Any:
+    """Run a call, returning the exception it raises instead of raising it."""
+    try:
+        return call()
+    except Exception as e:
+        return e
+
+class ToolIndex:
+    """Maps tool names to the servers providing them, in server registration order."""
+
+    def __init__(self, catalogs: Optional[Dict[str, list]] = None):
+        """
+        Build the index from server tool catalogs.
+
+        Args:
+            catalogs: Mapping of server names to their tool catalogs.
+        """
+        self._servers: Dict[str, List[str]] = {}
+        for server, tools in (catalogs or {}).items():
+            for tool in tools or ():
+                name = tool_name(tool)
+                if name is not None and server not in self._servers.get(name, ()):
+                    self._servers.setdefault(name, []).append(server)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._servers
+
+    def servers_for(self, name: str) -> List[str]:
+        """
+        Get the servers providing a tool.
+
+        Args:
+            name: The tool name.
+
+        Returns:
+            List[str]: Names of the servers providing the tool.
+        """
+        return list(self._servers.get(name, ()))
+
+    def resolve(self, name: str, preferred: Optional[str] = None) -> Optional[str]:
+        """
+        Choose the server that handles a tool call.
+
+        Args:
+            name: The tool name.
+            preferred: Server chosen when it is one of several providing the tool.
+
+        Returns:
+            Optional[str]: The chosen server, or None if no server provides the tool.
+        """
+        servers = self._servers.get(name)
+        if not servers:
+            return None
+        return preferred if preferred in servers else servers[0]
+
+    def to_dict(self) -> Dict[str, List[str]]:
+        """
+        Describe the index.
+
+        Returns:
+            Dict[str, List[str]]: Servers providing each tool.
+        """
+        return {name: list(servers) for name, servers in self._servers.items()}
@@ -0,0 +1,372 @@
+"""
+MCP Session Pool Module
+
+This module keeps a pool of driver sessions per MCP server, so that the initialize
+handshake is paid once instead of on the request path. Connected sessions that sit
+idle are pinged to keep them warm, sessions that fail are reconnected in the
+background with exponential backoff, and the number of calls in flight on each
+session is capped.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Session pool configuration
+MCP_SESSION_POOL_SIZE = int(os.environ.get("MCP_SESSION_POOL_SIZE", "1"))
+MCP_SESSION_MAX_IN_FLIGHT = int(os.environ.get("MCP_SESSION_MAX_IN_FLIGHT", "16"))
+MCP_SESSION_ACQUIRE_TIMEOUT = float(os.environ.get("MCP_SESSION_ACQUIRE_TIMEOUT", "30"))
+MCP_KEEPALIVE_INTERVAL = float(os.environ.get("MCP_KEEPALIVE_INTERVAL", "30"))
+MCP_SESSION_MAINTAIN_INTERVAL = float(os.environ.get("MCP_SESSION_MAINTAIN_INTERVAL", "1"))
+MCP_RECONNECT_BACKOFF_BASE = float(os.environ.get("MCP_RECONNECT_BACKOFF_BASE", "0.5"))
+MCP_RECONNECT_BACKOFF_MAX = float(os.environ.get("MCP_RECONNECT_BACKOFF_MAX", "30"))
+
+logger = logging.getLogger(__name__)
+
+# Session states
+IDLE = "idle"
+CONNECTED = "connected"
+BROKEN = "broken"
+CLOSED = "closed"
+
+# Exceptions raised by a call that mean the session itself has failed
+CONNECTION_ERRORS = (ConnectionError, EOFError, OSError, TimeoutError)
+
+class SessionUnavailableError(RuntimeError):
+    """Raised when no session of a server can take a call."""
+
+class Session:
+    """One driver instance of a session pool and its connection state."""
+
+    def __init__(self, driver: Any):
+        self.driver = driver
+        self.state = IDLE
+        self.in_flight = 0
+        self.failures = 0
+        self.retry_at = 0.0
+        self.last_used = time.monotonic()
+        self.last_error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        """Describe the session."""
+        return {
+            "state": self.state,
+            "in_flight": self.in_flight,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+class SessionPool:
+    """
+    Pool of sessions to one MCP server.
+
+    Sessions start idle and are usable without connecting, as drivers were before
+    pooling. Once the pool is connected, idle connected sessions are pinged every
+    keepalive interval, and sessions whose calls fail with a connection error are
+    marked broken and reconnected with exponential backoff. Calls go to the usable
+    session with the fewest calls in flight, and wait while every session is at its
+    in-flight limit.
+    """
+
+    def __init__(self, factory: Callable[[], Any], size: int = MCP_SESSION_POOL_SIZE,
+                 max_in_flight: int = MCP_SESSION_MAX_IN_FLIGHT,
+                 acquire_timeout: float = MCP_SESSION_ACQUIRE_TIMEOUT,
+                 keepalive_interval: float = MCP_KEEPALIVE_INTERVAL,
+                 backoff_base: float = MCP_RECONNECT_BACKOFF_BASE,
+                 backoff_max: float = MCP_RECONNECT_BACKOFF_MAX,
+                 primary: Any = None):
+        """
+        Initialize the pool.
+
+        Args:
+            factory: Callable creating a driver instance.
+            size: Number of sessions in the pool.
+            max_in_flight: Maximum number of calls in flight on each session.
+            acquire_timeout: Seconds a call waits for a session with spare capacity.
+            keepalive_interval: Seconds a connected session may sit idle before it is pinged.
+            backoff_base: Delay before the first reconnect attempt in seconds.
+            backoff_max: Longest delay between reconnect attempts in seconds.
+            primary: Existing driver instance used as the first session.
+        """
+        drivers = [primary if primary is not None else factory()]
+        drivers += [factory() for _ in range(max(size, 1) - 1)]
+        self.sessions: List[Session] = [Session(driver) for driver in drivers]
+        self._max_in_flight = max(max_in_flight, 1)
+        self._acquire_timeout = acquire_timeout
+        self._keepalive_interval = keepalive_interval
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._connected = False
+        self._condition = threading.Condition()
+
+    @property
+    def primary(self) -> Any:
+        """Driver instance of the first session."""
+        return self.sessions[0].driver
+
+    def connect(self) -> bool:
+        """
+        Connect every session of the pool.
+
+        Returns:
+            bool: True if at least one session connected.
+        """
+        with self._condition:
+            self._connected = True
+            for session in self.sessions:
+                session.failures = 0
+                session.retry_at = 0.0
+        return any([self._reconnect(session) for session in self.sessions])
+
+    def disconnect(self) -> bool:
+        """
+        Disconnect every session and stop keeping the pool alive.
+
+        Returns:
+            bool: True if every session disconnected.
+        """
+        with self._condition:
+            self._connected = False
+        succeeded = True
+        for session in self.sessions:
+            try:
+                succeeded = bool(session.driver.disconnect()) and succeeded
+            except Exception as e:
+                session.last_error = f"{type(e).__name__}: {e}"
+                succeeded = False
+            with self._condition:
+                session.state = IDLE
+                self._condition.notify_all()
+        return succeeded
+
+    def close(self) -> None:
+        """Disconnect the pool if it is connected, and refuse further calls."""
+        if self._connected:
+            self.disconnect()
+        with self._condition:
+            for session in self.sessions:
+                session.state = CLOSED
+            self._condition.notify_all()
+
+    def call(self, operation: Callable[[Any], Any]) -> Any:
+        """
+        Run an operation on a session of the pool.
+
+        Args:
+            operation: Callable taking a driver instance.
+
+        Returns:
+            Any: Return value of the operation.
+
+        Raises:
+            SessionUnavailableError: If no session can take the call in time.
+        """
+        session = self._acquire()
+        try:
+            result = operation(session.driver)
+        except CONNECTION_ERRORS as e:
+            self._release(session, e)
+            raise
+        except BaseException:
+            self._release(session)
+            raise
+        self._release(session)
+        return result
+
+    def maintain(self) -> None:
+        """Ping idle connected sessions and reconnect broken ones that are due."""
+        now = time.monotonic()
+        with self._condition:
+            if not self._connected:
+                return
+            due = [s for s in self.sessions if s.state == BROKEN and now >= s.retry_at]
+            idle = [
+                s for s in self.sessions
+                if s.state == CONNECTED and s.in_flight == 0
+                and now - s.last_used >= self._keepalive_interval
+            ]
+            for session in idle:
+                session.in_flight += 1
+        for session in due:
+            self._reconnect(session)
+        for session in idle:
+            try:
+                healthy = session.driver.ping()
+                error = None if healthy else ConnectionError("Ping failed")
+            except Exception as e:
+                error = e
+            self._release(session, error)
+
+    def to_dict(self) -> dict:
+        """
+        Describe the pool.
+
+        Returns:
+            dict: Whether the pool is connected, and the state of each session.
+        """
+        with self._condition:
+            return {
+                "connected": self._connected,
+                "max_in_flight": self._max_in_flight,
+                "sessions": [session.to_dict() for session in self.sessions],
+            }
+
+    def _acquire(self) -> Session:
+        """Reserve a slot on the least loaded usable session."""
+        deadline = time.monotonic() + self._acquire_timeout
+        with self._condition:
+            while True:
+                usable = [s for s in self.sessions if s.state in (IDLE, CONNECTED)]
+                if not usable:
+                    due = [s for s in self.sessions
+                           if s.state == BROKEN and time.monotonic() >= s.retry_at]
+                    if not due:
+                        raise SessionUnavailableError("No healthy session; reconnect pending")
+                    session = due[0]
+                    # Reconnect on the request path only when no session is usable
+                    session.retry_at = time.monotonic() + self._backoff(session.failures)
+                    self._condition.release()
+                    try:
+                        self._reconnect(session)
+                    finally:
+                        self._condition.acquire()
+                    continue
+                available = [s for s in usable if s.in_flight < self._max_in_flight]
+                if available:
+                    session = min(available, key=lambda s: s.in_flight)
+                    session.in_flight += 1
+                    return session
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise SessionUnavailableError("Every session is at its in-flight limit")
+                self._condition.wait(remaining)
+
+    def _release(self, session: Session, error: Optional[BaseException] = None) -> None:
+        """Free a slot, marking the session broken if it failed with a connection error."""
+        with self._condition:
+            session.in_flight -= 1
+            session.last_used = time.monotonic()
+            if error is not None and session.state != CLOSED:
+                self._mark_broken(session, error)
+            self._condition.notify_all()
+
+    def _reconnect(self, session: Session) -> bool:
+        """Connect a session, scheduling the next attempt with backoff if it fails."""
+        try:
+            connected = bool(session.driver.connect())
+            error = None if connected else ConnectionError("Connect failed")
+        except Exception as e:
+            connected, error = False, e
+        with self._condition:
+            if session.state == CLOSED:
+                return False
+            if connected:
+                session.state = CONNECTED
+                session.failures = 0
+                session.last_used = time.monotonic()
+            else:
+                self._mark_broken(session, error)
+            self._condition.notify_all()
+        return connected
+
+    def _mark_broken(self, session: Session, error: BaseException) -> None:
+        """Mark a session broken and schedule its reconnect; the caller holds the condition."""
+        session.state = BROKEN
+        session.last_error = f"{type(error).__name__}: {error}"
+        session.retry_at = time.monotonic() + self._backoff(session.failures)
+        session.failures += 1
+
+    def _backoff(self, failures: int) -> float:
+        """Delay before the next reconnect attempt, with jitter."""
+        delay = min(self._backoff_base * 2 ** failures, self._backoff_max)
+        return delay * random.uniform(0.5, 1.0)
+
+class SessionManager:
+    """Runs keepalive and reconnect maintenance for session pools in a background thread."""
+
+    def __init__(self, interval: float = MCP_SESSION_MAINTAIN_INTERVAL):
+        """
+        Initialize the manager.
+
+        Args:
+            interval: Seconds between maintenance passes; 0 disables the background thread.
+        """
+        self._interval = interval
+        self._pools: Dict[str, SessionPool] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, name: str, pool: SessionPool) -> Optional[SessionPool]:
+        """
+        Manage a pool, replacing the pool previously registered under the name.
+
+        Args:
+            name: Name of the server.
+            pool: The session pool.
+
+        Returns:
+            Optional[SessionPool]: The replaced pool, if any.
+        """
+        with self._lock:
+            replaced = self._pools.get(name)
+            self._pools[name] = pool
+        return replaced
+
+    def start(self) -> None:
+        """Start the background maintenance thread unless it is running or disabled."""
+        with self._lock:
+            if self._interval > 0 and self._thread is None:
+                # Each thread gets its own event, so a stopped thread cannot be revived
+                self._stop = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(self._stop,),
+                                                name="mcp-keepalive", daemon=True)
+                self._thread.start()
+
+    def get(self, name: str) -> Optional[SessionPool]:
+        """
+        Get the pool of a server.
+
+        Args:
+            name: Name of the server.
+
+        Returns:
+            Optional[SessionPool]: The pool, or None if the server is unknown.
+        """
+        with self._lock:
+            return self._pools.get(name)
+
+    def maintain(self) -> None:
+        """Run one maintenance pass over every pool."""
+        with self._lock:
+            pools = list(self._pools.items())
+        for name, pool in pools:
+            try:
+                pool.maintain()
+            except Exception:
+                logger.exception("Maintenance of MCP sessions for %s failed", name)
+
+    def to_dict(self) -> Dict[str, dict]:
+        """
+        Describe every pool.
+
+        Returns:
+            Dict[str, dict]: State of the pool of each server.
+        """
+        with self._lock:
+            pools = list(self._pools.items())
+        return {name: pool.to_dict() for name, pool in pools}
+
+    def stop(self) -> None:
+        """Stop the background maintenance thread; start() runs a new one."""
+        with self._lock:
+            self._stop.set()
+            self._thread = None
+
+    def _run(self, stop: threading.Event) -> None:
+        """Run maintenance passes every interval until the event is set."""
+        while not stop.wait(self._interval):
+            self.maintain()
@@ -6,7 +6,24 @@ It is designed with extensibility in mind, following SOLID principles and MCP sp
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Type, Optional
+from typing import Dict, Iterator, List, Type, Optional
+from .batching import BatchScheduler, MODEL_BATCH_MAX_SIZE, MODEL_BATCH_WINDOW
+from .response_cache import ModelResponseCache, MODEL_CACHE_TTL
+from .routing import (
+    ModelRouter, MODEL_ROUTING_STRATEGY, WEIGHTED, LEAST_OUTSTANDING, STRATEGIES
+)
+from .resilience import (
+    CircuitBreaker, DriverGuard, CircuitOpenError, ModelBusyError, MODEL_MAX_CONCURRENCY,
+    MODEL_QUERY_TIMEOUT, MODEL_BREAKER_FAILURE_THRESHOLD, MODEL_BREAKER_RESET_TIMEOUT
+)
+from .semantic_cache import (
+    Embedder, HashingEmbedder, SemanticCache, VectorIndex, MODEL_SEMANTIC_CACHE_TTL,
+    MODEL_SEMANTIC_CACHE_THRESHOLD, MODEL_SEMANTIC_CACHE_MAX_ENTRIES
+)
+from .context import (
+    AssembledPrompt, Context, ContextOverflowError, ContextStore, estimate_tokens,
+    MODEL_CONTEXT_TTL, MODEL_CONTEXT_MAX_HANDLES, MODEL_CONTEXT_TOKEN_BUDGET
+)
 
 class ModelDriver(ABC):
     """Abstract base class for model drivers."""
@@ -25,13 +42,113 @@ class ModelDriver(ABC):
     def query(self, input_data: str) -> str:
         """Send a query to the model and return the response."""
         pass
+    
+    def stream(self, input_data: str) -> Iterator[str]:
+        """
+        Send a query to the model and yield the response in chunks as they are produced.
+        
+        Drivers whose backend supports incremental output should override this. The
+        default implementation yields the complete response from query() as one chunk.
+        
+        Args:
+            input_data: The input data to send to the model.
+            
+        Yields:
+            str: Successive chunks of the response.
+        """
+        yield self.query(input_data)
+    
+    def query_batch(self, inputs: List[str]) -> List[str]:
+        """
+        Send several queries to the model and return their responses in order.
+        
+        Drivers whose backend accepts batched input should override this. The default
+        implementation sends each query individually.
+        
+        Args:
+            inputs: The input data for each query.
+            
+        Returns:
+            List[str]: Responses from the model, one per input, in the same order.
+        """
+        return [self.query(input_data) for input_data in inputs]
+    
+    def get_generation_parameters(self) -> dict:
+        """
+        Get the generation parameters that affect this driver's responses.
+        
+        Drivers should return settings such as the model name, temperature or maximum
+        token count, so that cached responses are only reused for identical settings.
+        
+        Returns:
+            dict: Generation parameters, empty by default.
+        """
+        return {}
+    
+    def count_tokens(self, text: str) -> int:
+        """
+        Count the tokens of a text as the model's tokenizer would.
+        
+        Drivers with access to their model's tokenizer should override this. The
+        default implementation estimates the count from word pieces and symbols.
+        
+        Args:
+            text: The text to count.
+            
+        Returns:
+            int: Number of tokens.
+        """
+        return estimate_tokens(text)
+    
+    def get_token_budget(self) -> Optional[int]:
+        """
+        Get the number of prompt tokens the model accepts.
+        
+        Returns:
+            Optional[int]: Token budget of prompts assembled from contexts, or None to
+                use MODEL_CONTEXT_TOKEN_BUDGET.
+        """
+        return None
+    
+    def query_context(self, prefix: str, suffix: str, prefix_key: str) -> str:
+        """
+        Send a prompt assembled from a context to the model.
+        
+        The prefix holds the pinned segments of the context and stays identical across
+        turns until they change. Drivers whose backend caches prompt prefixes should
+        override this to mark or reference the prefix, for example by prefix_key. The
+        default implementation sends the complete prompt to query().
+        
+        Args:
+            prefix: Pinned segments of the context.
+            suffix: Messages of the context that fit the token budget.
+            prefix_key: Hash identifying the prefix.
+            
+        Returns:
+            str: Response from the model.
+        """
+        return self.query(AssembledPrompt(prefix, suffix, prefix_key, 0, 0).text)
 
 class ModelMarketplace:
-    """Manages multiple model drivers for different LLM models."""
+    """
+    Manages multiple model drivers for different LLM models.
+    
+    Queries go to the active driver or group unless they name a driver or group
+    themselves. A group spreads its queries over several drivers, such as replicas of
+    one backend, and fails over to the next member when a driver fails.
+    """
     
     def __init__(self):
         self._drivers: Dict[str, ModelDriver] = {}
         self._active_driver: Optional[ModelDriver] = None
+        self._active_driver_name: Optional[str] = None
+        self._batch_scheduler = None
+        self._response_cache = None
+        self._semantic_cache = None
+        self._router = ModelRouter()
+        self._guards: Dict[str, DriverGuard] = {}
+        self._token_budgets: Dict[str, int] = {}
+        self._contexts = ContextStore()
     
     def register_driver(self, name: str, driver: Type[ModelDriver]) -> None:
         """
@@ -42,54 +159,480 @@ class ModelMarketplace:
             driver: The driver class to register.
         """
         self._drivers[name] = driver()
+        self._guards[name] = DriverGuard()
+    
+    def configure_driver_limits(self, name: str, max_concurrency: Optional[int] = None,
+                                timeout: Optional[float] = None,
+                                failure_threshold: Optional[int] = None,
+                                reset_timeout: Optional[float] = None,
+                                token_budget: Optional[int] = None) -> bool:
+        """
+        Set the concurrency limit, deadline, circuit breaker and token budget of a driver.
+        
+        Settings left as None keep their current value. Reconfiguring a driver closes
+        its circuit breaker.
+        
+        Args:
+            name: Name of the driver.
+            max_concurrency: Maximum number of calls running on the driver; 0 for no limit.
+            timeout: Seconds a call may take, including waiting for a slot; 0 for no limit.
+            failure_threshold: Consecutive failures that open the circuit breaker; 0
+                disables the breaker.
+            reset_timeout: Seconds the circuit breaker stays open before a trial call.
+            token_budget: Maximum number of tokens of prompts assembled from contexts;
+                0 for no limit.
+            
+        Returns:
+            bool: True if the driver exists, False otherwise.
+        """
+        guard = self._guards.get(name)
+        if guard is None:
+            return False
+        if token_budget is not None:
+            self._token_budgets[name] = token_budget
+        breaker = guard.breaker.to_dict()
+        self._guards[name] = DriverGuard(
+            guard.max_concurrency if max_concurrency is None else max_concurrency,
+            guard.timeout if timeout is None else timeout,
+            breaker["failure_threshold"] if failure_threshold is None else failure_threshold,
+            breaker["reset_timeout"] if reset_timeout is None else reset_timeout,
+        )
+        return True
+    
+    def get_driver_health(self) -> Dict[str, dict]:
+        """
+        Describe the limits, load and circuit breaker of every driver.
+        
+        Returns:
+            Dict[str, dict]: Limits, calls in flight, timeouts, breaker state and token
+                budget per driver.
+        """
+        return {
+            name: dict(guard.to_dict(), token_budget=self._token_budget(name))
+            for name, guard in self._guards.items()
+        }
+    
+    def reset_circuit_breaker(self, name: str) -> bool:
+        """
+        Close the circuit breaker of a driver so calls reach it again.
+        
+        Args:
+            name: Name of the driver.
+            
+        Returns:
+            bool: True if the driver exists, False otherwise.
+        """
+        guard = self._guards.get(name)
+        if guard is None:
+            return False
+        guard.breaker.reset()
+        return True
+    
+    def register_group(self, name: str, members: List[str], weights: Optional[List[float]] = None,
+                       strategy: str = MODEL_ROUTING_STRATEGY) -> None:
+        """
+        Register a group of drivers that share the queries sent to the group.
+        
+        Args:
+            name: Unique identifier for the group; it may not be a driver name.
+            members: Names of the registered drivers in the group.
+            weights: Relative share of queries of each member, 1 for each by default.
+            strategy: "weighted" for smooth weighted round-robin, or
+                "least_outstanding" for the member with the fewest requests in flight
+                relative to its weight.
+            
+        Raises:
+            ValueError: If the name is taken by a driver, a member is not registered,
+                or the weights or strategy are invalid.
+        """
+        if name in self._drivers:
+            raise ValueError(f"{name} is already a driver name")
+        unknown = [member for member in members if member not in self._drivers]
+        if unknown:
+            raise ValueError(f"Unknown drivers {unknown}")
+        self._router.add_group(name, members, weights, strategy)
     
     def set_active_driver(self, name: str) -> bool:
         """
-        Set the active driver for model interactions.
+        Set the active driver or group for model interactions.
         
         Args:
-            name: Name of the driver to activate.
+            name: Name of the driver or group to activate.
             
         Returns:
             bool: True if driver was set successfully, False otherwise.
         """
-        if name in self._drivers:
-            self._active_driver = self._drivers[name]
+        if name in self._drivers or self._router.is_group(name):
+            self._active_driver = self._drivers[self._router.members(name)[0]]
+            self._active_driver_name = name
             return True
         return False
     
     def connect(self) -> bool:
         """
-        Connect to the active model driver.
+        Connect to the active model driver, or to every driver of the active group.
         
         Returns:
             bool: True if connection was successful, False otherwise.
         """
-        if self._active_driver:
-            return self._active_driver.connect()
+        drivers = self._resolve(None)
+        if drivers:
+            return all([self._drivers[name].connect() for name in drivers])
         return False
     
     def disconnect(self) -> bool:
         """
-        Disconnect from the active model driver.
+        Disconnect from the active model driver, or from every driver of the active group.
         
         Returns:
             bool: True if disconnection was successful, False otherwise.
         """
-        if self._active_driver:
-            return self._active_driver.disconnect()
+        drivers = self._resolve(None)
+        if drivers:
+            return all([self._drivers[name].disconnect() for name in drivers])
         return False
     
-    def query(self, input_data: str) -> Optional[str]:
+    def query(self, input_data: str, model: Optional[str] = None) -> Optional[str]:
         """
-        Send a query to the active model driver.
+        Send a query to a model driver or group.
         
         Args:
             input_data: The input data to send to the model.
+            model: Name of the driver or group to query instead of the active one.
             
         Returns:
-            Optional[str]: Response from the model, or None if no active driver.
+            Optional[str]: Response from the model, or None if no such driver.
         """
-        if self._active_driver:
-            return self._active_driver.query(input_data)
+        target = model or self._active_driver_name
+        drivers = self._resolve(target)
+        if drivers:
+            compute = lambda: self._router.execute(
+                target, lambda name: self._guards[name].call(
+                    lambda: self._dispatch_query(self._drivers[name], input_data)
+                )
+            )
+            parameters = None
+            if self._semantic_cache is not None:
+                parameters = self._drivers[drivers[0]].get_generation_parameters()
+                scope = SemanticCache.make_scope(target, parameters)
+                call_model = compute
+                compute = lambda: self._semantic_cache.get_or_compute(scope, input_data, call_model)
+            if self._response_cache is None:
+                return compute()
+            if parameters is None:
+                parameters = self._drivers[drivers[0]].get_generation_parameters()
+            key = self._response_cache.make_key(target, input_data, parameters)
+            return self._response_cache.get_or_compute(key, compute)
         return None
+    
+    def create_context(self, model: Optional[str] = None,
+                       deltas: Optional[List[dict]] = None) -> Optional[dict]:
+        """
+        Open a context handle that keeps a prompt on the server across queries.
+        
+        Args:
+            model: Name of the driver or group the context is queried on, or None for
+                the active one at query time.
+            deltas: Initial deltas, such as the system prompt and repository files.
+            
+        Returns:
+            Optional[dict]: Description of the context, or None if no such driver.
+            
+        Raises:
+            ValueError: If a delta is malformed.
+        """
+        drivers = self._resolve(model)
+        if not drivers:
+            return None
+        # Segments are counted once with the tokenizer of the first driver
+        context = self._contexts.create(model, self._drivers[drivers[0]].count_tokens)
+        try:
+            context.apply(deltas or [])
+        except ValueError:
+            self._contexts.delete(context.handle)
+            raise
+        return context.to_dict()
+    
+    def update_context(self, handle: str, deltas: List[dict]) -> Optional[dict]:
+        """
+        Apply deltas to a context.
+        
+        Args:
+            handle: Identifier of the context.
+            deltas: Deltas in the order they are applied.
+            
+        Returns:
+            Optional[dict]: Description of the context, or None if the handle is unknown.
+            
+        Raises:
+            ValueError: If a delta is malformed; the context is left unchanged.
+        """
+        context = self._contexts.get(handle)
+        if context is None:
+            return None
+        with context.lock:
+            context.apply(deltas)
+            return context.to_dict()
+    
+    def get_context(self, handle: str) -> Optional[dict]:
+        """
+        Describe a context.
+        
+        Args:
+            handle: Identifier of the context.
+            
+        Returns:
+            Optional[dict]: Description of the context, or None if the handle is unknown.
+        """
+        context = self._contexts.get(handle)
+        if context is None:
+            return None
+        with context.lock:
+            return context.to_dict()
+    
+    def delete_context(self, handle: str) -> bool:
+        """
+        Close a context handle.
+        
+        Args:
+            handle: Identifier of the context.
+            
+        Returns:
+            bool: True if the handle was open.
+        """
+        return self._contexts.delete(handle)
+    
+    def query_context(self, handle: str, deltas: Optional[List[dict]] = None,
+                      record_response: bool = True) -> Optional[dict]:
+        """
+        Apply deltas to a context and query its model with the assembled prompt.
+        
+        The prompt is assembled within the token budget of the driver answering it, so
+        a group may drop fewer messages on members with a larger budget. Queries on a
+        context bypass the response caches, since they depend on the conversation.
+        
+        The deltas are applied to a copy of the context and only kept once the query
+        succeeds, so a failed query can be retried with the same deltas.
+        
+        Args:
+            handle: Identifier of the context.
+            deltas: Deltas applied before the query, typically the new user message.
+            record_response: Whether to append the response to the context as an
+                assistant message.
+            
+        Returns:
+            Optional[dict]: The response, the number of prompt tokens and of dropped
+                messages, and the context, or None if the handle or driver is unknown
+                or the query failed.
+            
+        Raises:
+            ValueError: If a delta is malformed.
+            ContextOverflowError: If the pinned segments and latest message exceed the
+                token budget.
+        """
+        context = self._contexts.get(handle)
+        if context is None:
+            return None
+        with context.lock:
+            pending = context.copy()
+            base_version = context.version
+        pending.apply(deltas or [])
+        target = context.model or self._active_driver_name
+        if not self._resolve(target):
+            return None
+        assembled = {}
+        
+        def call(name: str) -> Optional[str]:
+            prompt = pending.assemble(self._token_budget(name))
+            assembled["prompt"] = prompt
+            driver = self._drivers[name]
+            return self._guards[name].call(
+                lambda: driver.query_context(prompt.prefix, prompt.suffix, prompt.prefix_key)
+            )
+        
+        result = self._router.execute(target, call)
+        if result is None:
+            return None
+        with context.lock:
+            if context.version == base_version:
+                context.update(pending)
+            else:
+                # Another query changed the context meanwhile; keep its changes too
+                context.apply(deltas or [])
+            if record_response:
+                context.append(result, "assistant")
+            prompt = assembled["prompt"]
+            return {
+                "result": result,
+                "tokens": prompt.tokens,
+                "dropped": prompt.dropped,
+                "context": context.to_dict(),
+            }
+    
+    def _token_budget(self, name: str) -> int:
+        """Get the prompt token budget of a driver; 0 for no limit."""
+        if name in self._token_budgets:
+            return self._token_budgets[name]
+        budget = self._drivers[name].get_token_budget()
+        return MODEL_CONTEXT_TOKEN_BUDGET if budget is None else budget
+    
+    def get_routing_stats(self) -> dict:
+        """
+        Get the groups and the load of each driver.
+        
+        Returns:
+            dict: Definition of each group, and the requests in flight, requests and
+                failures of each driver.
+        """
+        return self._router.get_stats()
+    
+    def _resolve(self, name: Optional[str]) -> Optional[List[str]]:
+        """Get the registered drivers of a driver or group name, or of the active one."""
+        name = name or self._active_driver_name
+        if name is None:
+            return None
+        drivers = [member for member in self._router.members(name) if member in self._drivers]
+        return drivers or None
+    
+    def _dispatch_query(self, driver: ModelDriver, input_data: str) -> Optional[str]:
+        """Send a query to a driver, through the batching scheduler when enabled."""
+        if self._batch_scheduler:
+            return self._batch_scheduler.submit(driver, input_data)
+        return driver.query(input_data)
+    
+    def enable_response_cache(self, cache, ttl: Optional[int] = MODEL_CACHE_TTL) -> None:
+        """
+        Memoize query responses in a cache backend.
+        
+        Args:
+            cache: Cache backend providing get(key) and set(key, value, ttl),
+                such as a CacheToolMarketplace.
+            ttl: Time to live of cached responses in seconds.
+        """
+        self._response_cache = ModelResponseCache(cache, ttl)
+    
+    def disable_response_cache(self) -> None:
+        """
+        Send every query to the model without consulting the response cache.
+        """
+        self._response_cache = None
+    
+    def get_cache_stats(self) -> Optional[dict]:
+        """
+        Get hit and miss statistics from the response cache.
+        
+        Returns:
+            Optional[dict]: Cache statistics, or None if the response cache is disabled.
+        """
+        if self._response_cache:
+            return self._response_cache.get_stats()
+        return None
+    
+    def enable_semantic_cache(self, embedder: Optional[Embedder] = None,
+                              threshold: float = MODEL_SEMANTIC_CACHE_THRESHOLD,
+                              ttl: Optional[int] = MODEL_SEMANTIC_CACHE_TTL,
+                              max_entries: int = MODEL_SEMANTIC_CACHE_MAX_ENTRIES) -> None:
+        """
+        Answer queries with the response to a sufficiently similar earlier prompt.
+        
+        The semantic cache is consulted after the exact response cache misses.
+        
+        Args:
+            embedder: Embedder turning prompts into vectors; defaults to HashingEmbedder.
+            threshold: Minimum cosine similarity for a cached response to be reused.
+            ttl: Time to live of cached responses in seconds.
+            max_entries: Maximum number of cached responses.
+        """
+        self._semantic_cache = SemanticCache(embedder, threshold, ttl, max_entries)
+    
+    def disable_semantic_cache(self) -> None:
+        """
+        Stop reusing responses of similar prompts.
+        """
+        self._semantic_cache = None
+    
+    def get_semantic_cache_stats(self) -> Optional[dict]:
+        """
+        Get hit and miss statistics from the semantic cache.
+        
+        Returns:
+            Optional[dict]: Cache statistics, or None if the semantic cache is disabled.
+        """
+        if self._semantic_cache:
+            return self._semantic_cache.get_stats()
+        return None
+    
+    def enable_batching(self, max_batch_size: int = 8, max_wait: float = 0.01) -> None:
+        """
+        Gather concurrent queries into batches for drivers that implement query_batch.
+        
+        Args:
+            max_batch_size: Maximum number of queries dispatched in one batch.
+            max_wait: Seconds a query waits for others to join its batch.
+        """
+        self._batch_scheduler = BatchScheduler(max_batch_size, max_wait)
+    
+    def disable_batching(self) -> None:
+        """
+        Send every query to the active driver individually.
+        """
+        self._batch_scheduler = None
+    
+    def get_batching_stats(self) -> Optional[dict]:
+        """
+        Get statistics from the batching scheduler.
+        
+        Returns:
+            Optional[dict]: Batching statistics, or None if batching is disabled.
+        """
+        if self._batch_scheduler:
+            return self._batch_scheduler.get_stats()
+        return None
+    
+    def stream(self, input_data: str, model: Optional[str] = None) -> Optional[Iterator[str]]:
+        """
+        Stream a query response from a model driver or group.
+        
+        Within a group, a driver that fails before producing its first chunk is
+        replaced by the next member; failures after that end the stream.
+        
+        Args:
+            input_data: The input data to send to the model.
+            model: Name of the driver or group to query instead of the active one.
+            
+        Returns:
+            Optional[Iterator[str]]: Iterator over response chunks, or None if no active driver.
+            
+        Raises:
+            CircuitOpenError: If the circuit breaker of a single driver rejects the call.
+            ModelBusyError: If a single driver is at its concurrency limit.
+        """
+        target = model or self._active_driver_name
+        if not self._resolve(target):
+            return None
+        if not self._router.is_group(target):
+            return self._guards[target].stream(lambda: self._drivers[target].stream(input_data))
+        return self._stream_with_failover(target, input_data)
+    
+    def _stream_with_failover(self, group: str, input_data: str) -> Iterator[str]:
+        """Stream from the first member of a group that produces a chunk."""
+        candidates = [name for name in self._router.candidates(group) if name in self._drivers]
+        for index, name in enumerate(candidates):
+            with self._router.track(name):
+                try:
+                    chunks = self._guards[name].stream(
+                        lambda name=name: self._drivers[name].stream(input_data)
+                    )
+                    first = next(chunks)
+                except StopIteration:
+                    return
+                except Exception:
+                    if index == len(candidates) - 1:
+                        raise
+                    continue
+                try:
+                    yield first
+                    yield from chunks
+                finally:
+                    chunks.close()
+                return
@@ -0,0 +1,133 @@
+"""
+Model Query Batching Module
+
+This module provides a micro-batching scheduler that gathers concurrent model queries
+within a short time window and dispatches them to a driver as a single batch.
+"""
+
+import os
+import threading
+from concurrent.futures import Future
+from typing import Dict, List
+
+# Batching configuration; batching is enabled in the API server when the batch size is above 1
+MODEL_BATCH_MAX_SIZE = int(os.environ.get("MODEL_BATCH_MAX_SIZE", "0"))
+MODEL_BATCH_WINDOW = float(os.environ.get("MODEL_BATCH_WINDOW_MS", "10")) / 1000
+
+class _PendingBatch:
+    """Queries collected for one driver that have not been dispatched yet."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.inputs: List[str] = []
+        self.futures: List[Future] = []
+        self.full = threading.Event()
+
+class BatchScheduler:
+    """
+    Gathers concurrent queries per driver and dispatches them through query_batch.
+
+    The first caller to arrive for a driver leads the batch: it waits until either the
+    batch is full or the time window elapses, then dispatches every query collected so
+    far and fans the results back out to the waiting callers. No background thread is
+    needed. Drivers that do not override query_batch are queried directly, so batching
+    adds no latency for backends that cannot make use of it.
+    """
+
+    def __init__(self, max_batch_size: int = 8, max_wait: float = 0.01):
+        """
+        Initialize the scheduler.
+
+        Args:
+            max_batch_size: Maximum number of queries dispatched in one batch.
+            max_wait: Seconds the leading query waits for others to join its batch.
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        self._lock = threading.Lock()
+        self._pending: Dict[int, _PendingBatch] = {}
+        self._stats = {"batches": 0, "queries": 0}
+
+    @staticmethod
+    def supports_batching(driver) -> bool:
+        """
+        Check whether a driver provides its own batch implementation.
+
+        Args:
+            driver: The model driver to check.
+
+        Returns:
+            bool: True if the driver overrides query_batch, False otherwise.
+        """
+        from . import ModelDriver
+        return type(driver).query_batch is not ModelDriver.query_batch
+
+    def submit(self, driver, input_data: str) -> str:
+        """
+        Submit a query and block until its batch has been processed.
+
+        Args:
+            driver: The model driver that should answer the query.
+            input_data: The input data to send to the model.
+
+        Returns:
+            str: Response from the model for this query.
+        """
+        if self._max_batch_size == 1 or not self.supports_batching(driver):
+            return driver.query(input_data)
+
+        key = id(driver)
+        future: Future = Future()
+        with self._lock:
+            batch = self._pending.get(key)
+            leader = batch is None
+            if leader:
+                batch = _PendingBatch(driver)
+                self._pending[key] = batch
+            batch.inputs.append(input_data)
+            batch.futures.append(future)
+            if len(batch.inputs) >= self._max_batch_size:
+                del self._pending[key]
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self._max_wait)
+            with self._lock:
+                if self._pending.get(key) is batch:
+                    del self._pending[key]
+            self._dispatch(batch)
+        return future.result()
+
+    def _dispatch(self, batch: _PendingBatch) -> None:
+        """Run a closed batch and resolve the futures of its callers."""
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["queries"] += len(batch.inputs)
+        try:
+            results = batch.driver.query_batch(list(batch.inputs))
+            if len(results) != len(batch.inputs):
+                raise RuntimeError(
+                    f"query_batch returned {len(results)} results for {len(batch.inputs)} inputs"
+                )
+        except Exception as e:
+            for future in batch.futures:
+                future.set_exception(e)
+            return
+        for future, result in zip(batch.futures, results):
+            future.set_result(result)
+
+    def get_stats(self) -> dict:
+        """
+        Get batching statistics.
+
+        Returns:
+            dict: Number of batches dispatched, queries batched and the average batch size.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats["average_batch_size"] = (
+            stats["queries"] / stats["batches"] if stats["batches"] else 0.0
+        )
+        return stats
@@ -0,0 +1,337 @@
+"""
+Model Context Module
+
+This module keeps prompt contexts on the server, so that clients send only what
+changed between turns instead of the complete prompt. A context consists of pinned
+segments, such as the system prompt and repository files, followed by the messages of
+a conversation. Segments are counted in tokens once, when they are added, and each
+query is assembled within the token budget of the driver answering it by dropping the
+oldest messages. Pinned segments always come first and in a stable order, so their
+text forms a prefix that drivers can reuse across turns in a backend prefix cache.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Context configuration; a budget of 0 does not limit the size of prompts
+MODEL_CONTEXT_TTL = float(os.environ.get("MODEL_CONTEXT_TTL", "3600"))
+MODEL_CONTEXT_MAX_HANDLES = int(os.environ.get("MODEL_CONTEXT_MAX_HANDLES", "1000"))
+MODEL_CONTEXT_TOKEN_BUDGET = int(os.environ.get("MODEL_CONTEXT_TOKEN_BUDGET", "0"))
+
+# Text placed between the segments of an assembled prompt
+SEGMENT_SEPARATOR = "\n\n"
+
+# Word pieces of up to four characters and single symbols approximate subword tokens
+_TOKEN_PATTERN = re.compile(r"\w{1,4}|[^\w\s]")
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens of a text without a tokenizer.
+
+    Args:
+        text: The text to count.
+
+    Returns:
+        int: Approximate number of subword tokens.
+    """
+    return len(_TOKEN_PATTERN.findall(text))
+
+class ContextOverflowError(ValueError):
+    """Raised when the pinned segments and latest message do not fit the token budget."""
+
+class AssembledPrompt:
+    """A prompt assembled from a context, split into its reusable prefix and the rest."""
+
+    def __init__(self, prefix: str, suffix: str, prefix_key: str, tokens: int, dropped: int):
+        self.prefix = prefix
+        self.suffix = suffix
+        self.prefix_key = prefix_key
+        self.tokens = tokens
+        self.dropped = dropped
+
+    @property
+    def text(self) -> str:
+        """The complete prompt."""
+        if self.prefix and self.suffix:
+            return self.prefix + SEGMENT_SEPARATOR + self.suffix
+        return self.prefix or self.suffix
+
+class Context:
+    """
+    Pinned segments and messages of one context handle.
+
+    Contexts are changed by deltas:
+
+    - ``{"op": "set", "key": ..., "text": ...}`` adds or replaces a pinned segment.
+    - ``{"op": "remove", "key": ...}`` removes a pinned segment.
+    - ``{"op": "append", "text": ..., "role": "user"}`` appends a message.
+    - ``{"op": "clear"}`` removes every message.
+    """
+
+    def __init__(self, handle: str, model: Optional[str], count_tokens: Callable[[str], int]):
+        """
+        Initialize the context.
+
+        Args:
+            handle: Identifier of the context.
+            model: Driver or group the context is queried on, or None for the active one.
+            count_tokens: Callable counting the tokens of a text.
+        """
+        self.handle = handle
+        self.model = model
+        self.lock = threading.Lock()
+        self._count_tokens = count_tokens
+        self._pinned: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._pinned_tokens = 0
+        self._messages: List[Tuple[str, str, int]] = []
+        self._prefix: Optional[Tuple[str, str]] = None
+        self.version = 0
+        self.last_used = time.monotonic()
+
+    def apply(self, deltas: List[dict]) -> None:
+        """
+        Apply deltas to the context.
+
+        Every delta is validated before any is applied, so an invalid delta leaves the
+        context unchanged.
+
+        Args:
+            deltas: Deltas in the order they are applied.
+
+        Raises:
+            ValueError: If a delta is malformed.
+        """
+        if not isinstance(deltas, list):
+            raise ValueError("Deltas must be a list")
+        for delta in deltas:
+            self._validate(delta)
+        for delta in deltas:
+            op = delta["op"]
+            if op == "set":
+                self.pin(delta["key"], delta["text"])
+            elif op == "remove":
+                self.unpin(delta["key"])
+            elif op == "append":
+                self.append(delta["text"], delta.get("role", "user"))
+            else:
+                self._messages = []
+                self.version += 1
+
+    def copy(self) -> "Context":
+        """
+        Copy the context, so that deltas can be tried without changing it.
+
+        Returns:
+            Context: A context with the same segments, messages and version.
+        """
+        copy = Context(self.handle, self.model, self._count_tokens)
+        copy.update(self)
+        return copy
+
+    def update(self, other: "Context") -> None:
+        """
+        Take over the segments, messages and version of another context.
+
+        Args:
+            other: The context to copy from, typically a copy with deltas applied.
+        """
+        self._pinned = OrderedDict(other._pinned)
+        self._pinned_tokens = other._pinned_tokens
+        self._messages = list(other._messages)
+        self._prefix = other._prefix
+        self.version = other.version
+
+    def pin(self, key: str, text: str) -> None:
+        """
+        Add or replace a pinned segment; a replaced segment keeps its position.
+
+        Args:
+            key: Identifier of the segment, such as a file path.
+            text: Text of the segment.
+        """
+        current = self._pinned.get(key)
+        if current is not None and current[0] == text:
+            return
+        tokens = self._count_tokens(text)
+        self._pinned_tokens += tokens - (current[1] if current else 0)
+        self._pinned[key] = (text, tokens)
+        self._prefix = None
+        self.version += 1
+
+    def unpin(self, key: str) -> None:
+        """
+        Remove a pinned segment.
+
+        Args:
+            key: Identifier of the segment.
+        """
+        current = self._pinned.pop(key, None)
+        if current is not None:
+            self._pinned_tokens -= current[1]
+            self._prefix = None
+            self.version += 1
+
+    def append(self, text: str, role: str = "user") -> None:
+        """
+        Append a message.
+
+        Args:
+            text: Text of the message.
+            role: Author of the message, such as "user" or "assistant".
+        """
+        rendered = f"{role.capitalize()}: {text}"
+        self._messages.append((role, rendered, self._count_tokens(rendered)))
+        self.version += 1
+
+    def assemble(self, budget: int = 0) -> AssembledPrompt:
+        """
+        Assemble the prompt of the context.
+
+        Args:
+            budget: Maximum number of tokens of the prompt; 0 for no limit.
+
+        Returns:
+            AssembledPrompt: The pinned segments as prefix, followed by the newest
+                messages that fit the budget.
+
+        Raises:
+            ContextOverflowError: If the pinned segments and the latest message exceed
+                the budget.
+        """
+        if self._prefix is None:
+            prefix = SEGMENT_SEPARATOR.join(text for text, _ in self._pinned.values())
+            self._prefix = (prefix, hashlib.sha256(prefix.encode("utf-8")).hexdigest())
+        prefix, prefix_key = self._prefix
+        tokens = self._pinned_tokens
+        kept = 0
+        for _, _, message_tokens in reversed(self._messages):
+            if budget > 0 and tokens + message_tokens > budget:
+                break
+            tokens += message_tokens
+            kept += 1
+        if budget > 0 and (tokens > budget or (self._messages and kept == 0)):
+            raise ContextOverflowError(f"Context does not fit the budget of {budget} tokens")
+        messages = self._messages[len(self._messages) - kept:]
+        suffix = SEGMENT_SEPARATOR.join(rendered for _, rendered, _ in messages)
+        return AssembledPrompt(prefix, suffix, prefix_key, tokens, len(self._messages) - kept)
+
+    def to_dict(self) -> dict:
+        """
+        Describe the context.
+
+        Returns:
+            dict: Handle, model, version, pinned segment keys and token counts.
+        """
+        return {
+            "handle": self.handle,
+            "model": self.model,
+            "version": self.version,
+            "pinned": {key: tokens for key, (_, tokens) in self._pinned.items()},
+            "messages": len(self._messages),
+            "tokens": self._pinned_tokens + sum(tokens for _, _, tokens in self._messages),
+        }
+
+    @staticmethod
+    def _validate(delta: dict) -> None:
+        op = delta.get("op") if isinstance(delta, dict) else None
+        if op in ("set", "remove") and not isinstance(delta.get("key"), str):
+            raise ValueError(f"Delta '{op}' needs a key")
+        if op in ("set", "append") and not isinstance(delta.get("text"), str):
+            raise ValueError(f"Delta '{op}' needs a text")
+        if op == "append" and not isinstance(delta.get("role", "user"), str):
+            raise ValueError("Delta 'append' needs a string role")
+        if op not in ("set", "remove", "append", "clear"):
+            raise ValueError(f"Unknown delta op '{op}'")
+
+class ContextStore:
+    """
+    Holds the contexts of open handles.
+
+    Handles that are not used for a TTL expire, and the least recently used handles
+    are dropped beyond the handle limit.
+    """
+
+    def __init__(self, ttl: float = MODEL_CONTEXT_TTL,
+                 max_handles: int = MODEL_CONTEXT_MAX_HANDLES):
+        """
+        Initialize the store.
+
+        Args:
+            ttl: Seconds an unused handle is kept; 0 keeps handles until they are evicted.
+            max_handles: Maximum number of open handles.
+        """
+        self._ttl = ttl
+        self._max_handles = max_handles
+        self._lock = threading.Lock()
+        self._contexts: "OrderedDict[str, Context]" = OrderedDict()
+
+    def create(self, model: Optional[str], count_tokens: Callable[[str], int]) -> Context:
+        """
+        Open a new handle.
+
+        Args:
+            model: Driver or group the context is queried on.
+            count_tokens: Callable counting the tokens of a text.
+
+        Returns:
+            Context: The empty context of the new handle.
+        """
+        context = Context(uuid.uuid4().hex, model, count_tokens)
+        with self._lock:
+            self._expire()
+            self._contexts[context.handle] = context
+            while len(self._contexts) > self._max_handles:
+                self._contexts.popitem(last=False)
+        return context
+
+    def get(self, handle: str) -> Optional[Context]:
+        """
+        Get the context of a handle and mark it as used.
+
+        Args:
+            handle: Identifier of the context.
+
+        Returns:
+            Optional[Context]: The context, or None if the handle is unknown or expired.
+        """
+        with self._lock:
+            self._expire()
+            context = self._contexts.get(handle)
+            if context is not None:
+                context.last_used = time.monotonic()
+                self._contexts.move_to_end(handle)
+            return context
+
+    def delete(self, handle: str) -> bool:
+        """
+        Close a handle.
+
+        Args:
+            handle: Identifier of the context.
+
+        Returns:
+            bool: True if the handle was open.
+        """
+        with self._lock:
+            return self._contexts.pop(handle, None) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._contexts)
+
+    def _expire(self) -> None:
+        if self._ttl <= 0:
+            return
+        cutoff = time.monotonic() - self._ttl
+        # Handles are ordered by last use, so expired handles come first
+        while self._contexts:
+            handle, context = next(iter(self._contexts.items()))
+            if context.last_used > cutoff:
+                break
+            del self._contexts[handle]
@@ -0,0 +1,350 @@
+"""
+Model Call Resilience Module
+
+This module protects the server from slow or failing model backends. Each driver gets
+a limit on concurrent calls, a deadline per call and a circuit breaker that rejects
+calls while the backend keeps failing, so that request threads fail fast instead of
+piling up behind a degraded backend.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Iterator, Optional
+
+# Resilience configuration; a limit or timeout of 0 disables it
+MODEL_MAX_CONCURRENCY = int(os.environ.get("MODEL_MAX_CONCURRENCY", "0"))
+MODEL_QUERY_TIMEOUT = float(os.environ.get("MODEL_QUERY_TIMEOUT", "0"))
+MODEL_BREAKER_FAILURE_THRESHOLD = int(os.environ.get("MODEL_BREAKER_FAILURE_THRESHOLD", "5"))
+MODEL_BREAKER_RESET_TIMEOUT = float(os.environ.get("MODEL_BREAKER_RESET_TIMEOUT", "30"))
+
+# Threads running calls with a deadline when concurrency is not limited
+MODEL_TIMEOUT_WORKERS = 64
+
+# Circuit breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a call is rejected because the driver's circuit breaker is open."""
+
+class ModelBusyError(RuntimeError):
+    """Raised when a driver is at its concurrency limit until the call's deadline."""
+
+class CircuitBreaker:
+    """
+    Counts consecutive failures of a driver and rejects calls while it is unhealthy.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and rejects
+    calls for ``reset_timeout`` seconds. It then lets a single trial call through
+    (half-open); the breaker closes if the trial succeeds and opens again if it fails.
+    """
+
+    def __init__(self, failure_threshold: int = MODEL_BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = MODEL_BREAKER_RESET_TIMEOUT):
+        """
+        Initialize the breaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the breaker; 0 disables it.
+            reset_timeout: Seconds the breaker stays open before a trial call.
+        """
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._stats = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        """Current state, reporting an open breaker whose timeout passed as half-open."""
+        with self._lock:
+            return self._current_state()
+
+    def allow(self) -> None:
+        """
+        Admit a call.
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or half-open with a trial running.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return
+            self._stats["rejected"] += 1
+            retry_in = max(self._opened_at + self._reset_timeout - time.monotonic(), 0)
+        raise CircuitOpenError(f"Circuit breaker is open; retry in {retry_in:.1f}s")
+
+    def record_success(self) -> None:
+        """Record a successful call, closing the breaker."""
+        with self._lock:
+            self._stats["successes"] += 1
+            self._failures = 0
+            self._state = CLOSED
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        """Record a failed call, opening the breaker at the threshold or after a failed trial."""
+        with self._lock:
+            self._stats["failures"] += 1
+            self._failures += 1
+            trial = self._trial_running
+            self._trial_running = False
+            tripped = trial or self._failures >= self._failure_threshold
+            if self._failure_threshold > 0 and tripped:
+                if self._state != OPEN or trial:
+                    self._stats["opened"] += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def cancel(self) -> None:
+        """Record that an admitted call never reached the backend."""
+        with self._lock:
+            self._trial_running = False
+
+    def reset(self) -> None:
+        """Close the breaker and forget past failures."""
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def to_dict(self) -> dict:
+        """
+        Describe the breaker.
+
+        Returns:
+            dict: State, consecutive failures, settings and call counts.
+        """
+        with self._lock:
+            return dict(
+                self._stats,
+                state=self._current_state(),
+                consecutive_failures=self._failures,
+                failure_threshold=self._failure_threshold,
+                reset_timeout=self._reset_timeout,
+            )
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self._reset_timeout:
+            return HALF_OPEN
+        return self._state
+
+class DriverGuard:
+    """
+    Runs the calls of one driver under a concurrency limit, a deadline and a circuit breaker.
+
+    Calls with a deadline run on a worker thread so the caller can stop waiting; the
+    worker keeps its concurrency slot until the backend actually returns, so a hung
+    backend cannot take more than its share of threads.
+    """
+
+    def __init__(self, max_concurrency: int = MODEL_MAX_CONCURRENCY,
+                 timeout: float = MODEL_QUERY_TIMEOUT,
+                 failure_threshold: int = MODEL_BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = MODEL_BREAKER_RESET_TIMEOUT):
+        """
+        Initialize the guard.
+
+        Args:
+            max_concurrency: Maximum number of calls running on the driver; 0 for no limit.
+            timeout: Seconds a call may take, including waiting for a slot; 0 for no limit.
+            failure_threshold: Consecutive failures that open the circuit breaker.
+            reset_timeout: Seconds the circuit breaker stays open before a trial call.
+        """
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency > 0 else None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._timeouts = 0
+
+    def call(self, operation: Callable[[], Any]) -> Any:
+        """
+        Run a call on the driver.
+
+        Args:
+            operation: Callable performing the call.
+
+        Returns:
+            Any: Return value of the call.
+
+        Raises:
+            CircuitOpenError: If the circuit breaker rejects the call.
+            ModelBusyError: If no slot frees up before the deadline.
+            TimeoutError: If the call does not finish before the deadline.
+        """
+        deadline = time.monotonic() + self.timeout if self.timeout > 0 else None
+        self._admit(deadline)
+        if deadline is None:
+            try:
+                result = operation()
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            finally:
+                self._release()
+            self.breaker.record_success()
+            return result
+        future = self._get_executor().submit(operation)
+        future.add_done_callback(lambda _: self._release())
+        try:
+            result = future.result(max(deadline - time.monotonic(), 0))
+        except FutureTimeoutError:
+            # Before Python 3.11 futures raise their own TimeoutError, not the builtin one
+            with self._lock:
+                self._timeouts += 1
+            self.breaker.record_failure()
+            raise TimeoutError(f"Model call exceeded its {self.timeout}s deadline") from None
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def stream(self, chunks: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """
+        Stream a response under the concurrency limit and circuit breaker.
+
+        The call is admitted before this returns, so rejections raise here rather than
+        part-way through the response. The deadline applies to waiting for a slot; the
+        stream itself is not cut off. A stream closed before it ends, such as when the
+        client disconnects, counts as neither a success nor a failure.
+
+        Args:
+            chunks: Callable starting the stream.
+
+        Returns:
+            Iterator[str]: Successive chunks of the response.
+
+        Raises:
+            CircuitOpenError: If the circuit breaker rejects the call.
+            ModelBusyError: If no slot frees up before the deadline.
+        """
+        self._admit(time.monotonic() + self.timeout if self.timeout > 0 else None)
+        return _GuardedStream(self, chunks)
+
+    def to_dict(self) -> dict:
+        """
+        Describe the guard.
+
+        Returns:
+            dict: Limits, calls in flight, timeouts and the circuit breaker state.
+        """
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "timeout": self.timeout,
+                "in_flight": self._in_flight,
+                "timeouts": self._timeouts,
+                "breaker": self.breaker.to_dict(),
+            }
+
+    def _admit(self, deadline: Optional[float]) -> None:
+        """Pass the circuit breaker and take a concurrency slot."""
+        self.breaker.allow()
+        try:
+            self._acquire(deadline)
+        except ModelBusyError:
+            # Shedding load says nothing about the health of the backend
+            self.breaker.cancel()
+            raise
+
+    def _acquire(self, deadline: Optional[float]) -> None:
+        if self._slots is not None:
+            wait = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if not self._slots.acquire(timeout=wait):
+                raise ModelBusyError(
+                    f"Model driver is at its limit of {self.max_concurrency} calls"
+                )
+        with self._lock:
+            self._in_flight += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        if self._slots is not None:
+            self._slots.release()
+
+    def _finish(self, outcome: str) -> None:
+        """Release the slot of a stream and report how it ended to the circuit breaker."""
+        self._release()
+        if outcome == "success":
+            self.breaker.record_success()
+        elif outcome == "failure":
+            self.breaker.record_failure()
+        else:
+            self.breaker.cancel()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency or MODEL_TIMEOUT_WORKERS,
+                    thread_name_prefix="model-call"
+                )
+            return self._executor
+
+class _GuardedStream:
+    """
+    Iterator over an admitted stream that gives back its slot exactly once.
+
+    Unlike a generator, it also releases the slot when it is closed or dropped before
+    the first chunk is requested.
+    """
+
+    def __init__(self, guard: DriverGuard, chunks: Callable[[], Iterator[str]]):
+        self._guard = guard
+        self._start = chunks
+        self._chunks: Optional[Iterator[str]] = None
+        self._done = False
+
+    def __iter__(self) -> "_GuardedStream":
+        return self
+
+    def __next__(self) -> str:
+        if self._done:
+            raise StopIteration
+        try:
+            if self._chunks is None:
+                self._chunks = iter(self._start())
+            return next(self._chunks)
+        except StopIteration:
+            self._finish("success")
+            raise
+        except Exception:
+            self._finish("failure")
+            raise
+        except BaseException:
+            self._finish("cancel")
+            raise
+
+    def close(self) -> None:
+        """Stop the stream, closing the driver's iterator if it was started."""
+        if self._done:
+            return
+        try:
+            close = getattr(self._chunks, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._finish("cancel")
+
+    def __del__(self):
+        self.close()
+
+    def _finish(self, outcome: str) -> None:
+        if not self._done:
+            self._done = True
+            self._guard._finish(outcome)
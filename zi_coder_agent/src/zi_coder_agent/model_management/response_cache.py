@@ -0,0 +1,152 @@
+"""
+Model Response Cache Module
+
+This module memoizes model responses in a cache backend so that identical prompts sent
+to the same driver with the same generation parameters are answered without a model
+round trip.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Optional
+
+from ..cache_management.single_flight import SingleFlight
+
+# Response cache configuration; a TTL of 0 disables the cache in the API server
+MODEL_CACHE_TTL = int(os.environ.get("MODEL_CACHE_TTL", "0"))
+
+def normalize_prompt(input_data: str) -> str:
+    """
+    Normalize a prompt so that insignificant whitespace differences share a cache entry.
+
+    Line endings are unified, trailing whitespace is stripped from every line and
+    leading and trailing blank space is removed from the prompt.
+
+    Args:
+        input_data: The prompt to normalize.
+
+    Returns:
+        str: The normalized prompt.
+    """
+    lines = input_data.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+class ModelResponseCache:
+    """Caches model responses through any get/set backend, such as CacheToolMarketplace."""
+
+    KEY_PREFIX = "model_response"
+
+    def __init__(self, cache: Any, ttl: Optional[int] = MODEL_CACHE_TTL):
+        """
+        Initialize the response cache.
+
+        Args:
+            cache: Cache backend providing get(key) and set(key, value, ttl).
+            ttl: Time to live of cached responses in seconds, passed to the backend.
+        """
+        self._cache = cache
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._single_flight = SingleFlight()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "errors": 0}
+
+    def make_key(self, driver_name: str, input_data: str,
+                 parameters: Optional[dict] = None) -> str:
+        """
+        Build the cache key for a query.
+
+        Args:
+            driver_name: Name of the driver answering the query.
+            input_data: The prompt sent to the model.
+            parameters: Generation parameters that affect the response.
+
+        Returns:
+            str: Cache key combining the driver, prompt hash and parameter hash.
+        """
+        prompt_hash = hashlib.sha256(normalize_prompt(input_data).encode("utf-8")).hexdigest()
+        params = json.dumps(parameters or {}, sort_keys=True, separators=(",", ":"), default=str)
+        params_hash = hashlib.sha256(params.encode("utf-8")).hexdigest()[:16]
+        return f"{self.KEY_PREFIX}:{driver_name}:{params_hash}:{prompt_hash}"
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response and record a hit or miss.
+
+        Args:
+            key: Cache key from make_key.
+
+        Returns:
+            Optional[str]: The cached response, or None on a miss or cache failure.
+        """
+        try:
+            value = self._cache.get(key)
+        except Exception:
+            self._record("errors")
+            value = None
+        self._record("hits" if value is not None else "misses")
+        return value
+
+    def get_or_compute(self, key: str, compute: Callable[[], Optional[str]]) -> Optional[str]:
+        """
+        Look up a cached response, querying the model once for concurrent misses.
+
+        Concurrent callers missing the same key wait for the first caller's model
+        query instead of each sending their own.
+
+        Args:
+            key: Cache key from make_key.
+            compute: Callable querying the model.
+
+        Returns:
+            Optional[str]: The cached or freshly computed response.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        def compute_and_store():
+            result = compute()
+            if result is not None:
+                self.set(key, result)
+            return result
+
+        return self._single_flight.do(key, compute_and_store)
+
+    def set(self, key: str, value: str) -> bool:
+        """
+        Store a response in the cache.
+
+        Args:
+            key: Cache key from make_key.
+            value: The model response.
+
+        Returns:
+            bool: True if the response was stored, False otherwise.
+        """
+        try:
+            stored = bool(self._cache.set(key, value, self._ttl))
+        except Exception:
+            self._record("errors")
+            return False
+        if stored:
+            self._record("stores")
+        return stored
+
+    def _record(self, counter: str) -> None:
+        with self._lock:
+            self._stats[counter] += 1
+
+    def get_stats(self) -> dict:
+        """
+        Get cache statistics.
+
+        Returns:
+            dict: Hit, miss, store and error counters and the hit ratio.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
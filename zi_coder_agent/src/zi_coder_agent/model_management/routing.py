@@ -0,0 +1,223 @@
+"""
+Model Routing Module
+
+This module spreads queries over groups of model drivers, such as several replicas of
+one backend, and fails over to the next driver of a group when a driver raises an
+error or times out. Groups choose their first driver by smooth weighted round-robin
+or by the fewest outstanding requests.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Routing configuration
+MODEL_ROUTING_STRATEGY = os.environ.get("MODEL_ROUTING_STRATEGY", "weighted")
+
+# Routing strategies
+WEIGHTED = "weighted"
+LEAST_OUTSTANDING = "least_outstanding"
+STRATEGIES = (WEIGHTED, LEAST_OUTSTANDING)
+
+class _NoResponse(Exception):
+    """A driver answered without a response; the next driver of the group is tried."""
+
+class _Group:
+    """Members, weights and round-robin state of one driver group."""
+
+    def __init__(self, members: List[str], weights: List[float], strategy: str):
+        self.members = members
+        self.weights = weights
+        self.strategy = strategy
+        self.current = [0.0] * len(members)
+
+    def to_dict(self) -> dict:
+        """Describe the group's members, weights and strategy."""
+        return {
+            "members": list(self.members),
+            "weights": list(self.weights),
+            "strategy": self.strategy,
+        }
+
+class ModelRouter:
+    """
+    Chooses the drivers that answer a query and tracks their outstanding requests.
+
+    A query for a driver name goes to that driver only. A query for a group name is
+    tried on each member in turn, starting with the member chosen by the group's
+    strategy, until one returns a response.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._groups: Dict[str, _Group] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def add_group(self, name: str, members: List[str], weights: Optional[List[float]] = None,
+                  strategy: str = MODEL_ROUTING_STRATEGY) -> None:
+        """
+        Define a group of drivers that share the load of its queries.
+
+        Args:
+            name: Name of the group.
+            members: Names of the member drivers; a name may not be repeated.
+            weights: Relative share of queries of each member, 1 for each by default.
+            strategy: WEIGHTED or LEAST_OUTSTANDING.
+
+        Raises:
+            ValueError: If the members, weights or strategy are invalid.
+        """
+        if not members or len(set(members)) != len(members):
+            raise ValueError("A group needs at least one member and no duplicates")
+        weights = list(weights) if weights is not None else [1.0] * len(members)
+        if len(weights) != len(members) or any(weight <= 0 for weight in weights):
+            raise ValueError("A group needs one positive weight per member")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown routing strategy '{strategy}'")
+        with self._lock:
+            self._groups[name] = _Group(list(members), [float(w) for w in weights], strategy)
+
+    def remove_group(self, name: str) -> bool:
+        """
+        Remove a group.
+
+        Args:
+            name: Name of the group.
+
+        Returns:
+            bool: True if the group existed.
+        """
+        with self._lock:
+            return self._groups.pop(name, None) is not None
+
+    def is_group(self, name: Optional[str]) -> bool:
+        """
+        Check whether a name refers to a group.
+
+        Args:
+            name: Name of a driver or group.
+
+        Returns:
+            bool: True if the name is a group.
+        """
+        with self._lock:
+            return name in self._groups
+
+    def members(self, name: str) -> List[str]:
+        """
+        Get the drivers a name refers to.
+
+        Args:
+            name: Name of a driver or group.
+
+        Returns:
+            List[str]: Members of the group, or the name itself for a driver.
+        """
+        with self._lock:
+            group = self._groups.get(name)
+            return list(group.members) if group else [name]
+
+    def candidates(self, name: str) -> List[str]:
+        """
+        Get the drivers to try for a query, in the order they are tried.
+
+        Args:
+            name: Name of a driver or group.
+
+        Returns:
+            List[str]: Driver names, the one chosen by the group strategy first.
+        """
+        with self._lock:
+            group = self._groups.get(name)
+            if group is None:
+                return [name]
+            if group.strategy == LEAST_OUTSTANDING:
+                order = sorted(
+                    range(len(group.members)),
+                    key=lambda i: self._in_flight.get(group.members[i], 0) / group.weights[i]
+                )
+                return [group.members[i] for i in order]
+            # Smooth weighted round-robin picks the first member; the others follow by weight
+            total = sum(group.weights)
+            for i, weight in enumerate(group.weights):
+                group.current[i] += weight
+            chosen = max(range(len(group.members)), key=lambda i: group.current[i])
+            group.current[chosen] -= total
+            rest = sorted((i for i in range(len(group.members)) if i != chosen),
+                          key=lambda i: -group.weights[i])
+            return [group.members[i] for i in [chosen] + rest]
+
+    def execute(self, name: str, call: Callable[[str], Any]) -> Any:
+        """
+        Run a query on the drivers of a name, failing over until one responds.
+
+        Args:
+            name: Name of a driver or group.
+            call: Callable taking a driver name and returning its response.
+
+        Returns:
+            Any: The first response that is not None, or None if every driver
+                returned None.
+
+        Raises:
+            Exception: The last error raised by a driver, if no driver responded and
+                at least one of them raised.
+        """
+        error: Optional[Exception] = None
+        for driver_name in self.candidates(name):
+            try:
+                with self.track(driver_name):
+                    result = call(driver_name)
+                    if result is None:
+                        raise _NoResponse()
+                return result
+            except _NoResponse:
+                continue
+            except Exception as e:
+                error = e
+        if error is not None:
+            raise error
+        return None
+
+    @contextmanager
+    def track(self, driver_name: str) -> Iterator[None]:
+        """
+        Count a request as outstanding on a driver while the block runs.
+
+        A block raising an exception or _NoResponse counts as a failure.
+
+        Args:
+            driver_name: Name of the driver handling the request.
+        """
+        with self._lock:
+            self._in_flight[driver_name] = self._in_flight.get(driver_name, 0) + 1
+            stats = self._stats.setdefault(driver_name, {"requests": 0, "failures": 0})
+            stats["requests"] += 1
+        try:
+            yield
+        except Exception:
+            with self._lock:
+                stats["failures"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight[driver_name] -= 1
+
+    def get_stats(self) -> dict:
+        """
+        Get routing statistics.
+
+        Returns:
+            dict: Definition of each group, and the outstanding requests, requests
+                and failures of each driver.
+        """
+        with self._lock:
+            return {
+                "groups": {name: group.to_dict() for name, group in self._groups.items()},
+                "drivers": {
+                    name: dict(stats, in_flight=self._in_flight.get(name, 0))
+                    for name, stats in self._stats.items()
+                },
+            }
@@ -0,0 +1,388 @@
+"""
+Semantic Cache Module
+
+This module reuses model responses for prompts that are similar but not identical, such
+as prompts that differ in whitespace or identifier spelling. Prompts are embedded by a
+pluggable local embedder and kept in a vector index; a query is answered
+from the cache when the most similar cached prompt for the same model and generation
+parameters is above a similarity threshold.
+
+The vector index uses NumPy when it is installed, searching random-hyperplane buckets
+for large indexes, and falls back to an exact pure-Python search otherwise.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is an optional dependency
+    np = None
+
+# Semantic cache configuration; a TTL of 0 disables the cache in the API server
+MODEL_SEMANTIC_CACHE_TTL = int(os.environ.get("MODEL_SEMANTIC_CACHE_TTL", "0"))
+MODEL_SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("MODEL_SEMANTIC_CACHE_THRESHOLD", "0.98"))
+MODEL_SEMANTIC_CACHE_MAX_ENTRIES = int(os.environ.get("MODEL_SEMANTIC_CACHE_MAX_ENTRIES", "10000"))
+MODEL_SEMANTIC_CACHE_DIMENSION = int(os.environ.get("MODEL_SEMANTIC_CACHE_DIMENSION", "256"))
+
+# Indexes up to this size are searched exhaustively
+EXACT_SEARCH_LIMIT = 2048
+
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d_]")
+_CAMEL_BOUNDARY = re.compile(r"(?<=[a-z])(?=[A-Z])")
+
+class Embedder(ABC):
+    """Abstract base class for prompt embedders."""
+
+    @property
+    @abstractmethod
+    def dimension(self) -> int:
+        """Length of the vectors produced by embed()."""
+        pass
+
+    @abstractmethod
+    def embed(self, text: str) -> Sequence[float]:
+        """Turn a text into a vector; similar texts should get vectors with a high cosine."""
+        pass
+
+class HashingEmbedder(Embedder):
+    """
+    Embeds text by feature hashing of its words, word pairs and character trigrams.
+
+    Identifiers are split at camelCase and snake_case boundaries and lower-cased, and
+    whitespace is ignored, so prompts that differ only in formatting or identifier
+    style map to nearly identical vectors. Pairs of adjacent words make the vector
+    depend on word order. It needs no model and no dependencies.
+
+    The embedding captures surface form, not meaning: a long prompt that differs from
+    another in a single word, such as "list" versus "set", still scores highly. It is
+    only suited to finding near-verbatim duplicates with a threshold close to 1;
+    reusing responses across paraphrases needs a model-based Embedder.
+    """
+
+    def __init__(self, dimension: int = MODEL_SEMANTIC_CACHE_DIMENSION):
+        """
+        Initialize the embedder.
+
+        Args:
+            dimension: Length of the produced vectors.
+        """
+        self._dimension = dimension
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def embed(self, text: str) -> List[float]:
+        """Hash the words, word pairs and character trigrams of a text into a unit vector."""
+        vector = [0.0] * self._dimension
+        words = self._words(text)
+        for word in words:
+            self._add(vector, "w:" + word, 1.0)
+            padded = f"^{word}$"
+            for i in range(len(padded) - 2):
+                self._add(vector, "c:" + padded[i:i + 3], 0.5)
+        for first, second in zip(words, words[1:]):
+            self._add(vector, f"b:{first} {second}", 1.5)
+        return _normalize(vector)
+
+    @staticmethod
+    def _words(text: str) -> List[str]:
+        """Split a text into lower-cased words, breaking identifiers at case and underscores."""
+        words = []
+        for token in _TOKEN_PATTERN.findall(text):
+            words.extend(part.lower() for part in _CAMEL_BOUNDARY.split(token))
+        return words
+
+    def _add(self, vector: List[float], feature: str, weight: float) -> None:
+        """Add a feature to the vector at its hashed position with a hashed sign."""
+        digest = zlib.crc32(feature.encode("utf-8"))
+        vector[digest % self._dimension] += weight if digest & 0x80000000 else -weight
+
+class VectorIndex:
+    """
+    Cosine-similarity index over normalized vectors.
+
+    With NumPy, vectors are kept in a contiguous matrix. Indexes larger than
+    ``exact_limit`` only score the vectors whose random-hyperplane signature is within
+    one bit of the query's, which trades a little recall for much less work per
+    search. Without NumPy every vector is scored in pure Python.
+    """
+
+    def __init__(self, dimension: int, bits: int = 12, exact_limit: int = EXACT_SEARCH_LIMIT,
+                 seed: int = 0):
+        """
+        Initialize the index.
+
+        Args:
+            dimension: Length of the indexed vectors.
+            bits: Number of random hyperplanes in a signature.
+            exact_limit: Largest index size searched exhaustively.
+            seed: Seed of the random hyperplanes.
+        """
+        self.dimension = dimension
+        self._exact_limit = exact_limit
+        self._keys: List[str] = []
+        self._positions: Dict[str, int] = {}
+        if np is not None:
+            self._planes = np.random.default_rng(seed).standard_normal((bits, dimension))
+            self._vectors = np.zeros((16, dimension), dtype=np.float32)
+            self._signatures = np.zeros((16, bits), dtype=bool)
+        else:
+            self._rows: List[List[float]] = []
+
+    def __len__(self) -> int:
+        """Number of indexed vectors."""
+        return len(self._keys)
+
+    def add(self, key: str, vector: Sequence[float]) -> None:
+        """
+        Add or replace the vector of a key.
+
+        Args:
+            key: Identifier of the vector.
+            vector: The vector; it is normalized before it is stored.
+        """
+        self.remove(key)
+        position = len(self._keys)
+        if np is not None:
+            row = _normalize_array(np.asarray(vector, dtype=np.float32))
+            if position == len(self._vectors):
+                self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+                self._signatures = np.concatenate(
+                    [self._signatures, np.zeros_like(self._signatures)]
+                )
+            self._vectors[position] = row
+            self._signatures[position] = self._planes @ row > 0
+        else:
+            self._rows.append(_normalize(list(vector)))
+        self._keys.append(key)
+        self._positions[key] = position
+
+    def remove(self, key: str) -> bool:
+        """
+        Remove the vector of a key.
+
+        Args:
+            key: Identifier of the vector.
+
+        Returns:
+            bool: True if the key was indexed.
+        """
+        position = self._positions.pop(key, None)
+        if position is None:
+            return False
+        last = len(self._keys) - 1
+        if position != last:
+            # Move the last vector into the freed slot
+            moved = self._keys[last]
+            self._keys[position] = moved
+            self._positions[moved] = position
+            if np is not None:
+                self._vectors[position] = self._vectors[last]
+                self._signatures[position] = self._signatures[last]
+            else:
+                self._rows[position] = self._rows[last]
+        self._keys.pop()
+        if np is None:
+            self._rows.pop()
+        return True
+
+    def search(self, vector: Sequence[float]) -> Optional[Tuple[str, float]]:
+        """
+        Find the most similar indexed vector.
+
+        Args:
+            vector: The query vector.
+
+        Returns:
+            Optional[Tuple[str, float]]: Key of the nearest vector and its cosine
+                similarity, or None if the index is empty.
+        """
+        count = len(self._keys)
+        if count == 0:
+            return None
+        if np is None:
+            query = _normalize(list(vector))
+            scores = [sum(a * b for a, b in zip(query, row)) for row in self._rows]
+            best = max(range(count), key=scores.__getitem__)
+            return self._keys[best], scores[best]
+        query = _normalize_array(np.asarray(vector, dtype=np.float32))
+        candidates = np.arange(count)
+        if count > self._exact_limit:
+            signature = self._planes @ query > 0
+            distance = (self._signatures[:count] != signature).sum(axis=1)
+            candidates = np.flatnonzero(distance <= 1)
+            if len(candidates) == 0:
+                return None
+        scores = self._vectors[candidates] @ query
+        best = int(np.argmax(scores))
+        return self._keys[int(candidates[best])], float(scores[best])
+
+class SemanticCache:
+    """
+    Answers queries with the response to the most similar cached prompt.
+
+    Prompts are grouped by scope, the model and generation parameters they were sent
+    with, and only compared within their scope. Entries expire after a TTL and the
+    least recently used entries are evicted beyond the entry limit.
+    """
+
+    def __init__(self, embedder: Optional[Embedder] = None,
+                 threshold: float = MODEL_SEMANTIC_CACHE_THRESHOLD,
+                 ttl: Optional[int] = MODEL_SEMANTIC_CACHE_TTL,
+                 max_entries: int = MODEL_SEMANTIC_CACHE_MAX_ENTRIES):
+        """
+        Initialize the cache.
+
+        Args:
+            embedder: Embedder turning prompts into vectors; defaults to HashingEmbedder.
+            threshold: Minimum cosine similarity for a cached response to be reused.
+            ttl: Time to live of cached responses in seconds; 0 or None keeps them
+                until they are evicted.
+            max_entries: Maximum number of cached responses.
+        """
+        self._embedder = embedder or HashingEmbedder()
+        self._threshold = threshold
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, VectorIndex] = {}
+        # entry key -> (scope, response, expiry or None)
+        self._entries: "OrderedDict[str, Tuple[str, str, Optional[float]]]" = OrderedDict()
+        self._next_id = 0
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    @staticmethod
+    def make_scope(model: str, parameters: Optional[dict] = None) -> str:
+        """
+        Build the scope of a query.
+
+        Args:
+            model: Name of the driver or group answering the query.
+            parameters: Generation parameters that affect the response.
+
+        Returns:
+            str: Scope combining the model and a hash of the parameters.
+        """
+        params = json.dumps(parameters or {}, sort_keys=True, separators=(",", ":"), default=str)
+        return f"{model}:{hashlib.sha256(params.encode('utf-8')).hexdigest()[:16]}"
+
+    def get_or_compute(self, scope: str, prompt: str,
+                       compute: Callable[[], Optional[str]]) -> Optional[str]:
+        """
+        Return the response to a similar cached prompt, or query the model and cache its response.
+
+        Args:
+            scope: Scope from make_scope.
+            prompt: The prompt sent to the model.
+            compute: Callable querying the model.
+
+        Returns:
+            Optional[str]: The cached or freshly computed response.
+        """
+        vector = self._embedder.embed(prompt)
+        cached = self.lookup(scope, vector)
+        if cached is not None:
+            return cached
+        result = compute()
+        if result is not None:
+            self.store(scope, vector, result)
+        return result
+
+    def lookup(self, scope: str, vector: Sequence[float]) -> Optional[str]:
+        """
+        Find the response to the most similar cached prompt of a scope.
+
+        Args:
+            scope: Scope from make_scope.
+            vector: Embedding of the prompt.
+
+        Returns:
+            Optional[str]: The cached response, or None if no prompt is similar enough.
+        """
+        with self._lock:
+            index = self._indexes.get(scope)
+            match = index.search(vector) if index is not None else None
+            if match is not None and match[1] >= self._threshold:
+                key = match[0]
+                _, response, expires_at = self._entries[key]
+                if expires_at is None or time.monotonic() < expires_at:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return response
+                self._remove(key)
+            self._stats["misses"] += 1
+            return None
+
+    def store(self, scope: str, vector: Sequence[float], response: str) -> None:
+        """
+        Cache a response.
+
+        Args:
+            scope: Scope from make_scope.
+            vector: Embedding of the prompt.
+            response: The model response.
+        """
+        expires_at = time.monotonic() + self._ttl if self._ttl else None
+        with self._lock:
+            key = str(self._next_id)
+            self._next_id += 1
+            index = self._indexes.get(scope)
+            if index is None:
+                index = self._indexes[scope] = VectorIndex(self._embedder.dimension)
+            index.add(key, vector)
+            self._entries[key] = (scope, response, expires_at)
+            self._stats["stores"] += 1
+            while len(self._entries) > self._max_entries:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        """Drop every cached response."""
+        with self._lock:
+            self._indexes.clear()
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        """
+        Get cache statistics.
+
+        Returns:
+            dict: Hit, miss, store and eviction counters, the hit ratio, the number of
+                entries and the index backend.
+        """
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries))
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        stats["threshold"] = self._threshold
+        stats["index"] = "numpy" if np is not None else "python"
+        return stats
+
+    def _remove(self, key: str) -> None:
+        """Drop an entry and its vector, and the index of its scope once it is empty."""
+        scope, _, _ = self._entries.pop(key)
+        index = self._indexes[scope]
+        index.remove(key)
+        if len(index) == 0:
+            del self._indexes[scope]
+
+def _normalize(vector: List[float]) -> List[float]:
+    """Scale a vector to unit length, leaving a zero vector unchanged."""
+    norm = math.sqrt(sum(value * value for value in vector))
+    return [value / norm for value in vector] if norm else vector
+
+def _normalize_array(vector: Any) -> Any:
+    """Scale a NumPy vector to unit length, leaving a zero vector unchanged."""
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
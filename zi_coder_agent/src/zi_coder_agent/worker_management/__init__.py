@@ -5,8 +5,18 @@ This module provides a pluggable driver system for managing connections to worke
 It is designed with extensibility in mind, following SOLID principles.
 """
 
+import threading
 from abc import ABC, abstractmethod
-from typing import Dict, Type, Optional, Any
+from concurrent.futures import Future
+from typing import Dict, Type, Optional, Any, Callable, Iterable, List
+
+from .notifications import (
+    TaskNotifier, is_terminal_status, is_failed_status, QUEUE_NOTIFY_POLL_INTERVAL
+)
+from .dedup import TaskDeduplicator, task_content_hash, WORKER_DEDUP_WINDOW, WORKER_DEDUP_MAX_KEYS
+
+class QueueFullError(Exception):
+    """Raised when a task cannot be enqueued because the queue is at capacity."""
 
 class WorkerDriver(ABC):
     """Abstract base class for worker queue drivers."""
@@ -58,9 +68,70 @@ class WorkerDriver(ABC):
             task_id: The ID of the task to retrieve result for.
             
         Returns:
-            Optional[Any]: Task result if completed, None otherwise.
+            Optional[Any]: Task result if completed, None otherwise. Drivers may return
+                a ResultHandle for large results stored on disk.
         """
         pass
+    
+    def enqueue_many(self, tasks: List[dict]) -> List[str]:
+        """
+        Enqueue several tasks.
+        
+        Drivers whose backend supports batched or pipelined submission should override
+        this. The default implementation calls enqueue_task() for each task.
+        
+        Args:
+            tasks: Task specifications, each a dict with a "task_name" and optional
+                "args", "kwargs" and "priority".
+            
+        Returns:
+            List[str]: Task IDs in the order of the given tasks.
+        """
+        task_ids = []
+        for task in tasks:
+            args = (task["task_name"], tuple(task.get("args", ())), dict(task.get("kwargs", {})))
+            if task.get("priority") is None:
+                task_ids.append(self.enqueue_task(*args))
+            else:
+                task_ids.append(self.enqueue_task(*args, priority=task["priority"]))
+        return task_ids
+    
+    def get_status_many(self, task_ids: Iterable[str]) -> Dict[str, dict]:
+        """
+        Retrieve the status of several tasks.
+        
+        Drivers whose backend supports multi-key lookups should override this. The
+        default implementation calls get_task_status() for each task.
+        
+        Args:
+            task_ids: The IDs of the tasks to check.
+            
+        Returns:
+            Dict[str, dict]: Status information of the tasks that were found.
+        """
+        statuses = {}
+        for task_id in task_ids:
+            status = self.get_task_status(task_id)
+            if status is not None:
+                statuses[task_id] = status
+        return statuses
+    
+    def set_status_listener(self, listener: Optional[Callable[[str, dict], None]]) -> bool:
+        """
+        Report task status changes to a listener as they happen.
+        
+        Drivers that learn about status changes, for example from broker events,
+        should override this. The default implementation does not support listeners,
+        and task status changes are detected by polling instead.
+        
+        Args:
+            listener: Called with the task ID and its new status information, or None
+                to remove the listener.
+            
+        Returns:
+            bool: True if the driver reports status changes, False otherwise.
+        """
+        return False
 
 class QueueToolMarketplace:
     """Manages multiple worker queue drivers for different queue systems."""
@@ -68,6 +139,10 @@ class QueueToolMarketplace:
     def __init__(self):
         self._drivers: Dict[str, WorkerDriver] = {}
         self._active_driver: Optional[WorkerDriver] = None
+        self._notifiers: Dict[int, TaskNotifier] = {}
+        self._notifier_lock = threading.Lock()
+        self._deduplicator = TaskDeduplicator()
+        self._workflows = WorkflowRunner(self)
     
     def register_driver(self, name: str, driver: Type[WorkerDriver]) -> None:
         """
@@ -116,21 +191,46 @@ class QueueToolMarketplace:
             return self._active_driver.disconnect()
         return False
     
-    def enqueue_task(self, task_name: str, args: tuple = (), kwargs: dict = {}) -> Optional[str]:
+    def enqueue_task(self, task_name: str, args: tuple = (), kwargs: dict = {},
+                     priority: Optional[int] = None, idempotency_key: Optional[str] = None,
+                     deduplicate: bool = False) -> Optional[str]:
         """
         Enqueue a task using the active worker queue driver.
         
+        When an idempotency key is given, or deduplicate is set, a task already
+        enqueued for the same key, or for the same task name and arguments, is reused
+        while it is pending or running and for a window after it completes.
+        
         Args:
             task_name: The name of the task to enqueue.
             args: Positional arguments for the task.
             kwargs: Keyword arguments for the task.
+            priority: Priority of the task, for drivers that support priorities.
+            idempotency_key: Client-chosen key identifying this submission.
+            deduplicate: Whether to reuse a task with the same name and arguments.
             
         Returns:
             Optional[str]: Task ID if successful, None otherwise.
+            
+        Raises:
+            QueueFullError: If the driver's queue is at capacity.
         """
-        if self._active_driver:
-            return self._active_driver.enqueue_task(task_name, args, kwargs)
-        return None
+        if not self._active_driver:
+            return None
+        driver = self._active_driver
+        
+        def enqueue():
+            if priority is None:
+                return driver.enqueue_task(task_name, args, kwargs)
+            return driver.enqueue_task(task_name, args, kwargs, priority=priority)
+        
+        if idempotency_key is not None:
+            key = f"key:{idempotency_key}"
+        elif deduplicate:
+            key = f"hash:{task_content_hash(task_name, args, kwargs)}"
+        else:
+            return enqueue()
+        return self._deduplicator.enqueue(key, enqueue, driver.get_task_status)[0]
     
     def get_task_status(self, task_id: str) -> Optional[dict]:
         """
@@ -159,3 +259,176 @@ class QueueToolMarketplace:
         if self._active_driver:
             return self._active_driver.get_task_result(task_id)
         return None
+    
+    def enqueue_many(self, tasks: List[dict]) -> Optional[List[str]]:
+        """
+        Enqueue several tasks using the active worker queue driver.
+        
+        Tasks with an "idempotency_key" or "deduplicate" are deduplicated as in
+        enqueue_task and enqueued one by one; the others are submitted in one batch.
+        If the queue fills up part-way, tasks enqueued before stay enqueued.
+        
+        Args:
+            tasks: Task specifications, each a dict with a "task_name" and optional
+                "args", "kwargs", "priority", "idempotency_key" and "deduplicate".
+            
+        Returns:
+            Optional[List[str]]: Task IDs in the order of the given tasks, or None if
+                no active driver.
+            
+        Raises:
+            QueueFullError: If the driver's queue is at capacity.
+        """
+        if not self._active_driver:
+            return None
+        deduplicated = [
+            index for index, task in enumerate(tasks)
+            if task.get("idempotency_key") is not None or task.get("deduplicate")
+        ]
+        if not deduplicated:
+            return self._active_driver.enqueue_many(tasks)
+        task_ids: List[Optional[str]] = [None] * len(tasks)
+        skipped = set(deduplicated)
+        batch = [index for index in range(len(tasks)) if index not in skipped]
+        if batch:
+            batch_ids = self._active_driver.enqueue_many([tasks[index] for index in batch])
+            for index, task_id in zip(batch, batch_ids):
+                task_ids[index] = task_id
+        for index in deduplicated:
+            task = tasks[index]
+            task_ids[index] = self.enqueue_task(
+                task["task_name"], task.get("args", ()), task.get("kwargs", {}),
+                priority=task.get("priority"), idempotency_key=task.get("idempotency_key"),
+                deduplicate=bool(task.get("deduplicate", False))
+            )
+        return task_ids
+    
+    def get_status_many(self, task_ids: Iterable[str]) -> Dict[str, dict]:
+        """
+        Retrieve the status of several tasks using the active driver.
+        
+        Args:
+            task_ids: The IDs of the tasks to check.
+            
+        Returns:
+            Dict[str, dict]: Status information of the tasks that were found, empty if
+                no active driver.
+        """
+        if self._active_driver:
+            return self._active_driver.get_status_many(task_ids)
+        return {}
+    
+    def subscribe(self, task_id: str,
+                  callback: Callable[[str, dict], None]) -> Optional[Callable[[], bool]]:
+        """
+        Call a function whenever the status of a task on the active driver changes.
+        
+        If the task has already finished, the callback is called immediately with its
+        final status. Subscriptions end automatically once the task finishes.
+        
+        Args:
+            task_id: The ID of the task to watch.
+            callback: Called with the task ID and its new status information.
+            
+        Returns:
+            Optional[Callable[[], bool]]: Function that cancels the subscription, or
+                None if no active driver.
+        """
+        notifier = self._get_notifier()
+        if notifier:
+            return notifier.subscribe(task_id, callback)
+        return None
+    
+    def get_task_future(self, task_id: str) -> Optional[Future]:
+        """
+        Get a future resolved with the final status of a task on the active driver.
+        
+        Args:
+            task_id: The ID of the task to watch.
+            
+        Returns:
+            Optional[Future]: Future whose result is the final task status information,
+                or None if no active driver. Cancel it to stop watching the task.
+        """
+        notifier = self._get_notifier()
+        if notifier:
+            return notifier.future(task_id)
+        return None
+    
+    def submit_workflow(self, steps: Dict[str, dict]) -> Optional[str]:
+        """
+        Run a graph of dependent tasks on the active driver.
+        
+        Each step is a dict with a "task_name" and optional "args", "kwargs",
+        "priority", "depends_on" (names of steps that must complete first) and
+        "inputs" (mapping of keyword argument names to the steps whose results are
+        passed in them). Steps are enqueued as soon as their dependencies complete, so
+        independent branches run concurrently. Steps depending on a failed step are
+        skipped.
+        
+        Args:
+            steps: Mapping of step names to step specifications.
+            
+        Returns:
+            Optional[str]: Workflow ID if started, None if no active driver.
+            
+        Raises:
+            ValueError: If a step is invalid, depends on an unknown step, or the
+                dependencies contain a cycle.
+        """
+        if self._active_driver:
+            return self._workflows.submit(steps)
+        return None
+    
+    def get_workflow_status(self, workflow_id: str) -> Optional[dict]:
+        """
+        Get the aggregate and per-step status of a workflow.
+        
+        Args:
+            workflow_id: The ID of the workflow.
+            
+        Returns:
+            Optional[dict]: Workflow status information, or None if not found.
+        """
+        return self._workflows.get_status(workflow_id)
+    
+    def get_workflow_results(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the results of the completed steps of a workflow.
+        
+        Args:
+            workflow_id: The ID of the workflow.
+            
+        Returns:
+            Optional[Dict[str, Any]]: Results keyed by step name, or None if not found.
+        """
+        return self._workflows.get_results(workflow_id)
+    
+    def _get_notifier(self) -> Optional[TaskNotifier]:
+        """
+        Get the notifier of the active driver, creating it on first use.
+        
+        Notifiers of previously active drivers keep delivering to their subscribers,
+        and are closed once no task of theirs is watched any more.
+        """
+        driver = self._active_driver
+        if not driver:
+            return None
+        with self._notifier_lock:
+            notifier = self._notifiers.get(id(driver))
+            if notifier is None:
+                notifier = self._notifiers[id(driver)] = TaskNotifier(driver)
+            for key, other in list(self._notifiers.items()):
+                if other is not notifier and other.idle:
+                    other.close()
+                    del self._notifiers[key]
+            return notifier
+
+from .results import (
+    ResultBackend, LocalResultBackend, ResultHandle, WORKER_RESULT_TTL, WORKER_RESULT_SPILL_BYTES,
+    WORKER_RESULT_MAX_BYTES, WORKER_RESULT_DIR, WORKER_RESULT_STORE
+)
+from .local import LocalWorkerDriver, TASK_REGISTRY, register_task
+from .workflow import (
+    Workflow, WorkflowRunner, WORKER_MAX_FINISHED_WORKFLOWS, WORKER_WORKFLOW_RETRY_INTERVAL
+)
@@ -0,0 +1,124 @@
+"""
+Task Deduplication Module
+
+This module maps idempotency keys, or content hashes of task name and arguments, to the
+task enqueued for them, so that repeated submissions of the same work reuse the
+existing task while it is pending or running and for a window after it completes.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from ..cache_management.single_flight import SingleFlight
+from .notifications import is_failed_status, is_terminal_status
+
+# Deduplication configuration
+WORKER_DEDUP_WINDOW = float(os.environ.get("WORKER_DEDUP_WINDOW", "300"))
+WORKER_DEDUP_MAX_KEYS = int(os.environ.get("WORKER_DEDUP_MAX_KEYS", "100000"))
+
+def task_content_hash(task_name: str, args: tuple = (), kwargs: dict = {}) -> str:
+    """
+    Hash a task name and its arguments.
+
+    Args:
+        task_name: The name of the task.
+        args: Positional arguments for the task.
+        kwargs: Keyword arguments for the task.
+
+    Returns:
+        str: Hex digest identifying the task content.
+    """
+    content = json.dumps([task_name, list(args), kwargs], sort_keys=True,
+                         separators=(",", ":"), default=str)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+class TaskDeduplicator:
+    """
+    Remembers the task enqueued for each key and reuses it while it is still valid.
+
+    A remembered task is reused while it is pending or running, and for ``window``
+    seconds after it completes. Failed tasks and tasks the driver no longer knows are
+    enqueued again. Concurrent submissions with the same key enqueue a single task.
+    """
+
+    def __init__(self, window: float = WORKER_DEDUP_WINDOW,
+                 max_keys: int = WORKER_DEDUP_MAX_KEYS):
+        """
+        Initialize the deduplicator.
+
+        Args:
+            window: Seconds a completed task is reused for.
+            max_keys: Maximum number of remembered keys; the oldest are forgotten first.
+        """
+        self._window = window
+        self._max_keys = max_keys
+        self._lock = threading.Lock()
+        # key -> (task_id, time the task was seen finished or None)
+        self._tasks: "OrderedDict[str, Tuple[str, Optional[float]]]" = OrderedDict()
+        self._single_flight = SingleFlight()
+
+    def enqueue(self, key: str, enqueue: Callable[[], Optional[str]],
+                get_status: Callable[[str], Optional[dict]]) -> Tuple[Optional[str], bool]:
+        """
+        Reuse the task remembered for a key, or enqueue a new one.
+
+        Args:
+            key: Idempotency key or content hash of the task.
+            enqueue: Callable enqueuing the task and returning its ID.
+            get_status: Callable returning the status of a task ID.
+
+        Returns:
+            Tuple[Optional[str], bool]: The task ID, and True if an existing task was
+                reused.
+        """
+        return self._single_flight.do(key, lambda: self._enqueue(key, enqueue, get_status))
+
+    def forget(self, key: str) -> None:
+        """
+        Forget the task remembered for a key.
+
+        Args:
+            key: Idempotency key or content hash of the task.
+        """
+        with self._lock:
+            self._tasks.pop(key, None)
+
+    def _enqueue(self, key: str, enqueue: Callable[[], Optional[str]],
+                 get_status: Callable[[str], Optional[dict]]) -> Tuple[Optional[str], bool]:
+        with self._lock:
+            entry = self._tasks.get(key)
+        if entry is not None:
+            task_id, finished_at = entry
+            if self._is_reusable(key, task_id, finished_at, get_status):
+                return task_id, True
+        task_id = enqueue()
+        if task_id is not None:
+            with self._lock:
+                self._tasks[key] = (task_id, None)
+                self._tasks.move_to_end(key)
+                while len(self._tasks) > self._max_keys:
+                    self._tasks.popitem(last=False)
+        return task_id, False
+
+    def _is_reusable(self, key: str, task_id: str, finished_at: Optional[float],
+                     get_status: Callable[[str], Optional[dict]]) -> bool:
+        """Check whether a remembered task may be returned for a new submission."""
+        if finished_at is not None:
+            return time.monotonic() - finished_at < self._window
+        status = get_status(task_id)
+        if status is None or is_failed_status(status):
+            return False
+        if is_terminal_status(status):
+            finished_at = time.monotonic()
+            if "finished_at" in status and isinstance(status["finished_at"], (int, float)):
+                finished_at -= max(time.time() - status["finished_at"], 0)
+            with self._lock:
+                if key in self._tasks:
+                    self._tasks[key] = (task_id, finished_at)
+            return time.monotonic() - finished_at < self._window
+        return True
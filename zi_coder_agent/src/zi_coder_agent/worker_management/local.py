@@ -0,0 +1,367 @@
+"""
+Local Worker Driver Module
+
+This module provides a first-party worker driver that executes registered tasks in the
+current process on a thread pool, or on a process pool for CPU-heavy work, without a
+message broker. Tasks are dispatched by priority from a bounded queue.
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from . import WorkerDriver, QueueFullError
+from .results import ResultBackend, LocalResultBackend
+
+logger = logging.getLogger(__name__)
+
+# Local worker configuration
+WORKER_LOCAL_MODE = os.environ.get("WORKER_LOCAL_MODE", "thread")
+WORKER_LOCAL_MAX_WORKERS = int(os.environ.get("WORKER_LOCAL_MAX_WORKERS", str(os.cpu_count() or 4)))
+WORKER_LOCAL_MAX_QUEUE = int(os.environ.get("WORKER_LOCAL_MAX_QUEUE", "10000"))
+WORKER_LOCAL_ENQUEUE_TIMEOUT = float(os.environ.get("WORKER_LOCAL_ENQUEUE_TIMEOUT", "0"))
+WORKER_LOCAL_MAX_FINISHED = int(os.environ.get("WORKER_LOCAL_MAX_FINISHED", "10000"))
+
+# Task states
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+# Tasks available to every local driver, keyed by task name
+TASK_REGISTRY: Dict[str, Callable] = {}
+
+def register_task(name: str, func: Optional[Callable] = None):
+    """
+    Register a callable as a task available to every local worker driver.
+
+    Can be used directly or as a decorator::
+
+        @register_task("analyze_file")
+        def analyze_file(path): ...
+
+    Args:
+        name: The task name used by enqueue_task.
+        func: The callable implementing the task. Tasks run on a process pool must be
+            defined at module level so they can be pickled.
+
+    Returns:
+        The registered callable, or a decorator if func is omitted.
+    """
+    if func is None:
+        def decorator(f: Callable) -> Callable:
+            TASK_REGISTRY[name] = f
+            return f
+        return decorator
+    TASK_REGISTRY[name] = func
+    return func
+
+class LocalWorkerDriver(WorkerDriver):
+    """
+    In-process worker driver with priority dispatch and bounded queue depth.
+
+    ``max_workers`` dispatcher threads take the highest-priority pending task from the
+    queue; tasks with equal priority run in submission order. In thread mode the
+    dispatcher runs the task itself; in process mode it hands the task to a process
+    pool so CPU-heavy work can use every core. When the queue is full, enqueue_task
+    waits up to ``enqueue_timeout`` seconds for space and then raises QueueFullError.
+    """
+
+    def __init__(
+        self,
+        mode: str = WORKER_LOCAL_MODE,
+        max_workers: int = WORKER_LOCAL_MAX_WORKERS,
+        max_queue_size: int = WORKER_LOCAL_MAX_QUEUE,
+        enqueue_timeout: float = WORKER_LOCAL_ENQUEUE_TIMEOUT,
+        max_finished: int = WORKER_LOCAL_MAX_FINISHED,
+        result_backend: Optional[ResultBackend] = None,
+    ):
+        """
+        Initialize the driver.
+
+        Args:
+            mode: "thread" to run tasks on threads, "process" to run them on a process pool.
+            max_workers: Number of tasks executed concurrently.
+            max_queue_size: Maximum number of pending tasks.
+            enqueue_timeout: Seconds enqueue_task waits for queue space before failing.
+            max_finished: Number of finished tasks whose status and result are retained.
+            result_backend: Store for task results; defaults to a LocalResultBackend
+                keeping small results in memory and large ones on disk.
+        """
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown worker mode '{mode}'; expected 'thread' or 'process'")
+        self._mode = mode
+        self._max_workers = max_workers
+        self._max_queue_size = max_queue_size
+        self._enqueue_timeout = enqueue_timeout
+        self._max_finished = max_finished
+        self._tasks: Dict[str, Callable] = {}
+        self._queue: List[Tuple[int, int, str]] = []
+        self._sequence = itertools.count()
+        self._records: Dict[str, dict] = {}
+        self._payloads: Dict[str, Tuple[Callable, tuple, dict]] = {}
+        self._results = result_backend or LocalResultBackend()
+        self._finished: "OrderedDict[str, None]" = OrderedDict()
+        self._condition = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._running = False
+        self._status_listener: Optional[Callable[[str, dict], None]] = None
+
+    def register_task(self, name: str, func: Callable) -> None:
+        """
+        Register a task available only to this driver.
+
+        Args:
+            name: The task name used by enqueue_task.
+            func: The callable implementing the task.
+        """
+        self._tasks[name] = func
+
+    def connect(self) -> bool:
+        """Start the dispatcher threads and, in process mode, the process pool."""
+        with self._condition:
+            if self._running:
+                return True
+            self._running = True
+            if self._mode == "process":
+                self._process_pool = ProcessPoolExecutor(max_workers=self._max_workers)
+            self._threads = [
+                threading.Thread(target=self._dispatch_loop, name=f"local-worker-{i}", daemon=True)
+                for i in range(self._max_workers)
+            ]
+        for thread in self._threads:
+            thread.start()
+        return True
+
+    def disconnect(self) -> bool:
+        """Stop the workers after their running tasks finish; pending tasks stay queued."""
+        with self._condition:
+            if not self._running:
+                return True
+            self._running = False
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self._process_pool:
+            self._process_pool.shutdown(wait=True)
+            self._process_pool = None
+        return True
+
+    def enqueue_task(self, task_name: str, args: tuple = (), kwargs: dict = {},
+                     priority: int = 0) -> str:
+        """
+        Enqueue a registered task.
+
+        Args:
+            task_name: The name of the task to enqueue.
+            args: Positional arguments for the task.
+            kwargs: Keyword arguments for the task.
+            priority: Tasks with higher priority are started first.
+
+        Returns:
+            str: Task ID for tracking.
+
+        Raises:
+            ValueError: If no task is registered under task_name.
+            QueueFullError: If the queue stays full for longer than the enqueue timeout.
+        """
+        return self.enqueue_many([
+            {"task_name": task_name, "args": args, "kwargs": kwargs, "priority": priority}
+        ])[0]
+
+    def enqueue_many(self, tasks: List[dict]) -> List[str]:
+        """
+        Enqueue several registered tasks under a single queue lock.
+
+        The tasks are enqueued together: either all of them are queued, or none are.
+
+        Args:
+            tasks: Task specifications, each a dict with a "task_name" and optional
+                "args", "kwargs" and "priority".
+
+        Returns:
+            List[str]: Task IDs in the order of the given tasks.
+
+        Raises:
+            ValueError: If any task name is not registered.
+            QueueFullError: If the queue has no room for every task within the enqueue
+                timeout, or the batch is larger than the queue.
+        """
+        entries = []
+        for task in tasks:
+            task_name = task["task_name"]
+            func = self._tasks.get(task_name) or TASK_REGISTRY.get(task_name)
+            if func is None:
+                raise ValueError(f"Unknown task '{task_name}'")
+            priority = task.get("priority")
+            entries.append((
+                uuid.uuid4().hex, task_name, func, tuple(task.get("args", ())),
+                dict(task.get("kwargs", {})), 0 if priority is None else priority,
+            ))
+        if len(entries) > self._max_queue_size:
+            raise QueueFullError(
+                f"Cannot enqueue {len(entries)} tasks into a queue of {self._max_queue_size}"
+            )
+        if not self._running:
+            self.connect()
+        deadline = time.monotonic() + self._enqueue_timeout
+        with self._condition:
+            while len(self._queue) + len(entries) > self._max_queue_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise QueueFullError(
+                        f"Task queue is full ({self._max_queue_size} pending tasks)"
+                    )
+                self._condition.wait(remaining)
+            enqueued_at = time.time()
+            for task_id, task_name, func, args, kwargs, priority in entries:
+                self._records[task_id] = {
+                    "task_id": task_id,
+                    "task_name": task_name,
+                    "status": PENDING,
+                    "priority": priority,
+                    "enqueued_at": enqueued_at,
+                    "started_at": None,
+                    "finished_at": None,
+                    "error": None,
+                }
+                self._payloads[task_id] = (func, args, kwargs)
+                heapq.heappush(self._queue, (-priority, next(self._sequence), task_id))
+            self._condition.notify_all()
+        return [entry[0] for entry in entries]
+
+    def get_task_status(self, task_id: str) -> Optional[dict]:
+        """
+        Retrieve the status of a specific task.
+
+        Args:
+            task_id: The ID of the task to check.
+
+        Returns:
+            Optional[dict]: Task status information, or None if not found.
+        """
+        with self._condition:
+            record = self._records.get(task_id)
+            return dict(record) if record else None
+
+    def get_status_many(self, task_ids: Iterable[str]) -> Dict[str, dict]:
+        """
+        Retrieve the status of several tasks under a single queue lock.
+
+        Args:
+            task_ids: The IDs of the tasks to check.
+
+        Returns:
+            Dict[str, dict]: Status information of the tasks that were found.
+        """
+        with self._condition:
+            return {
+                task_id: dict(self._records[task_id])
+                for task_id in task_ids if task_id in self._records
+            }
+
+    def set_status_listener(self, listener: Optional[Callable[[str, dict], None]]) -> bool:
+        """
+        Report task status changes to a listener as they happen.
+
+        Args:
+            listener: Called with the task ID and its new status information, or None
+                to remove the listener.
+
+        Returns:
+            bool: Always True.
+        """
+        self._status_listener = listener
+        return True
+
+    def get_task_result(self, task_id: str) -> Optional[Any]:
+        """
+        Retrieve the result of a completed task.
+
+        Args:
+            task_id: The ID of the task to retrieve result for.
+
+        Returns:
+            Optional[Any]: Task result if completed and not expired, a ResultHandle
+                for large results stored on disk, None otherwise.
+        """
+        with self._condition:
+            record = self._records.get(task_id)
+            if not record or record["status"] != COMPLETED:
+                return None
+        return self._results.fetch(task_id)
+
+    def get_queue_depth(self) -> int:
+        """
+        Get the number of pending tasks.
+
+        Returns:
+            int: Number of tasks waiting for a worker.
+        """
+        with self._condition:
+            return len(self._queue)
+
+    def _dispatch_loop(self) -> None:
+        """Take tasks from the priority queue and run them until the driver stops."""
+        while True:
+            with self._condition:
+                while self._running and not self._queue:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                _, _, task_id = heapq.heappop(self._queue)
+                func, args, kwargs = self._payloads.pop(task_id)
+                record = self._records[task_id]
+                record["status"] = RUNNING
+                record["started_at"] = time.time()
+                status = dict(record)
+                # Wake producers waiting for queue space
+                self._condition.notify_all()
+            self._notify(task_id, status)
+            try:
+                if self._process_pool is not None:
+                    result = self._process_pool.submit(func, *args, **kwargs).result()
+                else:
+                    result = func(*args, **kwargs)
+                # Streamed results run the rest of the task while they are stored
+                self._results.store(task_id, result)
+            except Exception as e:
+                self._finish(task_id, FAILED, error=f"{type(e).__name__}: {e}")
+            else:
+                self._finish(task_id, COMPLETED)
+
+    def _finish(self, task_id: str, status: str, error: Optional[str] = None) -> None:
+        """Record the outcome of a task and discard the oldest finished tasks over the limit."""
+        with self._condition:
+            record = self._records[task_id]
+            record["status"] = status
+            record["finished_at"] = time.time()
+            record["error"] = error
+            self._finished[task_id] = None
+            expired = []
+            while len(self._finished) > self._max_finished:
+                expired_id, _ = self._finished.popitem(last=False)
+                self._records.pop(expired_id, None)
+                expired.append(expired_id)
+            status = dict(record)
+        for expired_id in expired:
+            self._results.delete(expired_id)
+        self._notify(task_id, status)
+
+    def _notify(self, task_id: str, status: dict) -> None:
+        """Pass a status change to the listener outside the queue lock."""
+        listener = self._status_listener
+        if listener is not None:
+            try:
+                listener(task_id, status)
+            except Exception:
+                logger.exception("Status listener failed for task %s", task_id)
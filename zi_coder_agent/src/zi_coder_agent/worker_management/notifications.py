@@ -0,0 +1,199 @@
+"""
+Task Notifications Module
+
+This module pushes task status changes to subscribers, so that clients wait for task
+outcomes instead of polling for them. Drivers that report status changes themselves
+notify subscribers directly; for other drivers a single background poller checks every
+watched task with one bulk status lookup per interval.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Notification configuration
+QUEUE_NOTIFY_POLL_INTERVAL = float(os.environ.get("QUEUE_NOTIFY_POLL_INTERVAL", "0.5"))
+
+# Status values after which a task no longer changes, across common queue systems
+TERMINAL_STATUSES = frozenset({"completed", "failed", "success", "failure", "revoked", "cancelled"})
+FAILED_STATUSES = frozenset({"failed", "failure", "revoked", "cancelled"})
+
+StatusCallback = Callable[[str, dict], None]
+
+def is_terminal_status(status: Optional[dict]) -> bool:
+    """
+    Check whether a task status is final.
+
+    Args:
+        status: Task status information from a worker driver.
+
+    Returns:
+        bool: True if the task has finished, False otherwise.
+    """
+    return bool(status) and str(status.get("status", "")).lower() in TERMINAL_STATUSES
+
+def is_failed_status(status: Optional[dict]) -> bool:
+    """
+    Check whether a task status reports a failed or cancelled task.
+
+    Args:
+        status: Task status information from a worker driver.
+
+    Returns:
+        bool: True if the task did not complete successfully, False otherwise.
+    """
+    return bool(status) and str(status.get("status", "")).lower() in FAILED_STATUSES
+
+class TaskNotifier:
+    """Delivers status changes of a driver's tasks to subscribed callbacks."""
+
+    def __init__(self, driver: Any, poll_interval: float = QUEUE_NOTIFY_POLL_INTERVAL):
+        """
+        Initialize the notifier and attach it to the driver.
+
+        Args:
+            driver: The worker driver whose tasks are watched.
+            poll_interval: Seconds between status checks for drivers that do not
+                report status changes themselves.
+        """
+        self._driver = driver
+        self._poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, List[StatusCallback]] = {}
+        self._last_seen: Dict[str, Any] = {}
+        self._poller: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._push = bool(driver.set_status_listener(self.publish))
+
+    @property
+    def driver(self) -> Any:
+        """The driver whose tasks are watched."""
+        return self._driver
+
+    @property
+    def idle(self) -> bool:
+        """Whether no task is being watched."""
+        with self._lock:
+            return not self._subscribers
+
+    def subscribe(self, task_id: str, callback: StatusCallback) -> Callable[[], bool]:
+        """
+        Call a function whenever the status of a task changes.
+
+        If the task has already finished, the callback is called immediately with its
+        final status. Subscriptions end automatically once the task finishes.
+
+        Args:
+            task_id: The ID of the task to watch.
+            callback: Called with the task ID and its new status information.
+
+        Returns:
+            Callable[[], bool]: Function that cancels the subscription.
+        """
+        with self._lock:
+            self._subscribers.setdefault(task_id, []).append(callback)
+            if not self._push and self._poller is None:
+                self._poller = threading.Thread(target=self._poll_loop, name="task-notifier",
+                                                daemon=True)
+                self._poller.start()
+        status = self._driver.get_task_status(task_id)
+        if is_terminal_status(status) and self._unsubscribe(task_id, callback):
+            self._call(callback, task_id, status)
+        return lambda: self._unsubscribe(task_id, callback)
+
+    def future(self, task_id: str) -> Future:
+        """
+        Get a future resolved with the final status of a task.
+
+        Cancelling the future cancels the underlying subscription. Use
+        asyncio.wrap_future to await it from a coroutine.
+
+        Args:
+            task_id: The ID of the task to watch.
+
+        Returns:
+            Future: Future whose result is the final task status information.
+        """
+        future: Future = Future()
+
+        def resolve(_task_id: str, status: dict) -> None:
+            if is_terminal_status(status) and not future.done():
+                future.set_result(status)
+
+        unsubscribe = self.subscribe(task_id, resolve)
+        future.add_done_callback(lambda _: unsubscribe())
+        return future
+
+    def publish(self, task_id: str, status: dict) -> None:
+        """
+        Deliver a status change to the subscribers of a task.
+
+        Args:
+            task_id: The ID of the task whose status changed.
+            status: The new task status information.
+        """
+        with self._lock:
+            if is_terminal_status(status):
+                callbacks = self._subscribers.pop(task_id, [])
+                self._last_seen.pop(task_id, None)
+            else:
+                callbacks = list(self._subscribers.get(task_id, ()))
+        for callback in callbacks:
+            self._call(callback, task_id, status)
+
+    def close(self) -> None:
+        """Detach from the driver, stop polling and drop all subscriptions."""
+        if self._push:
+            self._driver.set_status_listener(None)
+        self._stopped.set()
+        with self._lock:
+            self._subscribers.clear()
+            self._last_seen.clear()
+
+    def _unsubscribe(self, task_id: str, callback: StatusCallback) -> bool:
+        """Remove a callback; return True if it was still subscribed."""
+        with self._lock:
+            callbacks = self._subscribers.get(task_id)
+            if not callbacks or callback not in callbacks:
+                return False
+            callbacks.remove(callback)
+            if not callbacks:
+                del self._subscribers[task_id]
+                self._last_seen.pop(task_id, None)
+            return True
+
+    def _poll_loop(self) -> None:
+        """Check watched tasks until none are left, publishing status changes."""
+        while not self._stopped.wait(self._poll_interval):
+            with self._lock:
+                if not self._subscribers:
+                    self._poller = None
+                    return
+                task_ids = list(self._subscribers)
+            try:
+                statuses = self._driver.get_status_many(task_ids)
+            except Exception:
+                logger.exception("Polling the status of watched tasks failed")
+                continue
+            for task_id, status in statuses.items():
+                with self._lock:
+                    if task_id not in self._subscribers:
+                        continue
+                    changed = self._last_seen.get(task_id) != status.get("status")
+                    self._last_seen[task_id] = status.get("status")
+                if changed:
+                    self.publish(task_id, status)
+        with self._lock:
+            self._poller = None
+
+    @staticmethod
+    def _call(callback: StatusCallback, task_id: str, status: dict) -> None:
+        """Run a callback; a failing subscriber must not affect the others."""
+        try:
+            callback(task_id, status)
+        except Exception:
+            logger.exception("Status subscriber failed for task %s", task_id)
@@ -0,0 +1,315 @@
+"""
+Task Result Store Module
+
+This module keeps task results for a limited time. Small results are stored in a cache
+driver with a TTL; large text and binary results are written to files on disk and
+returned as handles that read them through memory maps, so big payloads never have to
+be held in memory in full.
+"""
+
+import logging
+import mmap
+import os
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterator as IteratorABC
+from typing import Any, Iterator, Optional
+
+from ..cache_management.memory import InMemoryCacheDriver
+
+# Result store configuration
+WORKER_RESULT_TTL = int(os.environ.get("WORKER_RESULT_TTL", "3600"))
+WORKER_RESULT_SPILL_BYTES = int(os.environ.get("WORKER_RESULT_SPILL_BYTES", str(1024 * 1024)))
+WORKER_RESULT_MAX_BYTES = int(os.environ.get("WORKER_RESULT_MAX_BYTES", str(256 * 1024 * 1024)))
+WORKER_RESULT_DIR = os.environ.get(
+    "WORKER_RESULT_DIR", os.path.join(tempfile.gettempdir(), "zi_coder_agent_results")
+)
+WORKER_RESULT_STORE = os.environ.get("WORKER_RESULT_STORE", "memory")
+
+logger = logging.getLogger(__name__)
+
+# Marks cache entries that point to a result file
+_FILE_MARKER = "__result_file__"
+
+class ResultHandle:
+    """Reference to a task result stored in a file on disk."""
+
+    def __init__(self, path: str, size: int, encoding: Optional[str] = None):
+        """
+        Initialize the handle.
+
+        Args:
+            path: Path of the result file.
+            size: Size of the result in bytes.
+            encoding: Text encoding of the result, or None for binary results.
+        """
+        self.path = path
+        self.size = size
+        self.encoding = encoding
+
+    def open(self) -> mmap.mmap:
+        """
+        Map the result file into memory for reading.
+
+        Returns:
+            mmap.mmap: Read-only memory map of the result; close it when done.
+        """
+        with open(self.path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def iter_chunks(self, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """
+        Read the result in chunks.
+
+        Args:
+            chunk_size: Maximum size of each chunk in bytes.
+
+        Yields:
+            bytes: Consecutive chunks of the result.
+        """
+        if self.size == 0:
+            return
+        with self.open() as mapped:
+            for offset in range(0, self.size, chunk_size):
+                yield mapped[offset:offset + chunk_size]
+
+    def read(self) -> Any:
+        """
+        Read the whole result into memory.
+
+        Returns:
+            Any: The result as str for text results, or bytes for binary results.
+        """
+        data = b"".join(self.iter_chunks())
+        return data.decode(self.encoding) if self.encoding else data
+
+    def to_dict(self) -> dict:
+        """
+        Describe the handle.
+
+        Returns:
+            dict: Size and encoding of the result.
+        """
+        return {"type": "file", "size": self.size, "encoding": self.encoding}
+
+class ResultBackend(ABC):
+    """Abstract base class for task result stores."""
+
+    @abstractmethod
+    def store(self, task_id: str, result: Any) -> None:
+        """
+        Store the result of a task.
+
+        Args:
+            task_id: The ID of the task.
+            result: The task result.
+        """
+        pass
+
+    @abstractmethod
+    def fetch(self, task_id: str) -> Optional[Any]:
+        """
+        Retrieve the result of a task.
+
+        Args:
+            task_id: The ID of the task.
+
+        Returns:
+            Optional[Any]: The result, a ResultHandle for results stored on disk, or
+                None if the result is unknown or has expired.
+        """
+        pass
+
+    @abstractmethod
+    def delete(self, task_id: str) -> None:
+        """
+        Discard the result of a task.
+
+        Args:
+            task_id: The ID of the task.
+        """
+        pass
+
+class LocalResultBackend(ResultBackend):
+    """
+    Result store keeping small results in a cache and large ones in files on disk.
+
+    Text and binary results of at least ``spill_bytes`` characters or bytes are
+    written to ``spill_dir`` and fetched as ResultHandle objects. Tasks may also
+    return an iterator of str or bytes chunks, such as a generator, which is written
+    to disk chunk by chunk without building the whole result in memory. All other
+    results are stored in the cache. Results the cache cannot take, such as values its
+    codec cannot encode, are kept in a private in-memory cache instead. Results expire
+    after ``ttl`` seconds; expired files are removed by a sweep that runs at most once
+    per TTL during stores.
+    """
+
+    KEY_PREFIX = "task_result"
+
+    def __init__(
+        self,
+        cache: Any = None,
+        ttl: int = WORKER_RESULT_TTL,
+        spill_bytes: int = WORKER_RESULT_SPILL_BYTES,
+        spill_dir: str = WORKER_RESULT_DIR,
+        max_bytes: int = WORKER_RESULT_MAX_BYTES,
+    ):
+        """
+        Initialize the result store.
+
+        Args:
+            cache: Cache backend providing get, set and delete, such as
+                CacheToolMarketplace. Defaults to a private in-memory cache.
+            ttl: Seconds after which results expire.
+            spill_bytes: Text results of at least this many characters and binary
+                results of at least this many bytes are written to disk.
+            spill_dir: Directory holding result files.
+            max_bytes: Memory limit of the default in-memory cache in bytes.
+        """
+        self._cache = cache if cache is not None else InMemoryCacheDriver(
+            max_bytes=max_bytes, default_ttl=ttl
+        )
+        self._fallback = InMemoryCacheDriver(
+            max_bytes=max_bytes, default_ttl=ttl
+        ) if cache is not None else None
+        self._ttl = ttl
+        self._spill_bytes = spill_bytes
+        self._spill_dir = spill_dir
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def store(self, task_id: str, result: Any) -> None:
+        """
+        Store the result of a task, writing large or streamed results to disk.
+
+        Only errors of a streamed result are raised; a result the cache rejects is
+        kept in memory instead, so that storing it cannot fail a task that succeeded.
+
+        Args:
+            task_id: The ID of the task.
+            result: The task result.
+
+        Raises:
+            TypeError: If a streamed result yields a chunk that is not str or bytes.
+        """
+        if isinstance(result, IteratorABC):
+            result = self._write_file(task_id, result)
+        elif isinstance(result, (str, bytes, bytearray)) and len(result) >= self._spill_bytes:
+            result = self._write_file(task_id, iter((result,)))
+        if isinstance(result, ResultHandle):
+            result = {_FILE_MARKER: result.path, "size": result.size,
+                      "encoding": result.encoding}
+        key = self._key(task_id)
+        try:
+            stored = self._cache.set(key, result, self._ttl)
+        except (TypeError, ValueError, OverflowError) as e:
+            if self._fallback is None:
+                raise
+            logger.warning("Cache rejected the result of task %s (%s); keeping it in memory",
+                           task_id, e)
+            stored = False
+        if not stored and self._fallback is not None:
+            self._fallback.set(key, result, self._ttl)
+        self._maybe_sweep()
+
+    def fetch(self, task_id: str) -> Optional[Any]:
+        """
+        Retrieve the result of a task.
+
+        Args:
+            task_id: The ID of the task.
+
+        Returns:
+            Optional[Any]: The result, a ResultHandle for results stored on disk, or
+                None if the result is unknown or has expired.
+        """
+        value = self._cache.get(self._key(task_id))
+        if value is None and self._fallback is not None:
+            value = self._fallback.get(self._key(task_id))
+        if isinstance(value, dict) and _FILE_MARKER in value:
+            if not os.path.exists(value[_FILE_MARKER]):
+                return None
+            return ResultHandle(value[_FILE_MARKER], value["size"], value["encoding"])
+        return value
+
+    def delete(self, task_id: str) -> None:
+        """
+        Discard the result of a task and its file, if any.
+
+        Args:
+            task_id: The ID of the task.
+        """
+        self._cache.delete(self._key(task_id))
+        if self._fallback is not None:
+            self._fallback.delete(self._key(task_id))
+        try:
+            os.remove(self._path(task_id))
+        except OSError:
+            pass
+
+    def purge_expired(self) -> int:
+        """
+        Remove result files older than the TTL, and partial files left behind by
+        interrupted writes.
+
+        Returns:
+            int: Number of files removed.
+        """
+        cutoff = time.time() - self._ttl
+        removed = 0
+        try:
+            entries = list(os.scandir(self._spill_dir))
+        except OSError:
+            return 0
+        for entry in entries:
+            try:
+                stale = entry.name.endswith((".result", ".result.tmp"))
+                if stale and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def _write_file(self, task_id: str, chunks: Iterator[Any]) -> ResultHandle:
+        """Write result chunks to the task's result file."""
+        os.makedirs(self._spill_dir, exist_ok=True)
+        path = self._path(task_id)
+        encoding = None
+        size = 0
+        try:
+            with open(path + ".tmp", "wb") as f:
+                for chunk in chunks:
+                    if isinstance(chunk, str):
+                        encoding = "utf-8"
+                        chunk = chunk.encode("utf-8")
+                    elif not isinstance(chunk, (bytes, bytearray)):
+                        raise TypeError(
+                            f"Streamed results must yield str or bytes, not {type(chunk).__name__}"
+                        )
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(path + ".tmp", path)
+        except BaseException:
+            try:
+                os.remove(path + ".tmp")
+            except OSError:
+                pass
+            raise
+        return ResultHandle(path, size, encoding)
+
+    def _maybe_sweep(self) -> None:
+        """Remove expired result files at most once per TTL."""
+        with self._lock:
+            if time.monotonic() - self._last_sweep < self._ttl:
+                return
+            self._last_sweep = time.monotonic()
+        self.purge_expired()
+
+    def _key(self, task_id: str) -> str:
+        return f"{self.KEY_PREFIX}:{task_id}"
+
+    def _path(self, task_id: str) -> str:
+        return os.path.join(self._spill_dir, f"{task_id}.result")
@@ -0,0 +1,314 @@
+"""
+Workflow Module
+
+This module runs graphs of dependent tasks on a queue marketplace. Steps whose
+dependencies have completed are enqueued as soon as the last dependency finishes,
+independent branches run concurrently, and the results of dependencies are passed to
+the steps that consume them without a round trip through the client.
+
+Steps are enqueued on the runner's own threads rather than on the worker threads that
+report task completions, so a full queue never blocks the workers that drain it.
+Steps that find the queue full are retried after an interval.
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from . import QueueFullError
+from .notifications import is_failed_status, is_terminal_status
+
+# Workflow configuration
+WORKER_MAX_FINISHED_WORKFLOWS = int(os.environ.get("WORKER_MAX_FINISHED_WORKFLOWS", "1000"))
+WORKER_WORKFLOW_RETRY_INTERVAL = float(os.environ.get("WORKER_WORKFLOW_RETRY_INTERVAL", "0.5"))
+
+# Threads enqueueing the steps unblocked by finished tasks
+WORKFLOW_ADVANCE_WORKERS = 4
+
+# Step and workflow states
+PENDING = "pending"
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+class Workflow:
+    """
+    State of one workflow run.
+
+    Each step is a dict with a "task_name" and optional "args", "kwargs", "priority",
+    "depends_on" (names of steps that must complete first) and "inputs" (mapping of
+    keyword argument names to the steps whose results are passed in them). Steps
+    named in "inputs" are dependencies as well.
+    """
+
+    def __init__(self, steps: Dict[str, dict]):
+        """
+        Initialize the workflow.
+
+        Args:
+            steps: Mapping of step names to step specifications.
+
+        Raises:
+            ValueError: If a step is invalid, depends on an unknown step, or the
+                dependencies contain a cycle.
+        """
+        if not steps:
+            raise ValueError("A workflow needs at least one step")
+        self.workflow_id = uuid.uuid4().hex
+        self.steps = steps
+        self.dependencies: Dict[str, List[str]] = {}
+        for name, spec in steps.items():
+            if not isinstance(spec, dict) or not spec.get("task_name"):
+                raise ValueError(f"Step '{name}' needs a task_name")
+            if not isinstance(spec.get("args", []), (list, tuple)):
+                raise ValueError(f"args of step '{name}' must be a list")
+            if not isinstance(spec.get("kwargs", {}), dict):
+                raise ValueError(f"kwargs of step '{name}' must be an object")
+            priority = spec.get("priority")
+            if priority is not None and (not isinstance(priority, int)
+                                         or isinstance(priority, bool)):
+                raise ValueError(f"priority of step '{name}' must be an integer")
+            depends_on = spec.get("depends_on", [])
+            if not isinstance(depends_on, list) or \
+                    not all(isinstance(dep, str) for dep in depends_on):
+                raise ValueError(f"depends_on of step '{name}' must be a list of step names")
+            inputs = spec.get("inputs", {})
+            if not isinstance(inputs, dict) or \
+                    not all(isinstance(dep, str) for dep in inputs.values()):
+                raise ValueError(f"Inputs of step '{name}' must map argument names to steps")
+            dependencies = list(depends_on)
+            dependencies += [
+                dep for dep in spec.get("inputs", {}).values() if dep not in dependencies
+            ]
+            unknown = [dep for dep in dependencies if dep not in steps]
+            if unknown:
+                raise ValueError(f"Step '{name}' depends on unknown steps {unknown}")
+            self.dependencies[name] = dependencies
+        self._check_acyclic()
+        self.state = {
+            name: {"status": PENDING, "task_id": None, "error": None} for name in steps
+        }
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.lock = threading.Lock()
+
+    def _check_acyclic(self) -> None:
+        """Raise ValueError if the step dependencies contain a cycle."""
+        remaining = {name: len(deps) for name, deps in self.dependencies.items()}
+        ready = [name for name, count in remaining.items() if count == 0]
+        visited = 0
+        while ready:
+            name = ready.pop()
+            visited += 1
+            for other, deps in self.dependencies.items():
+                if name in deps:
+                    remaining[other] -= 1
+                    if remaining[other] == 0:
+                        ready.append(other)
+        if visited < len(self.steps):
+            raise ValueError("Workflow dependencies contain a cycle")
+
+    def take_ready(self) -> List[str]:
+        """Mark and return the pending steps whose dependencies have all completed."""
+        with self.lock:
+            ready = [
+                name for name, state in self.state.items()
+                if state["status"] == PENDING and all(
+                    self.state[dep]["status"] == COMPLETED for dep in self.dependencies[name]
+                )
+            ]
+            for name in ready:
+                self.state[name]["status"] = QUEUED
+            return ready
+
+    def defer(self, name: str) -> None:
+        """Return a step taken by take_ready to pending, so that it is taken again later."""
+        with self.lock:
+            if self.state[name]["status"] == QUEUED and self.state[name]["task_id"] is None:
+                self.state[name]["status"] = PENDING
+
+    def update(self, name: str, status: str, task_id: Optional[str] = None,
+               error: Optional[str] = None) -> None:
+        """Record a step status change, skipping the dependents of failed steps."""
+        with self.lock:
+            state = self.state[name]
+            if state["status"] in (COMPLETED, FAILED, SKIPPED):
+                return
+            state["status"] = status
+            if task_id is not None:
+                state["task_id"] = task_id
+            if error is not None:
+                state["error"] = error
+            if status == FAILED:
+                self._skip_dependents(name)
+            if self.finished_at is None and all(
+                s["status"] in (COMPLETED, FAILED, SKIPPED) for s in self.state.values()
+            ):
+                self.finished_at = time.time()
+
+    def _skip_dependents(self, name: str) -> None:
+        for other, deps in self.dependencies.items():
+            if name in deps and self.state[other]["status"] == PENDING:
+                self.state[other]["status"] = SKIPPED
+                self.state[other]["error"] = f"Dependency '{name}' failed"
+                self._skip_dependents(other)
+
+    @property
+    def status(self) -> str:
+        """Aggregate status of the workflow."""
+        statuses = {state["status"] for state in self.state.values()}
+        if self.finished_at is not None:
+            return COMPLETED if statuses == {COMPLETED} else FAILED
+        if statuses == {PENDING}:
+            return PENDING
+        return RUNNING
+
+    def to_dict(self) -> dict:
+        """Describe the workflow and each of its steps."""
+        with self.lock:
+            return {
+                "workflow_id": self.workflow_id,
+                "status": self.status,
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+                "steps": {name: dict(state) for name, state in self.state.items()},
+            }
+
+class WorkflowRunner:
+    """Runs workflows on a QueueToolMarketplace, reacting to task status notifications."""
+
+    def __init__(self, marketplace: Any, max_finished: int = WORKER_MAX_FINISHED_WORKFLOWS,
+                 retry_interval: float = WORKER_WORKFLOW_RETRY_INTERVAL):
+        """
+        Initialize the runner.
+
+        Args:
+            marketplace: The QueueToolMarketplace that enqueues and watches the tasks.
+            max_finished: Number of finished workflows whose status is retained.
+            retry_interval: Seconds before steps that found the queue full are retried.
+        """
+        self._marketplace = marketplace
+        self._max_finished = max_finished
+        self._retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._workflows: "OrderedDict[str, Workflow]" = OrderedDict()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def submit(self, steps: Dict[str, dict]) -> str:
+        """
+        Start a workflow.
+
+        Args:
+            steps: Mapping of step names to step specifications.
+
+        Returns:
+            str: Workflow ID for tracking.
+
+        Raises:
+            ValueError: If the workflow is invalid.
+        """
+        workflow = Workflow(steps)
+        with self._lock:
+            self._workflows[workflow.workflow_id] = workflow
+            self._prune()
+        self._advance(workflow)
+        return workflow.workflow_id
+
+    def get_status(self, workflow_id: str) -> Optional[dict]:
+        """
+        Get the aggregate and per-step status of a workflow.
+
+        Args:
+            workflow_id: The ID of the workflow.
+
+        Returns:
+            Optional[dict]: Workflow status information, or None if not found.
+        """
+        workflow = self._workflows.get(workflow_id)
+        return workflow.to_dict() if workflow else None
+
+    def get_results(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the results of the completed steps of a workflow.
+
+        Args:
+            workflow_id: The ID of the workflow.
+
+        Returns:
+            Optional[Dict[str, Any]]: Results keyed by step name, or None if not found.
+        """
+        workflow = self._workflows.get(workflow_id)
+        if workflow is None:
+            return None
+        with workflow.lock:
+            completed = [
+                (name, state["task_id"]) for name, state in workflow.state.items()
+                if state["status"] == COMPLETED
+            ]
+        return {name: self._marketplace.get_task_result(task_id) for name, task_id in completed}
+
+    def _advance(self, workflow: Workflow) -> None:
+        """Enqueue every step whose dependencies have completed."""
+        deferred = False
+        for name in workflow.take_ready():
+            spec = workflow.steps[name]
+            try:
+                kwargs = dict(spec.get("kwargs", {}))
+                for param, dep in spec.get("inputs", {}).items():
+                    dep_task_id = workflow.state[dep]["task_id"]
+                    kwargs[param] = self._marketplace.get_task_result(dep_task_id)
+                task_id = self._marketplace.enqueue_task(
+                    spec["task_name"], tuple(spec.get("args", ())), kwargs,
+                    priority=spec.get("priority")
+                )
+                if task_id is None:
+                    raise RuntimeError("No active queue driver")
+            except QueueFullError:
+                workflow.defer(name)
+                deferred = True
+                continue
+            except Exception as e:
+                workflow.update(name, FAILED, error=f"{type(e).__name__}: {e}")
+                continue
+            workflow.update(name, QUEUED, task_id=task_id)
+            self._marketplace.subscribe(
+                task_id, lambda _, status, name=name: self._on_status(workflow, name, status)
+            )
+        if deferred:
+            timer = threading.Timer(self._retry_interval, self._schedule, (workflow,))
+            timer.daemon = True
+            timer.start()
+
+    def _on_status(self, workflow: Workflow, name: str, status: dict) -> None:
+        """Record a step status change and start the steps it unblocks."""
+        if not is_terminal_status(status):
+            workflow.update(name, RUNNING)
+            return
+        if is_failed_status(status):
+            workflow.update(name, FAILED, error=status.get("error") or status.get("status"))
+        else:
+            workflow.update(name, COMPLETED)
+        # Status changes arrive on worker threads, which must not wait for queue space
+        self._schedule(workflow)
+
+    def _schedule(self, workflow: Workflow) -> None:
+        """Advance a workflow on one of the runner's threads."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=WORKFLOW_ADVANCE_WORKERS, thread_name_prefix="workflow"
+                )
+            executor = self._executor
+        executor.submit(self._advance, workflow)
+
+    def _prune(self) -> None:
+        """Forget the oldest finished workflows beyond the retention limit."""
+        finished = [wid for wid, wf in self._workflows.items() if wf.finished_at is not None]
+        for workflow_id in finished[:max(len(finished) - self._max_finished, 0)]:
+            del self._workflows[workflow_id]
@@ -5,10 +5,15 @@ This file contains unit tests for the API Server module, ensuring the functional
 of the Flask application and its endpoints.
 """
 
+import sys
+import threading
+import time
 import unittest
 from unittest.mock import MagicMock, patch
 from flask import Flask
-from zi_coder_agent.api_server import create_app
+from zi_coder_agent.api_server import create_app, create_asgi_app, run_production
+from zi_coder_agent.worker_management import QueueFullError, register_task
+from zi_coder_agent.model_management import CircuitOpenError, ContextOverflowError
 
 class TestAPIServer(unittest.TestCase):
     """Test suite for API Server endpoints."""
@@ -72,6 +77,178 @@ class TestAPIServer(unittest.TestCase):
             self.assertEqual(response.status_code, 200)
             self.assertIn(b'Mock response', response.data)
     
+    def test_query_model_stream(self):
+        """Test streaming a model response as server-sent events."""
+        with patch('zi_coder_agent.model_management.ModelMarketplace.stream') as mock_stream:
+            mock_stream.return_value = iter(['Mock ', 'response'])
+            response = self.client.post('/api/models/query',
+                                        json={'input': 'test input', 'stream': True})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, 'text/event-stream')
+            body = response.get_data(as_text=True)
+            self.assertIn('data: {"chunk": "Mock "}', body)
+            self.assertIn('data: {"chunk": "response"}', body)
+            self.assertTrue(body.endswith('event: done\ndata: {}\n\n'))
+    
+    def test_query_model_stream_error(self):
+        """Test that a failure part-way through a stream is reported as an event."""
+        def failing_stream():
+            yield 'partial'
+            raise RuntimeError('backend failed')
+        with patch('zi_coder_agent.model_management.ModelMarketplace.stream') as mock_stream:
+            mock_stream.return_value = failing_stream()
+            response = self.client.post('/api/models/query',
+                                        json={'input': 'test input', 'stream': True})
+            body = response.get_data(as_text=True)
+            self.assertIn('data: {"chunk": "partial"}', body)
+            self.assertIn('event: error\ndata: {"error": "backend failed"}', body)
+    
+    def test_query_model_stream_rejected(self):
+        """Test that a stream rejected by the circuit breaker fails fast with 503."""
+        with patch('zi_coder_agent.model_management.ModelMarketplace.stream') as mock_stream:
+            mock_stream.side_effect = CircuitOpenError('Circuit breaker is open')
+            response = self.client.post('/api/models/query',
+                                        json={'input': 'test input', 'stream': True})
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers['Retry-After'], '1')
+    
+    def test_query_model_stream_no_active_driver(self):
+        """Test streaming when no model driver is active."""
+        with patch('zi_coder_agent.model_management.ModelMarketplace.stream') as mock_stream:
+            mock_stream.return_value = None
+            response = self.client.post('/api/models/query',
+                                        json={'input': 'test input', 'stream': True})
+            self.assertEqual(response.status_code, 400)
+    
+    def test_query_model_with_model(self):
+        """Test that a query can name the model driver or group to use."""
+        with patch('zi_coder_agent.model_management.ModelMarketplace.query') as mock_query:
+            mock_query.return_value = 'Mock response'
+            self.client.post('/api/models/query', json={'input': 'test input', 'model': 'pool'})
+            mock_query.assert_called_once_with('test input', model='pool')
+    
+    def test_register_model_group(self):
+        """Test registering a model group and reading routing statistics."""
+        base = 'zi_coder_agent.model_management.ModelMarketplace.'
+        with patch(base + 'register_group') as mock_register:
+            response = self.client.post('/api/models/groups', json={
+                'name': 'pool', 'members': ['a', 'b'], 'weights': [2, 1], 'strategy': 'weighted'
+            })
+            self.assertEqual(response.status_code, 200)
+            mock_register.assert_called_once_with('pool', ['a', 'b'], [2, 1], 'weighted')
+            mock_register.side_effect = ValueError('Unknown drivers')
+            response = self.client.post('/api/models/groups', json={
+                'name': 'pool', 'members': ['c']
+            })
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/models/groups', json={'name': 'pool'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/models/routing')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('groups', response.get_json()['routing'])
+    
+    def test_query_model_unavailable(self):
+        """Test that rejected and timed-out queries map to 503 and 504."""
+        from zi_coder_agent.model_management import CircuitOpenError
+        with patch('zi_coder_agent.model_management.ModelMarketplace.query') as mock_query:
+            mock_query.side_effect = CircuitOpenError('Circuit breaker is open')
+            response = self.client.post('/api/models/query', json={'input': 'test input'})
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers['Retry-After'], '1')
+            mock_query.side_effect = TimeoutError('deadline exceeded')
+            response = self.client.post('/api/models/query', json={'input': 'test input'})
+            self.assertEqual(response.status_code, 504)
+    
+    def test_model_health_and_limits(self):
+        """Test reading driver health, setting limits and resetting breakers."""
+        base = 'zi_coder_agent.model_management.ModelMarketplace.'
+        with patch(base + 'get_driver_health') as mock_health:
+            mock_health.return_value = {'mock': {'breaker': {'state': 'open'}}}
+            response = self.client.get('/api/models/health')
+            self.assertEqual(response.get_json()['drivers']['mock']['breaker']['state'], 'open')
+        with patch(base + 'configure_driver_limits') as mock_limits:
+            mock_limits.return_value = True
+            response = self.client.put('/api/models/limits/mock', json={
+                'max_concurrency': 4, 'timeout': 30
+            })
+            self.assertEqual(response.status_code, 200)
+            mock_limits.assert_called_once_with('mock', max_concurrency=4, timeout=30.0)
+            response = self.client.put('/api/models/limits/mock', json={'timeout': -1})
+            self.assertEqual(response.status_code, 400)
+        response = self.client.put('/api/models/limits/missing', json={'timeout': 1})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post('/api/models/breakers/missing/reset')
+        self.assertEqual(response.status_code, 404)
+    
+    def test_get_model_cache_stats(self):
+        """Test getting model response cache statistics via API."""
+        base = 'zi_coder_agent.model_management.ModelMarketplace.'
+        with patch(base + 'get_cache_stats') as mock_stats:
+            mock_stats.return_value = {'hits': 3, 'misses': 1}
+            response = self.client.get('/api/models/cache/stats')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()['stats']['hits'], 3)
+    
+    def test_get_model_cache_stats_disabled(self):
+        """Test getting cache statistics when the response cache is disabled."""
+        base = 'zi_coder_agent.model_management.ModelMarketplace.'
+        with patch(base + 'get_cache_stats') as mock_stats:
+            mock_stats.return_value = None
+            response = self.client.get('/api/models/cache/stats')
+            self.assertEqual(response.status_code, 404)
+    
+    def test_get_model_semantic_cache_stats(self):
+        """Test getting statistics of the model semantic cache."""
+        base = 'zi_coder_agent.model_management.ModelMarketplace.'
+        with patch(base + 'get_semantic_cache_stats') as mock_stats:
+            mock_stats.return_value = {'hits': 2, 'misses': 1, 'index': 'python'}
+            response = self.client.get('/api/models/semantic_cache/stats')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()['stats']['hits'], 2)
+            mock_stats.return_value = None
+            response = self.client.get('/api/models/semantic_cache/stats')
+            self.assertEqual(response.status_code, 404)
+    
+    def test_model_context_lifecycle(self):
+        """Test opening, updating, querying and closing a model context handle."""
+        context = {'handle': 'abc', 'model': None, 'version': 1, 'pinned': {}, 'messages': 0,
+                   'tokens': 0}
+        base = 'zi_coder_agent.model_management.ModelMarketplace.'
+        with patch(base + 'create_context', return_value=context) as mock_create:
+            response = self.client.post('/api/models/contexts', json={
+                'deltas': [{'op': 'set', 'key': 'system', 'text': 'Be brief'}]
+            })
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.get_json()['context']['handle'], 'abc')
+            mock_create.side_effect = ValueError("Unknown delta op 'x'")
+            response = self.client.post('/api/models/contexts', json={'deltas': [{'op': 'x'}]})
+            self.assertEqual(response.status_code, 400)
+        with patch(base + 'update_context', return_value=context):
+            response = self.client.patch('/api/models/contexts/abc', json={'deltas': []})
+            self.assertEqual(response.status_code, 200)
+            response = self.client.patch('/api/models/contexts/abc', json={})
+            self.assertEqual(response.status_code, 400)
+        with patch(base + 'get_context', return_value=context), \
+                patch(base + 'query_context') as mock_query:
+            mock_query.return_value = {'result': 'hi', 'tokens': 3, 'dropped': 0,
+                                       'context': context}
+            response = self.client.post('/api/models/contexts/abc/query', json={
+                'deltas': [{'op': 'append', 'text': 'hello'}]
+            })
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()['result'], 'hi')
+            mock_query.assert_called_with('abc', [{'op': 'append', 'text': 'hello'}], True)
+            mock_query.side_effect = ContextOverflowError('Context does not fit')
+            response = self.client.post('/api/models/contexts/abc/query', json={})
+            self.assertEqual(response.status_code, 413)
+        with patch(base + 'delete_context', return_value=False):
+            response = self.client.delete('/api/models/contexts/abc')
+            self.assertEqual(response.status_code, 404)
+        response = self.client.get('/api/models/contexts/missing')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post('/api/models/contexts/missing/query', json={})
+        self.assertEqual(response.status_code, 404)
+    
     def test_query_model_missing_input(self):
         """Test querying a model with missing input."""
         response = self.client.post('/api/models/query', json={})
@@ -135,6 +312,73 @@ class TestAPIServer(unittest.TestCase):
             self.assertEqual(response.status_code, 404)
             self.assertIn(b'Key not found or no active cache driver', response.data)
 
+    def test_default_memory_cache_driver(self):
+        """Test that the built-in memory cache driver serves set and get requests."""
+        self.client.post('/api/cache/set', json={'key': 'test_key', 'value': 'test_value'})
+        response = self.client.get('/api/cache/get/test_key')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['value'], 'test_value')
+    
+    def test_bulk_cache_operations(self):
+        """Test setting, getting and deleting several cache values per request."""
+        response = self.client.post('/api/cache/bulk/set', json={
+            'items': {'a': 1, 'b': 'two'},
+            'ttl': 60
+        })
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post('/api/cache/bulk/get', json={'keys': ['a', 'b', 'c']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {'values': {'a': 1, 'b': 'two'}, 'missing': ['c']})
+        response = self.client.post('/api/cache/bulk/delete', json={'keys': ['a', 'c']})
+        self.assertEqual(response.get_json(), {'deleted': 1})
+    
+    def test_bulk_cache_missing_data(self):
+        """Test bulk cache requests with missing data."""
+        self.assertEqual(self.client.post('/api/cache/bulk/get', json={}).status_code, 400)
+        self.assertEqual(self.client.post('/api/cache/bulk/set', json={}).status_code, 400)
+        self.assertEqual(self.client.post('/api/cache/bulk/delete', json={}).status_code, 400)
+    
+    def test_bulk_cache_invalid_keys(self):
+        """Test that bulk cache requests reject keys that are not strings."""
+        for path in ('/api/cache/bulk/get', '/api/cache/bulk/delete'):
+            response = self.client.post(path, json={'keys': [{'a': 1}]})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(b'Keys must be strings', response.data)
+    
+    def test_raw_codec_rejected_for_result_store(self):
+        """Test that the raw codec cannot back the task result store."""
+        with patch('zi_coder_agent.api_server.WORKER_RESULT_STORE', 'cache'), \
+                patch('zi_coder_agent.api_server.CACHE_CODEC', 'raw'):
+            with self.assertRaises(ValueError):
+                create_app()
+    
+    def test_bulk_cache_too_many_keys(self):
+        """Test that bulk cache requests are limited in size."""
+        with patch('zi_coder_agent.api_server.CACHE_BULK_MAX_KEYS', 2):
+            response = self.client.post('/api/cache/bulk/get', json={'keys': ['a', 'b', 'c']})
+        self.assertEqual(response.status_code, 400)
+    
+    def test_bulk_cache_set_failure(self):
+        """Test bulk set with a failing driver."""
+        with patch('zi_coder_agent.cache_management.CacheToolMarketplace.set_many') as mock_set:
+            mock_set.return_value = False
+            response = self.client.post('/api/cache/bulk/set', json={'items': {'a': 1}})
+            self.assertEqual(response.status_code, 400)
+    
+    def test_get_cache_stats(self):
+        """Test getting cache driver statistics via API."""
+        self.client.get('/api/cache/get/missing')
+        response = self.client.get('/api/cache/stats')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['stats']['misses'], 1)
+    
+    def test_get_cache_stats_not_supported(self):
+        """Test getting statistics when the active driver does not track them."""
+        with patch('zi_coder_agent.cache_management.CacheToolMarketplace.get_stats') as mock_stats:
+            mock_stats.return_value = None
+            response = self.client.get('/api/cache/stats')
+            self.assertEqual(response.status_code, 404)
+
     def test_set_cache_value_missing_data(self):
         """Test setting a cache value with missing data."""
         response = self.client.post('/api/cache/set', json={})
@@ -238,6 +482,143 @@ class TestAPIServer(unittest.TestCase):
             self.assertEqual(response.status_code, 400)
             self.assertIn(b'No active MCP server driver or tool execution failed', response.data)
 
+    def test_use_mcp_tool_on_server(self):
+        """Test that a server named in the request is passed to the marketplace."""
+        base = 'zi_coder_agent.mcp_server_management.MCPServerMarketplace.'
+        with patch(base + 'use_tool') as mock_use:
+            mock_use.return_value = 'tool_result'
+            self.client.post('/api/mcp_servers/tool/test_tool', json={
+                'arguments': {}, 'server': 'git'
+            })
+            mock_use.assert_called_once_with('test_tool', {}, server='git')
+    
+    def test_mcp_tool_index(self):
+        """Test getting the merged tool index and connecting to all servers."""
+        base = 'zi_coder_agent.mcp_server_management.MCPServerMarketplace.'
+        with patch(base + 'get_all_tools') as mock_tools:
+            mock_tools.return_value = {'files': [{'name': 'read_file'}], 'git': ['git_log']}
+            response = self.client.get('/api/mcp_servers/tool_index?refresh=true')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()['tools'],
+                             {'read_file': ['files'], 'git_log': ['git']})
+        response = self.client.post('/api/mcp_servers/connect_all')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['servers'], {})
+    
+    def test_get_mcp_tools_refresh(self):
+        """Test that ?refresh=true bypasses the catalog cache."""
+        base = 'zi_coder_agent.mcp_server_management.MCPServerMarketplace.'
+        with patch(base + 'get_tools') as mock_get:
+            mock_get.return_value = ['tool1']
+            self.client.get('/api/mcp_servers/tools?refresh=true')
+            mock_get.assert_called_once_with(refresh=True)
+    
+    def test_get_mcp_tool(self):
+        """Test looking up a single tool definition."""
+        base = 'zi_coder_agent.mcp_server_management.MCPServerMarketplace.'
+        with patch(base + 'get_tool') as mock_get:
+            mock_get.return_value = {'name': 'read_file'}
+            response = self.client.get('/api/mcp_servers/tools/read_file')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()['tool'], {'name': 'read_file'})
+        response = self.client.get('/api/mcp_servers/tools/missing')
+        self.assertEqual(response.status_code, 404)
+    
+    def test_invalidate_mcp_catalogs(self):
+        """Test dropping cached MCP catalogs."""
+        base = 'zi_coder_agent.mcp_server_management.MCPServerMarketplace.'
+        with patch(base + 'invalidate_catalogs') as mock_invalidate:
+            response = self.client.post('/api/mcp_servers/catalog/invalidate', json={
+                'server': 'git', 'kind': 'tools'
+            })
+            self.assertEqual(response.status_code, 200)
+            mock_invalidate.assert_called_once_with('git', 'tools')
+    
+    def test_use_mcp_tool_batch(self):
+        """Test running a batch of tool calls."""
+        outcomes = [{
+            'index': 0, 'id': 'a', 'tool_name': 'search',
+            'status': 'ok', 'result': 'r', 'elapsed': 0.1,
+        }]
+        base = 'zi_coder_agent.mcp_server_management.MCPServerMarketplace.'
+        with patch(base + 'use_tools') as mock_use:
+            mock_use.return_value = outcomes
+            response = self.client.post('/api/mcp_servers/tool_batch', json={
+                'calls': [{'tool_name': 'search', 'id': 'a'}], 'max_concurrency': 2, 'timeout': 5
+            })
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()['results'], outcomes)
+            mock_use.assert_called_once_with([{'tool_name': 'search', 'id': 'a'}],
+                                             max_concurrency=2, timeout=5.0)
+    
+    def test_use_mcp_tool_batch_stream(self):
+        """Test streaming the outcomes of a batch of tool calls."""
+        outcomes = [
+            {'index': 1, 'tool_name': 'b', 'status': 'ok'},
+            {'index': 0, 'tool_name': 'a', 'status': 'timeout'},
+        ]
+        base = 'zi_coder_agent.mcp_server_management.MCPServerMarketplace.'
+        with patch(base + 'iter_tool_results') as mock_iter:
+            mock_iter.return_value = iter(outcomes)
+            response = self.client.post('/api/mcp_servers/tool_batch', json={
+                'calls': [{'tool_name': 'a'}, {'tool_name': 'b'}], 'stream': True
+            })
+            self.assertEqual(response.mimetype, 'text/event-stream')
+            body = response.get_data(as_text=True)
+        self.assertEqual(body.count('event: result'), 2)
+        self.assertLess(body.index('"tool_name": "b"'), body.index('"tool_name": "a"'))
+        self.assertIn('event: done\ndata: {"count": 2}', body)
+    
+    def test_use_mcp_tool_batch_invalid(self):
+        """Test rejecting invalid tool call batches."""
+        response = self.client.post('/api/mcp_servers/tool_batch', json={'calls': []})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/mcp_servers/tool_batch', json={
+            'calls': [{'arguments': {}}]
+        })
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/mcp_servers/tool_batch', json={
+            'calls': [{'tool_name': 'a'}], 'timeout': 'soon'
+        })
+        self.assertEqual(response.status_code, 400)
+        with patch('zi_coder_agent.api_server.MCP_BATCH_MAX_CALLS', 1):
+            response = self.client.post('/api/mcp_servers/tool_batch', json={
+                'calls': [{'tool_name': 'a'}, {'tool_name': 'b'}]
+            })
+            self.assertEqual(response.status_code, 400)
+    
+    def test_mcp_result_cache(self):
+        """Test managing the MCP result cache."""
+        response = self.client.get('/api/mcp_servers/result_cache')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('hits', response.get_json()['stats'])
+        base = 'zi_coder_agent.mcp_server_management.MCPServerMarketplace.'
+        with patch(base + 'set_tool_cache_rule') as mock_rule:
+            response = self.client.put('/api/mcp_servers/result_cache/rules/read_file', json={
+                'ttl': 60, 'server': 'files'
+            })
+            self.assertEqual(response.status_code, 200)
+            mock_rule.assert_called_once_with('read_file', 60.0, 'files')
+        response = self.client.put('/api/mcp_servers/result_cache/rules/read_file', json={
+            'ttl': 'long'
+        })
+        self.assertEqual(response.status_code, 400)
+        with patch(base + 'invalidate_results') as mock_invalidate:
+            response = self.client.post('/api/mcp_servers/result_cache/invalidate', json={
+                'server': 'files'
+            })
+            self.assertEqual(response.status_code, 200)
+            mock_invalidate.assert_called_once_with('files')
+    
+    def test_mcp_sessions(self):
+        """Test getting the state of MCP session pools."""
+        base = 'zi_coder_agent.mcp_server_management.MCPServerMarketplace.'
+        with patch(base + 'get_session_status') as mock_status:
+            mock_status.return_value = {'files': {'connected': True, 'sessions': []}}
+            response = self.client.get('/api/mcp_servers/sessions')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()['servers'], mock_status.return_value)
+    
     def test_register_queue_driver(self):
         """Test registering a new queue driver via API."""
         response = self.client.post('/api/queue/register', json={
@@ -285,6 +666,17 @@ class TestAPIServer(unittest.TestCase):
             self.assertEqual(response.status_code, 200)
             self.assertIn(b'task_123', response.data)
 
+    def test_enqueue_task_invalid_options(self):
+        """Test that mistyped task options are rejected with 400 instead of failing."""
+        for options in ({'priority': 'high'}, {'priority': True}, {'args': 5},
+                        {'kwargs': [1]}):
+            response = self.client.post('/api/queue/enqueue',
+                                        json=dict(options, task_name='test_task'))
+            self.assertEqual(response.status_code, 400, options)
+            response = self.client.post('/api/queue/bulk/enqueue',
+                                        json={'tasks': [dict(options, task_name='test_task')]})
+            self.assertEqual(response.status_code, 400, options)
+    
     def test_enqueue_task_missing_data(self):
         """Test enqueuing a task with missing data."""
         response = self.client.post('/api/queue/enqueue', json={})
@@ -303,6 +695,210 @@ class TestAPIServer(unittest.TestCase):
             self.assertEqual(response.status_code, 400)
             self.assertIn(b'No active queue driver or enqueue failed', response.data)
 
+    def test_enqueue_task_queue_full(self):
+        """Test that a full queue is reported as temporarily unavailable."""
+        base = 'zi_coder_agent.worker_management.QueueToolMarketplace.'
+        with patch(base + 'enqueue_task') as mock_enqueue:
+            mock_enqueue.side_effect = QueueFullError('Task queue is full')
+            response = self.client.post('/api/queue/enqueue', json={'task_name': 'test_task'})
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers['Retry-After'], '1')
+    
+    def test_enqueue_unknown_task(self):
+        """Test enqueuing a task the local driver does not know."""
+        response = self.client.post('/api/queue/enqueue', json={'task_name': 'unknown_task'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b'Unknown task', response.data)
+    
+    def test_local_queue_driver_runs_task(self):
+        """Test running a task end to end with the built-in local driver."""
+        register_task('api_test_add', lambda a, b: a + b)
+        response = self.client.post('/api/queue/enqueue', json={
+            'task_name': 'api_test_add', 'args': [2, 3], 'priority': 1
+        })
+        task_id = response.get_json()['task_id']
+        for _ in range(500):
+            status = self.client.get(f'/api/queue/status/{task_id}').get_json()['status']
+            if status['status'] == 'completed':
+                break
+            time.sleep(0.01)
+        response = self.client.get(f'/api/queue/result/{task_id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['result'], 5)
+    
+    def test_bulk_queue_operations(self):
+        """Test enqueuing and checking several tasks in one request each."""
+        register_task('api_test_add', lambda a, b: a + b)
+        response = self.client.post('/api/queue/bulk/enqueue', json={'tasks': [
+            {'task_name': 'api_test_add', 'args': [1, 2]},
+            {'task_name': 'api_test_add', 'args': [3, 4], 'priority': 5},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        task_ids = response.get_json()['task_ids']
+        self.assertEqual(len(task_ids), 2)
+        
+        response = self.client.post('/api/queue/bulk/status', json={
+            'task_ids': task_ids + ['missing']
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(set(data['statuses']), set(task_ids))
+        self.assertEqual(data['missing'], ['missing'])
+        
+        tasks = [{'task_name': 'api_test_add', 'args': [1, 2], 'idempotency_key': 'bulk-1'}] * 2
+        response = self.client.post('/api/queue/bulk/enqueue', json={'tasks': tasks})
+        first, second = response.get_json()['task_ids']
+        self.assertEqual(first, second)
+    
+    def test_bulk_queue_invalid_requests(self):
+        """Test bulk queue requests with missing or invalid data."""
+        self.assertEqual(self.client.post('/api/queue/bulk/enqueue', json={}).status_code, 400)
+        self.assertEqual(self.client.post('/api/queue/bulk/status', json={}).status_code, 400)
+        response = self.client.post('/api/queue/bulk/enqueue', json={'tasks': [{'args': [1]}]})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/queue/bulk/enqueue', json={
+            'tasks': [{'task_name': 'unknown_task'}]
+        })
+        self.assertEqual(response.status_code, 400)
+        with patch('zi_coder_agent.api_server.QUEUE_BULK_MAX_TASKS', 1):
+            response = self.client.post('/api/queue/bulk/status', json={'task_ids': ['a', 'b']})
+        self.assertEqual(response.status_code, 400)
+    
+    def test_bulk_enqueue_queue_full(self):
+        """Test that a bulk enqueue into a full queue is reported as unavailable."""
+        base = 'zi_coder_agent.worker_management.QueueToolMarketplace.'
+        with patch(base + 'enqueue_many') as mock_enqueue:
+            mock_enqueue.side_effect = QueueFullError('Task queue is full')
+            response = self.client.post('/api/queue/bulk/enqueue', json={
+                'tasks': [{'task_name': 'a'}]
+            })
+            self.assertEqual(response.status_code, 503)
+    
+    def test_wait_for_task(self):
+        """Test long-polling until a task finishes."""
+        register_task('api_test_add', lambda a, b: a + b)
+        task_id = self.client.post('/api/queue/enqueue', json={
+            'task_name': 'api_test_add', 'args': [2, 3]
+        }).get_json()['task_id']
+        response = self.client.get(f'/api/queue/wait/{task_id}?timeout=5')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertTrue(data['done'])
+        self.assertEqual(data['status']['status'], 'completed')
+        self.assertEqual(data['result'], 5)
+    
+    def test_wait_for_task_timeout(self):
+        """Test that a wait request returns the current status when it times out."""
+        release = threading.Event()
+        self.addCleanup(release.set)
+        register_task('api_test_block', lambda: release.wait(5))
+        task_id = self.client.post('/api/queue/enqueue', json={
+            'task_name': 'api_test_block'
+        }).get_json()['task_id']
+        response = self.client.get(f'/api/queue/wait/{task_id}?timeout=0.05')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.get_json()['done'])
+        self.assertEqual(self.client.get('/api/queue/wait/missing').status_code, 404)
+    
+    def test_stream_task_events(self):
+        """Test streaming task status changes as server-sent events."""
+        register_task('api_test_add', lambda a, b: a + b)
+        task_id = self.client.post('/api/queue/enqueue', json={
+            'task_name': 'api_test_add', 'args': [2, 3]
+        }).get_json()['task_id']
+        response = self.client.get(f'/api/queue/events/{task_id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        body = response.get_data(as_text=True)
+        self.assertIn('"status": "completed"', body)
+        self.assertTrue(body.endswith('event: done\ndata: {"result": 5}\n\n'))
+        self.assertEqual(self.client.get('/api/queue/events/missing').status_code, 404)
+    
+    def test_get_large_task_result(self):
+        """Test that results stored on disk are streamed and described by handle."""
+        register_task('api_test_stream', lambda: ('x' * 1024 for _ in range(1024)))
+        task_id = self.client.post('/api/queue/enqueue', json={
+            'task_name': 'api_test_stream'
+        }).get_json()['task_id']
+        data = self.client.get(f'/api/queue/wait/{task_id}?timeout=5').get_json()
+        self.assertEqual(data['result'], {
+            'type': 'file', 'size': 1024 * 1024, 'encoding': 'utf-8',
+            'url': f'/api/queue/result/{task_id}'
+        })
+        response = self.client.get(f'/api/queue/result/{task_id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/plain')
+        self.assertEqual(len(response.get_data()), 1024 * 1024)
+    
+    def test_enqueue_task_idempotency_key(self):
+        """Test that enqueue requests with the same idempotency key return one task."""
+        release = threading.Event()
+        self.addCleanup(release.set)
+        register_task('api_test_block', lambda: release.wait(5))
+        first = self.client.post('/api/queue/enqueue', json={'task_name': 'api_test_block'},
+                                 headers={'Idempotency-Key': 'req-1'}).get_json()['task_id']
+        second = self.client.post('/api/queue/enqueue', json={
+            'task_name': 'api_test_block', 'idempotency_key': 'req-1'
+        }).get_json()['task_id']
+        third = self.client.post('/api/queue/enqueue', json={
+            'task_name': 'api_test_block'
+        }).get_json()['task_id']
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, third)
+    
+    def test_enqueue_task_deduplicate(self):
+        """Test that identical enqueue requests are deduplicated on request."""
+        release = threading.Event()
+        self.addCleanup(release.set)
+        register_task('api_test_block', lambda: release.wait(5))
+        payload = {'task_name': 'api_test_block', 'deduplicate': True}
+        first = self.client.post('/api/queue/enqueue', json=payload).get_json()['task_id']
+        second = self.client.post('/api/queue/enqueue', json=payload).get_json()['task_id']
+        self.assertEqual(first, second)
+    
+    def test_workflow_endpoints(self):
+        """Test starting a workflow and reading its status and results."""
+        register_task('api_test_add', lambda a, b: a + b)
+        response = self.client.post('/api/queue/workflows', json={'steps': {
+            'first': {'task_name': 'api_test_add', 'args': [1, 2]},
+            'second': {'task_name': 'api_test_add', 'args': [10], 'inputs': {'b': 'first'}},
+        }})
+        self.assertEqual(response.status_code, 200)
+        workflow_id = response.get_json()['workflow_id']
+        for _ in range(500):
+            status = self.client.get(f'/api/queue/workflows/{workflow_id}').get_json()['status']
+            if status['finished_at'] is not None:
+                break
+            time.sleep(0.01)
+        self.assertEqual(status['status'], 'completed')
+        response = self.client.get(f'/api/queue/workflows/{workflow_id}/results')
+        self.assertEqual(response.get_json()['results'], {'first': 3, 'second': 13})
+    
+    def test_workflow_invalid_requests(self):
+        """Test workflow requests with invalid data or unknown workflows."""
+        self.assertEqual(self.client.post('/api/queue/workflows', json={}).status_code, 400)
+        response = self.client.post('/api/queue/workflows', json={'steps': {
+            'a': {'task_name': 'api_test_add', 'depends_on': ['a']}
+        }})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/queue/workflows', json={'steps': {
+            'a': {'task_name': 'api_test_add'},
+            'b': {'task_name': 'api_test_add', 'depends_on': 'a'}
+        }})
+        self.assertEqual(response.status_code, 400)
+        for step in ({'args': 5}, {'kwargs': [1]}, {'priority': 'high'}):
+            response = self.client.post('/api/queue/workflows', json={'steps': {
+                'a': dict(step, task_name='api_test_add')
+            }})
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/api/queue/workflows/missing').status_code, 404)
+        self.assertEqual(self.client.get('/api/queue/workflows/missing/results').status_code, 404)
+    
+    def test_get_task_result_not_found(self):
+        """Test getting the result of an unknown task."""
+        response = self.client.get('/api/queue/result/missing')
+        self.assertEqual(response.status_code, 404)
+    
     def test_get_task_status(self):
         """Test getting task status via API."""
         with patch('zi_coder_agent.worker_management.QueueToolMarketplace.get_task_status') as mock_status:
@@ -335,6 +931,18 @@ class TestAPIServer(unittest.TestCase):
             self.assertEqual(response.status_code, 400)
             self.assertIn(b'No active model driver or query failed', response.data)
 
+    def test_database_not_reinitialized_per_request(self):
+        """Test that requests do not reconnect or recreate the database schema."""
+        db_manager = self.app.extensions['db_manager']
+        with patch.object(db_manager, 'connect') as mock_connect, \
+                patch.object(db_manager, 'create_all') as mock_create_all, \
+                patch.object(db_manager, 'remove_session') as mock_remove:
+            self.client.post('/api/models/query', json={})
+            self.client.post('/api/models/query', json={})
+            mock_connect.assert_not_called()
+            mock_create_all.assert_not_called()
+            self.assertEqual(mock_remove.call_count, 2)
+
     def test_swagger_ui_endpoint(self):
         """Test accessing the Swagger UI endpoint."""
         response = self.client.get('/swagger', follow_redirects=True)
@@ -343,5 +951,50 @@ class TestAPIServer(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn(b'Zi Coder Agent API', response.data)
 
+class TestServing(unittest.TestCase):
+    """Test suite for production serving entry points."""
+    
+    def test_create_asgi_app(self):
+        """Test wrapping the Flask application for ASGI servers."""
+        wsgi_module = MagicMock()
+        app = Flask(__name__)
+        with patch.dict(sys.modules, {'a2wsgi': wsgi_module}):
+            asgi_app = create_asgi_app(lambda: app, threads=16)
+        wsgi_module.WSGIMiddleware.assert_called_once_with(app, workers=16)
+        self.assertIs(asgi_app, wsgi_module.WSGIMiddleware.return_value)
+    
+    def test_create_asgi_app_missing_dependency(self):
+        """Test that a missing a2wsgi dependency is reported clearly."""
+        with patch.dict(sys.modules, {'a2wsgi': None}):
+            with self.assertRaises(RuntimeError):
+                create_asgi_app(lambda: Flask(__name__))
+    
+    def test_run_production_prefers_gunicorn(self):
+        """Test that gunicorn is used with the configured workers and threads."""
+        app = Flask(__name__)
+        with patch.dict(sys.modules, {'gunicorn': MagicMock()}), \
+                patch('zi_coder_agent.api_server.serving._run_gunicorn') as mock_run, \
+                self.assertLogs('zi_coder_agent.api_server.serving', 'WARNING'):
+            server = run_production(app, host='127.0.0.1', port=8000, workers=4, threads=32,
+                                    timeout=60)
+        self.assertEqual(server, 'gunicorn')
+        mock_run.assert_called_once_with(app, '127.0.0.1', 8000, 4, 32, 60)
+    
+    def test_run_production_falls_back_to_waitress(self):
+        """Test that waitress is used when gunicorn is unavailable."""
+        app = Flask(__name__)
+        with patch.dict(sys.modules, {'gunicorn': None, 'waitress': MagicMock()}), \
+                patch('zi_coder_agent.api_server.serving._run_waitress') as mock_run:
+            server = run_production(app, host='127.0.0.1', port=8000, workers=4, threads=32,
+                                    timeout=60)
+        self.assertEqual(server, 'waitress')
+        mock_run.assert_called_once_with(app, '127.0.0.1', 8000, 32, 60)
+    
+    def test_run_production_without_server(self):
+        """Test that a missing production server is reported clearly."""
+        with patch.dict(sys.modules, {'gunicorn': None, 'waitress': None}):
+            with self.assertRaises(RuntimeError):
+                run_production(Flask(__name__))
+
 if __name__ == '__main__':
     unittest.main()
@@ -5,9 +5,14 @@ This file contains unit tests for the Cache Management module, ensuring the func
 of the CacheToolMarketplace and CacheDriver classes.
 """
 
+import threading
+import time
 import unittest
-from unittest.mock import MagicMock
-from zi_coder_agent.cache_management import CacheToolMarketplace, CacheDriver
+from unittest.mock import MagicMock, patch
+from zi_coder_agent.cache_management import (
+    CacheToolMarketplace, CacheDriver, InMemoryCacheDriver, TieredCacheDriver, SingleFlight,
+    Serializer, SerializingCacheDriver, Codec
+)
 
 class MockCacheDriver(CacheDriver):
     """Mock implementation of CacheDriver for testing purposes."""
@@ -128,5 +133,463 @@ class TestCacheToolMarketplace(unittest.TestCase):
         value = self.marketplace.get("key")
         self.assertIsNone(value)
 
+    def test_get_stats_with_active_driver(self):
+        """Test getting statistics from a driver that tracks them."""
+        self.marketplace.register_driver("memory", InMemoryCacheDriver)
+        self.marketplace.set_active_driver("memory")
+        self.marketplace.get("key")
+        self.assertEqual(self.marketplace.get_stats()["misses"], 1)
+    
+    def test_get_stats_not_supported(self):
+        """Test getting statistics from a driver that does not track them."""
+        self.marketplace.register_driver("mock", MockCacheDriver)
+        self.marketplace.set_active_driver("mock")
+        self.assertIsNone(self.marketplace.get_stats())
+    
+    def test_get_stats_without_active_driver(self):
+        """Test getting statistics without an active driver."""
+        self.assertIsNone(self.marketplace.get_stats())
+
+class TestCacheBatchOperations(unittest.TestCase):
+    """Test suite for multi-key cache operations."""
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.marketplace = CacheToolMarketplace()
+    
+    def test_default_batch_operations(self):
+        """Test the loop-based fallbacks on a driver without native support."""
+        driver = MockCacheDriver()
+        self.assertEqual(driver.get_many(["a", "b"]), {"a": "Value for a", "b": "Value for b"})
+        self.assertTrue(driver.set_many({"a": 1, "b": 2}, 60))
+        self.assertEqual(driver.delete_many(["a", "b"]), 2)
+    
+    def test_memory_batch_operations(self):
+        """Test the native batch operations of the in-memory driver."""
+        self.marketplace.register_driver("memory", InMemoryCacheDriver)
+        self.marketplace.set_active_driver("memory")
+        self.assertTrue(self.marketplace.set_many({"a": 1, "b": 2, "c": 3}, 60))
+        self.assertEqual(self.marketplace.get_many(["a", "c", "missing"]), {"a": 1, "c": 3})
+        self.assertEqual(self.marketplace.delete_many(["a", "b", "missing"]), 2)
+        self.assertEqual(self.marketplace.get_many(["a", "b", "c"]), {"c": 3})
+    
+    def test_tiered_get_many_fetches_only_local_misses(self):
+        """Test that the tiered driver only asks the remote tier for local misses."""
+        remote = InMemoryCacheDriver()
+        driver = TieredCacheDriver(remote)
+        driver.set("a", 1)
+        remote.set("b", 2)
+        remote.get_many = MagicMock(wraps=remote.get_many)
+        self.assertEqual(driver.get_many(["a", "b"]), {"a": 1, "b": 2})
+        remote.get_many.assert_called_once_with(["b"])
+        self.assertEqual(driver.get_many(["a", "b"]), {"a": 1, "b": 2})
+        remote.get_many.assert_called_once()
+    
+    def test_batch_operations_without_active_driver(self):
+        """Test batch operations without an active driver."""
+        self.assertEqual(self.marketplace.get_many(["a"]), {})
+        self.assertFalse(self.marketplace.set_many({"a": 1}))
+        self.assertEqual(self.marketplace.delete_many(["a"]), 0)
+
+class TestGetOrCompute(unittest.TestCase):
+    """Test suite for single-flight get-or-compute in the marketplace."""
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.marketplace = CacheToolMarketplace()
+        self.marketplace.register_driver("memory", InMemoryCacheDriver)
+        self.marketplace.set_active_driver("memory")
+    
+    def test_compute_on_miss_and_reuse(self):
+        """Test that a computed value is stored and reused."""
+        compute = MagicMock(return_value="value")
+        self.assertEqual(self.marketplace.get_or_compute("key", compute, ttl=60), "value")
+        self.assertEqual(self.marketplace.get_or_compute("key", compute, ttl=60), "value")
+        compute.assert_called_once()
+    
+    def test_plain_values_are_returned(self):
+        """Test that values stored with set() are returned without recomputation."""
+        self.marketplace.set("key", "plain")
+        compute = MagicMock()
+        self.assertEqual(self.marketplace.get_or_compute("key", compute), "plain")
+        compute.assert_not_called()
+    
+    def test_concurrent_misses_compute_once(self):
+        """Test that concurrent misses for one key run the computation once."""
+        calls = []
+        release = threading.Event()
+        
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return "value"
+        
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                self.marketplace.get_or_compute("key", compute, ttl=60)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["value"] * 5)
+    
+    def test_compute_error_propagates(self):
+        """Test that a failing computation raises and stores nothing."""
+        with self.assertRaises(ValueError):
+            self.marketplace.get_or_compute("key", MagicMock(side_effect=ValueError("boom")))
+        self.assertIsNone(self.marketplace.get("key"))
+    
+    def test_none_is_not_stored(self):
+        """Test that None results are not cached."""
+        compute = MagicMock(return_value=None)
+        self.assertIsNone(self.marketplace.get_or_compute("key", compute))
+        self.assertIsNone(self.marketplace.get_or_compute("key", compute))
+        self.assertEqual(compute.call_count, 2)
+    
+    def test_early_refresh(self):
+        """Test that probabilistic early refresh recomputes shortly before expiry."""
+        with patch('zi_coder_agent.cache_management.time.time') as mock_time:
+            mock_time.return_value = 1000.0
+            self.marketplace.get_or_compute("key", lambda: time.sleep(0.01) or "old", ttl=60)
+            mock_time.return_value = 1059.9
+            with patch('zi_coder_agent.cache_management.random.random', return_value=0.99):
+                value = self.marketplace.get_or_compute("key", lambda: "new", ttl=60,
+                                                        early_refresh_beta=1000.0)
+        self.assertEqual(value, "new")
+    
+    def test_no_early_refresh_without_beta(self):
+        """Test that values are reused until expiry when early refresh is disabled."""
+        with patch('zi_coder_agent.cache_management.time.time') as mock_time:
+            mock_time.return_value = 1000.0
+            self.marketplace.get_or_compute("key", lambda: "old", ttl=60)
+            mock_time.return_value = 1059.9
+            value = self.marketplace.get_or_compute("key", lambda: "new", ttl=60)
+        self.assertEqual(value, "old")
+    
+    def test_stale_while_revalidate(self):
+        """Test that an expired value is served while it is refreshed in the background."""
+        refreshed = threading.Event()
+        
+        def compute():
+            refreshed.set()
+            return "new"
+        
+        with patch('zi_coder_agent.cache_management.time.time') as mock_time:
+            mock_time.return_value = 1000.0
+            self.marketplace.get_or_compute("key", lambda: "old", ttl=60, stale_ttl=30)
+            mock_time.return_value = 1070.0
+            value = self.marketplace.get_or_compute("key", compute, ttl=60, stale_ttl=30)
+            self.assertEqual(value, "old")
+            self.assertTrue(refreshed.wait(5))
+            for _ in range(100):
+                if not self.marketplace._single_flight.in_flight("key"):
+                    break
+                time.sleep(0.01)
+            value = self.marketplace.get_or_compute("key", compute, ttl=60, stale_ttl=30)
+        self.assertEqual(value, "new")
+    
+    def test_single_flight_try_do(self):
+        """Test that try_do skips work already in progress."""
+        flight = SingleFlight()
+        inner = []
+        
+        def outer():
+            inner.append(flight.try_do("key", lambda: "inner"))
+            return "outer"
+        
+        self.assertEqual(flight.try_do("key", outer), (True, "outer"))
+        self.assertEqual(inner, [(False, None)])
+
+class TestSerialization(unittest.TestCase):
+    """Test suite for cache value serialization."""
+    
+    def test_json_round_trip(self):
+        """Test encoding and decoding JSON values."""
+        serializer = Serializer("json", compress_threshold=-1)
+        value = {"result": "text", "items": [1, 2, 3]}
+        data = serializer.dumps(value)
+        self.assertIsInstance(data, bytes)
+        self.assertEqual(serializer.loads(data), value)
+    
+    def test_raw_round_trip(self):
+        """Test the raw codec for str and bytes values."""
+        serializer = Serializer("raw")
+        self.assertEqual(serializer.loads(serializer.dumps("text")), "text")
+        self.assertEqual(serializer.loads(serializer.dumps(b"\x00bytes")), b"\x00bytes")
+        with self.assertRaises(TypeError):
+            serializer.dumps({"not": "raw"})
+    
+    def test_compression_above_threshold(self):
+        """Test that large payloads are compressed and decoded transparently."""
+        serializer = Serializer("json", compress_threshold=100)
+        small = serializer.dumps("short")
+        large_value = "completion text " * 1000
+        large = serializer.dumps(large_value)
+        self.assertEqual(small[3], 0)
+        self.assertEqual(large[3] & 1, 1)
+        self.assertLess(len(large), len(large_value) / 10)
+        self.assertEqual(serializer.loads(large), large_value)
+        self.assertGreater(serializer.get_stats()["compression_ratio"], 1)
+    
+    def test_reads_values_written_with_another_codec(self):
+        """Test that the envelope's codec id is used for decoding."""
+        self.assertEqual(Serializer("json").loads(Serializer("raw").dumps("text")), "text")
+    
+    def test_non_envelope_values_pass_through(self):
+        """Test that values stored without serialization are returned unchanged."""
+        serializer = Serializer("json")
+        self.assertEqual(serializer.loads("plain"), "plain")
+        self.assertEqual(serializer.loads(b"plain bytes"), b"plain bytes")
+    
+    def test_unknown_codec(self):
+        """Test selecting an unknown codec."""
+        with self.assertRaises(ValueError):
+            Serializer("unknown")
+    
+    def test_msgpack_missing_dependency(self):
+        """Test that a missing msgpack dependency is reported clearly."""
+        with patch.dict('sys.modules', {'msgpack': None}):
+            with self.assertRaises(RuntimeError):
+                Serializer("msgpack")
+    
+    def test_serializing_driver(self):
+        """Test that the driver stores encoded values and returns decoded ones."""
+        inner = InMemoryCacheDriver()
+        driver = SerializingCacheDriver(inner, Serializer("json", compress_threshold=10))
+        driver.set("key", {"a": "x" * 100})
+        self.assertIsInstance(inner.get("key"), bytes)
+        self.assertEqual(driver.get("key"), {"a": "x" * 100})
+        driver.set_many({"b": [1], "c": "two"})
+        self.assertEqual(driver.get_many(["b", "c", "d"]), {"b": [1], "c": "two"})
+        self.assertIn("serialization", driver.get_stats())
+    
+    def test_marketplace_serialization_with_near_cache(self):
+        """Test that the near-cache keeps decoded values in front of the serializer."""
+        marketplace = CacheToolMarketplace()
+        marketplace.register_driver("memory", InMemoryCacheDriver)
+        marketplace.enable_serialization("json")
+        marketplace.enable_near_cache()
+        marketplace.set_active_driver("memory")
+        self.assertIsInstance(marketplace._active_driver, TieredCacheDriver)
+        self.assertIsInstance(marketplace._active_driver.remote, SerializingCacheDriver)
+        marketplace.set("key", {"a": 1})
+        self.assertIsInstance(marketplace._drivers["memory"].get("key"), bytes)
+        self.assertEqual(marketplace.get("key"), {"a": 1})
+        marketplace.disable_serialization()
+        marketplace.disable_near_cache()
+        self.assertIs(marketplace._active_driver, marketplace._drivers["memory"])
+
+    def test_get_or_compute_rejects_raw_codec(self):
+        """Test that get_or_compute refuses a codec that cannot encode its entries."""
+        marketplace = CacheToolMarketplace()
+        marketplace.register_driver("memory", InMemoryCacheDriver)
+        marketplace.set_active_driver("memory")
+        marketplace.enable_serialization("raw")
+        self.assertTrue(marketplace.set("text", "value"))
+        compute = MagicMock(return_value="value")
+        with self.assertRaises(ValueError):
+            marketplace.get_or_compute("key", compute, ttl=60)
+        compute.assert_not_called()
+        marketplace.enable_serialization("json")
+        self.assertEqual(marketplace.get_or_compute("key", compute, ttl=60), "value")
+    
+    def test_codec_is_abstract(self):
+        """Test that codecs must implement encode and decode."""
+        with self.assertRaises(TypeError):
+            Codec()
+
+class TestTieredCacheDriver(unittest.TestCase):
+    """Test suite for TieredCacheDriver and the marketplace near-cache."""
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.remote = InMemoryCacheDriver()
+        self.remote.get = MagicMock(wraps=self.remote.get)
+        self.driver = TieredCacheDriver(self.remote, local_ttl=5)
+    
+    def test_read_through(self):
+        """Test that remote hits are served locally afterwards."""
+        self.remote.set("key", "value")
+        self.assertEqual(self.driver.get("key"), "value")
+        self.assertEqual(self.driver.get("key"), "value")
+        self.remote.get.assert_called_once_with("key")
+    
+    def test_write_through(self):
+        """Test that writes reach both tiers."""
+        self.assertTrue(self.driver.set("key", "value", 60))
+        self.assertEqual(self.remote.get("key"), "value")
+        self.remote.get.reset_mock()
+        self.assertEqual(self.driver.get("key"), "value")
+        self.remote.get.assert_not_called()
+    
+    def test_failed_remote_write_invalidates_local(self):
+        """Test that a failed remote write does not leave a stale local entry."""
+        self.driver.set("key", "old")
+        self.remote.set = MagicMock(return_value=False)
+        self.assertFalse(self.driver.set("key", "new"))
+        self.assertEqual(self.driver.get("key"), "old")
+        self.remote.get.assert_called_with("key")
+    
+    def test_local_ttl(self):
+        """Test that local entries expire after the local TTL."""
+        with patch('zi_coder_agent.cache_management.memory.time.monotonic') as mock_time:
+            mock_time.return_value = 0.0
+            self.driver.set("key", "value", 3600)
+            mock_time.return_value = 6.0
+            self.driver.get("key")
+        self.remote.get.assert_called_once_with("key")
+    
+    def test_delete_and_clear_invalidate_local(self):
+        """Test that deletes and clears remove local entries."""
+        self.driver.set("a", 1)
+        self.driver.set("b", 2)
+        self.driver.delete("a")
+        self.assertIsNone(self.driver.get("a"))
+        self.driver.clear()
+        self.assertIsNone(self.driver.get("b"))
+        self.assertEqual(self.driver.get_stats()["local"]["entries"], 0)
+    
+    def test_marketplace_near_cache(self):
+        """Test enabling the near-cache in the marketplace."""
+        marketplace = CacheToolMarketplace()
+        marketplace.register_driver("memory", InMemoryCacheDriver)
+        marketplace.set_active_driver("memory")
+        marketplace.enable_near_cache(local_ttl=5)
+        self.assertIsInstance(marketplace._active_driver, TieredCacheDriver)
+        self.assertIs(marketplace._active_driver.remote, marketplace._drivers["memory"])
+        marketplace.set("key", "value")
+        self.assertEqual(marketplace.get("key"), "value")
+        marketplace.delete("key")
+        self.assertIsNone(marketplace.get("key"))
+        marketplace.enable_near_cache(local_ttl=1)
+        self.assertIs(marketplace._active_driver.remote, marketplace._drivers["memory"])
+        marketplace.disable_near_cache()
+        self.assertIs(marketplace._active_driver, marketplace._drivers["memory"])
+    
+    def test_marketplace_near_cache_applies_to_new_active_driver(self):
+        """Test that the near-cache wraps drivers activated after enabling it."""
+        marketplace = CacheToolMarketplace()
+        marketplace.register_driver("mock", MockCacheDriver)
+        marketplace.enable_near_cache()
+        marketplace.set_active_driver("mock")
+        self.assertIsInstance(marketplace._active_driver, TieredCacheDriver)
+        self.assertEqual(marketplace.get("key"), "Value for key")
+
+class TestInMemoryCacheDriver(unittest.TestCase):
+    """Test suite for InMemoryCacheDriver class."""
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.driver = InMemoryCacheDriver(max_entries=3, max_bytes=10_000, sweep_interval=60)
+    
+    def test_set_and_get(self):
+        """Test storing and retrieving a value."""
+        self.assertTrue(self.driver.set("key", {"a": 1}))
+        self.assertEqual(self.driver.get("key"), {"a": 1})
+        self.assertIsNone(self.driver.get("missing"))
+        stats = self.driver.get_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 1, 1))
+    
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted at the entry limit."""
+        for key in ("a", "b", "c"):
+            self.driver.set(key, key)
+        self.driver.get("a")
+        self.driver.set("d", "d")
+        self.assertIsNone(self.driver.get("b"))
+        self.assertEqual(self.driver.get("a"), "a")
+        self.assertEqual(self.driver.get_stats()["evictions"], 1)
+    
+    def test_byte_limit_eviction(self):
+        """Test that entries are evicted to stay within the byte limit."""
+        driver = InMemoryCacheDriver(max_entries=100, max_bytes=3000)
+        driver.set("a", "x" * 1000)
+        driver.set("b", "x" * 1000)
+        driver.set("c", "x" * 1000)
+        self.assertIsNone(driver.get("a"))
+        self.assertLessEqual(driver.get_stats()["bytes"], 3000)
+    
+    def test_value_larger_than_limit(self):
+        """Test that values larger than the byte limit are rejected."""
+        driver = InMemoryCacheDriver(max_bytes=100)
+        self.assertFalse(driver.set("key", "x" * 1000))
+        self.assertIsNone(driver.get("key"))
+    
+    def test_ttl_expiry_on_read(self):
+        """Test that expired entries are removed lazily when read."""
+        with patch('zi_coder_agent.cache_management.memory.time.monotonic') as mock_time:
+            mock_time.return_value = 100.0
+            self.driver.set("key", "value", ttl=10)
+            mock_time.return_value = 109.0
+            self.assertEqual(self.driver.get("key"), "value")
+            mock_time.return_value = 110.0
+            self.assertIsNone(self.driver.get("key"))
+        self.assertEqual(self.driver.get_stats()["expirations"], 1)
+        self.assertEqual(self.driver.get_stats()["entries"], 0)
+    
+    def test_periodic_sweep(self):
+        """Test that expired entries are swept during writes after the sweep interval."""
+        with patch('zi_coder_agent.cache_management.memory.time.monotonic') as mock_time:
+            mock_time.return_value = 0.0
+            driver = InMemoryCacheDriver(sweep_interval=60)
+            driver.set("a", "value", ttl=10)
+            driver.set("b", "value", ttl=10)
+            mock_time.return_value = 61.0
+            driver.set("c", "value")
+        stats = driver.get_stats()
+        self.assertEqual((stats["entries"], stats["expirations"]), (1, 2))
+    
+    def test_overwrite_updates_size(self):
+        """Test that overwriting a key replaces its accounted size."""
+        self.driver.set("key", "x" * 100)
+        first = self.driver.get_stats()["bytes"]
+        self.driver.set("key", "x" * 100)
+        self.assertEqual(self.driver.get_stats()["bytes"], first)
+    
+    def test_delete_and_clear(self):
+        """Test deleting single entries and clearing the cache."""
+        self.driver.set("a", 1)
+        self.driver.set("b", 2)
+        self.assertTrue(self.driver.delete("a"))
+        self.assertFalse(self.driver.delete("a"))
+        self.assertTrue(self.driver.clear())
+        stats = self.driver.get_stats()
+        self.assertEqual((stats["entries"], stats["bytes"]), (0, 0))
+    
+    def test_delete_expired_entries(self):
+        """Test that deleting entries which already expired reports them as missing."""
+        with patch('zi_coder_agent.cache_management.memory.time.monotonic') as mock_time:
+            mock_time.return_value = 0.0
+            driver = InMemoryCacheDriver(sweep_interval=60)
+            driver.set("a", 1, ttl=10)
+            driver.set("b", 2, ttl=10)
+            driver.set("c", 3)
+            mock_time.return_value = 11.0
+            self.assertFalse(driver.delete("a"))
+            self.assertEqual(driver.delete_many(["b", "c"]), 1)
+        self.assertEqual(driver.get_stats()["bytes"], 0)
+    
+    def test_concurrent_access(self):
+        """Test that concurrent writers keep the cache within its limits."""
+        driver = InMemoryCacheDriver(max_entries=50)
+        
+        def write(offset):
+            for i in range(200):
+                driver.set(f"{offset}-{i}", i)
+                driver.get(f"{offset}-{i // 2}")
+        
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(driver.get_stats()["entries"], 50)
+
 if __name__ == '__main__':
     unittest.main()
@@ -7,13 +7,15 @@ of the DatabaseManager class.
 
 import unittest
 from unittest.mock import MagicMock, patch
-from zi_coder_agent.database import DatabaseManager, engine, SessionLocal
+from zi_coder_agent import database
+from zi_coder_agent.database import DatabaseManager, engine, SessionLocal, build_engine
 
 class TestDatabaseManager(unittest.TestCase):
     """Test suite for DatabaseManager class."""
     
     def setUp(self):
         """Set up test fixtures before each test method."""
+        database._initialized = False
         self.db_manager = DatabaseManager()
     
     @patch('sqlalchemy.engine.base.Engine.connect')
@@ -73,5 +75,70 @@ class TestDatabaseManager(unittest.TestCase):
         self.db_manager.drop_all()
         mock_drop_all.assert_called_once_with(bind=engine)
 
+    @patch('zi_coder_agent.database.Base.metadata.create_all')
+    @patch('sqlalchemy.engine.base.Engine.connect')
+    def test_initialize_runs_once(self, mock_connect, mock_create_all):
+        """Test that initialization connects and creates the schema only once."""
+        mock_connect.return_value = MagicMock()
+        self.assertTrue(self.db_manager.initialize())
+        self.assertTrue(self.db_manager.initialize())
+        mock_connect.assert_called_once()
+        mock_create_all.assert_called_once_with(bind=engine)
+    
+    @patch('zi_coder_agent.database.Base.metadata.create_all')
+    @patch('sqlalchemy.engine.base.Engine.connect')
+    def test_initialize_failure(self, mock_connect, mock_create_all):
+        """Test that a failed connection leaves the manager uninitialized."""
+        mock_connect.side_effect = Exception("Connection failed")
+        self.assertFalse(self.db_manager.initialize())
+        mock_create_all.assert_not_called()
+        mock_connect.side_effect = None
+        self.assertTrue(self.db_manager.initialize())
+        mock_create_all.assert_called_once()
+    
+    @patch('zi_coder_agent.database.Base.metadata.create_all')
+    @patch('sqlalchemy.engine.base.Engine.connect')
+    def test_initialize_once_per_process(self, mock_connect, mock_create_all):
+        """Test that a new manager does not repeat a successful initialization."""
+        self.assertTrue(self.db_manager.initialize())
+        self.assertTrue(DatabaseManager().initialize())
+        mock_connect.assert_called_once()
+        mock_create_all.assert_called_once()
+    
+    @patch('sqlalchemy.engine.base.Engine.connect')
+    def test_connect_returns_connection_to_pool(self, mock_connect):
+        """Test that the connectivity check does not leak a connection."""
+        connection = MagicMock()
+        mock_connect.return_value = connection
+        self.db_manager.connect()
+        connection.close.assert_called_once()
+    
+    def test_scoped_session(self):
+        """Test that scoped sessions are reused within a scope and released on remove."""
+        session = self.db_manager.get_scoped_session()
+        self.assertIs(session, self.db_manager.get_scoped_session())
+        self.db_manager.remove_session()
+        self.assertIsNot(session, self.db_manager.get_scoped_session())
+        self.db_manager.remove_session()
+    
+    def test_build_engine_pool_options(self):
+        """Test that pool sizing is applied to server databases."""
+        with patch('zi_coder_agent.database.create_engine') as mock_create_engine:
+            build_engine("postgresql://localhost/db", pool_size=20, max_overflow=5,
+                         pool_pre_ping=True, pool_recycle=600, echo=False)
+            mock_create_engine.assert_called_once_with(
+                "postgresql://localhost/db", echo=False, pool_pre_ping=True,
+                pool_recycle=600, pool_size=20, max_overflow=5
+            )
+    
+    def test_build_engine_sqlite_skips_pool_sizing(self):
+        """Test that SQLite engines are created without pool sizing arguments."""
+        with patch('zi_coder_agent.database.create_engine') as mock_create_engine:
+            build_engine("sqlite:///test.db", pool_size=20, max_overflow=5,
+                         pool_pre_ping=True, pool_recycle=600, echo=False)
+            mock_create_engine.assert_called_once_with(
+                "sqlite:///test.db", echo=False, pool_pre_ping=True, pool_recycle=600
+            )
+
 if __name__ == '__main__':
     unittest.main()
@@ -5,9 +5,18 @@ This file contains unit tests for the MCP Server Management module, ensuring the
 of the MCPServerMarketplace and MCPServerDriver classes.
 """
 
+import threading
+import time
 import unittest
 from unittest.mock import MagicMock
-from zi_coder_agent.mcp_server_management import MCPServerMarketplace, MCPServerDriver
+from zi_coder_agent.mcp_server_management import (
+    MCPServerMarketplace, MCPServerDriver, ToolIndex, run_concurrently, CatalogCache
+)
+from zi_coder_agent.mcp_server_management.fanout import iter_tool_calls
+from zi_coder_agent.mcp_server_management.memo import ResultCache, parse_tool_rules
+from zi_coder_agent.mcp_server_management.sessions import (
+    SessionPool, SessionManager, SessionUnavailableError
+)
 
 class MockMCPServerDriver(MCPServerDriver):
     """Mock implementation of MCPServerDriver for testing purposes."""
@@ -30,6 +39,24 @@ class MockMCPServerDriver(MCPServerDriver):
     def access_resource(self, uri: str) -> dict:
         return {"data": f"Accessed {uri}"}
 
+class FilesMCPServerDriver(MockMCPServerDriver):
+    """Mock MCP server providing file tools."""
+    
+    def get_tools(self) -> list:
+        return [{"name": "read_file"}, {"name": "search"}]
+    
+    def use_tool(self, tool_name: str, arguments: dict) -> dict:
+        return {"server": "files", "tool": tool_name}
+
+class GitMCPServerDriver(MockMCPServerDriver):
+    """Mock MCP server providing git tools."""
+    
+    def get_tools(self) -> list:
+        return [{"name": "git_log"}, {"name": "search"}]
+    
+    def use_tool(self, tool_name: str, arguments: dict) -> dict:
+        return {"server": "git", "tool": tool_name}
+
 class TestMCPServerMarketplace(unittest.TestCase):
     """Test suite for MCPServerMarketplace class."""
     
@@ -128,5 +155,485 @@ class TestMCPServerMarketplace(unittest.TestCase):
         result = self.marketplace.access_resource("uri/test")
         self.assertIsNone(result)
 
+class TestMCPToolRouting(unittest.TestCase):
+    """Test suite for routing tool calls across several MCP servers."""
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.marketplace = MCPServerMarketplace()
+        self.marketplace.register_driver("files", FilesMCPServerDriver)
+        self.marketplace.register_driver("git", GitMCPServerDriver)
+    
+    def test_tool_index(self):
+        """Test merging the tool catalogs of all servers."""
+        index = self.marketplace.get_tool_index()
+        self.assertEqual(index.to_dict(), {
+            "read_file": ["files"], "search": ["files", "git"], "git_log": ["git"]
+        })
+        self.assertIs(self.marketplace.get_tool_index(), index)
+        self.assertIsNot(self.marketplace.get_tool_index(refresh=True), index)
+    
+    def test_route_by_tool_name(self):
+        """Test that tool calls reach the server providing the tool."""
+        self.assertEqual(self.marketplace.use_tool("read_file", {})["server"], "files")
+        self.assertEqual(self.marketplace.use_tool("git_log", {})["server"], "git")
+    
+    def test_route_prefers_active_driver(self):
+        """Test that the active driver wins when several servers provide a tool."""
+        self.assertEqual(self.marketplace.use_tool("search", {})["server"], "files")
+        self.marketplace.set_active_driver("git")
+        self.assertEqual(self.marketplace.use_tool("search", {})["server"], "git")
+    
+    def test_route_explicit_server(self):
+        """Test calling a tool on a named server."""
+        self.assertEqual(self.marketplace.use_tool("search", {}, server="git")["server"], "git")
+        self.assertIsNone(self.marketplace.use_tool("search", {}, server="missing"))
+    
+    def test_unknown_tool(self):
+        """Test that unknown tools fall back to the active driver."""
+        self.assertIsNone(self.marketplace.use_tool("unknown", {}))
+        self.marketplace.set_active_driver("git")
+        self.assertEqual(self.marketplace.use_tool("unknown", {})["server"], "git")
+    
+    def test_failing_server_left_out(self):
+        """Test that a server failing to list its tools does not break the index."""
+        self.marketplace._drivers["git"].get_tools = MagicMock(side_effect=ConnectionError("down"))
+        self.assertEqual(self.marketplace.get_tool_index().to_dict(), {
+            "read_file": ["files"], "search": ["files"]
+        })
+    
+    def test_connect_and_disconnect_all(self):
+        """Test connecting to and disconnecting from every server."""
+        self.marketplace._drivers["git"].connect = MagicMock(side_effect=ConnectionError("down"))
+        self.assertEqual(self.marketplace.connect_all(), {"files": True, "git": False})
+        self.assertEqual(self.marketplace.disconnect_all(), {"files": True, "git": True})
+    
+    def test_parallel_calls_to_different_servers(self):
+        """Test that calls to different servers run concurrently."""
+        barrier = threading.Barrier(2, timeout=5)
+        for name in ("files", "git"):
+            self.marketplace._drivers[name].use_tool = lambda tool_name, arguments: barrier.wait()
+        outcomes = run_concurrently({
+            "read_file": lambda: self.marketplace.use_tool("read_file", {}),
+            "git_log": lambda: self.marketplace.use_tool("git_log", {}),
+        })
+        self.assertFalse(any(isinstance(outcome, Exception) for outcome in outcomes.values()))
+    
+    def test_tool_index_entries(self):
+        """Test building an index from mixed catalog entries."""
+        index = ToolIndex({"a": ["x", {"name": "y"}, {"description": "no name"}], "b": ["x"]})
+        self.assertIn("y", index)
+        self.assertEqual(index.servers_for("x"), ["a", "b"])
+        self.assertEqual(index.resolve("x", preferred="b"), "b")
+        self.assertIsNone(index.resolve("z"))
+
+class NotifyingMCPServerDriver(FilesMCPServerDriver):
+    """Mock MCP server that reports list-changed notifications."""
+    
+    def __init__(self):
+        self.listener = None
+        self.tools = [{"name": "read_file"}]
+        self.get_tools = MagicMock(side_effect=lambda: list(self.tools))
+    
+    def set_list_changed_listener(self, listener) -> bool:
+        self.listener = listener
+        return True
+
+class TestMCPCatalogCache(unittest.TestCase):
+    """Test suite for cached MCP tool and resource catalogs."""
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.marketplace = MCPServerMarketplace()
+        self.marketplace.register_driver("files", NotifyingMCPServerDriver)
+        self.marketplace.set_active_driver("files")
+        self.driver = self.marketplace._drivers["files"]
+    
+    def test_catalog_cached(self):
+        """Test that repeated catalog requests are served from the cache."""
+        self.assertEqual(self.marketplace.get_tools(), [{"name": "read_file"}])
+        self.assertEqual(self.marketplace.get_tools(), [{"name": "read_file"}])
+        self.assertEqual(self.driver.get_tools.call_count, 1)
+    
+    def test_refresh(self):
+        """Test that a refresh fetches the catalog from the server."""
+        self.marketplace.get_tools()
+        self.driver.tools.append({"name": "write_file"})
+        self.assertEqual(len(self.marketplace.get_tools(refresh=True)), 2)
+        self.assertEqual(self.driver.get_tools.call_count, 2)
+    
+    def test_list_changed_notification(self):
+        """Test that list-changed notifications invalidate the cached catalog."""
+        self.marketplace.get_tools()
+        self.driver.tools.append({"name": "write_file"})
+        self.driver.listener("tools")
+        self.assertEqual(len(self.marketplace.get_tools()), 2)
+        self.assertIsNotNone(self.marketplace.get_tool("write_file"))
+    
+    def test_resource_notification_keeps_tools(self):
+        """Test that a resource list change does not drop the tool catalog."""
+        self.marketplace.get_tools()
+        self.driver.listener("resources")
+        self.marketplace.get_tools()
+        self.assertEqual(self.driver.get_tools.call_count, 1)
+    
+    def test_get_tool(self):
+        """Test looking up a tool definition by name."""
+        self.assertEqual(self.marketplace.get_tool("read_file"), {"name": "read_file"})
+        self.assertIsNone(self.marketplace.get_tool("missing"))
+        self.assertEqual(self.driver.get_tools.call_count, 1)
+    
+    def test_ttl_expiry(self):
+        """Test that catalogs are fetched again after the TTL."""
+        cache = CatalogCache(ttl=0.05)
+        fetch = MagicMock(return_value=["a"])
+        cache.get("server", "tools", fetch)
+        cache.get("server", "tools", fetch)
+        time.sleep(0.1)
+        cache.get("server", "tools", fetch)
+        self.assertEqual(fetch.call_count, 2)
+    
+    def test_caching_disabled(self):
+        """Test that a TTL of 0 disables caching."""
+        cache = CatalogCache(ttl=0)
+        fetch = MagicMock(return_value=[{"name": "a"}])
+        cache.get("server", "tools", fetch)
+        self.assertEqual(cache.find_tool("server", "a", fetch), {"name": "a"})
+        self.assertEqual(fetch.call_count, 2)
+    
+    def test_tool_index_follows_catalog(self):
+        """Test that the tool index is rebuilt when the tool catalog changes."""
+        self.marketplace.register_driver("git", GitMCPServerDriver)
+        self.assertEqual(self.marketplace.get_tool_index().servers_for("write_file"), [])
+        self.driver.tools.append({"name": "write_file"})
+        self.driver.listener("tools")
+        self.assertEqual(self.marketplace.get_tool_index().servers_for("write_file"), ["files"])
+    
+    def test_tool_index_kept_without_catalog_ttl(self):
+        """Test that disabled catalog caching does not rebuild the index on every call."""
+        self.marketplace._catalogs = CatalogCache(ttl=0)
+        index = self.marketplace.get_tool_index()
+        self.assertIs(self.marketplace.get_tool_index(), index)
+        self.marketplace.use_tool("read_file", {})
+        self.assertEqual(self.driver.get_tools.call_count, 1)
+        self.driver.listener("tools")
+        self.assertIsNot(self.marketplace.get_tool_index(), index)
+
+class SlowMCPServerDriver(MockMCPServerDriver):
+    """Mock MCP server whose tools sleep for the requested number of seconds."""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+    
+    def use_tool(self, tool_name: str, arguments: dict) -> dict:
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            if tool_name == "fail":
+                raise RuntimeError("tool failed")
+            if tool_name == "missing":
+                return None
+            time.sleep(arguments.get("sleep", 0))
+            return {"tool": tool_name, "sleep": arguments.get("sleep", 0)}
+        finally:
+            with self.lock:
+                self.running -= 1
+
+class TestMCPToolFanOut(unittest.TestCase):
+    """Test suite for concurrent batches of MCP tool calls."""
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.marketplace = MCPServerMarketplace()
+        self.marketplace.register_driver("slow", SlowMCPServerDriver)
+        self.marketplace.set_active_driver("slow")
+        self.driver = self.marketplace._drivers["slow"]
+    
+    def test_calls_run_concurrently(self):
+        """Test that independent calls overlap instead of running one after another."""
+        calls = [{"tool_name": "read", "arguments": {"sleep": 0.2}} for _ in range(4)]
+        started = time.monotonic()
+        results = self.marketplace.use_tools(calls, max_concurrency=4)
+        self.assertLess(time.monotonic() - started, 0.6)
+        self.assertEqual([r["status"] for r in results], ["ok"] * 4)
+        self.assertEqual(self.driver.max_running, 4)
+    
+    def test_concurrency_limit(self):
+        """Test that no more calls than the limit are in flight."""
+        calls = [{"tool_name": "read", "arguments": {"sleep": 0.05}} for _ in range(6)]
+        self.marketplace.use_tools(calls, max_concurrency=2)
+        self.assertEqual(self.driver.max_running, 2)
+    
+    def test_results_in_completion_order(self):
+        """Test that outcomes are yielded as calls finish and returned in call order."""
+        calls = [
+            {"tool_name": "read", "arguments": {"sleep": 0.3}, "id": "slow"},
+            {"tool_name": "read", "arguments": {"sleep": 0.01}, "id": "fast"},
+        ]
+        streamed = list(self.marketplace.iter_tool_results(calls, max_concurrency=2))
+        self.assertEqual([o["id"] for o in streamed], ["fast", "slow"])
+        results = self.marketplace.use_tools(calls, max_concurrency=2)
+        self.assertEqual([o["index"] for o in results], [0, 1])
+        self.assertEqual(results[0]["result"], {"tool": "read", "sleep": 0.3})
+    
+    def test_errors_and_timeouts(self):
+        """Test that failing and slow calls are reported without affecting the others."""
+        calls = [
+            {"tool_name": "fail"},
+            {"tool_name": "missing"},
+            {"tool_name": "read", "arguments": {"sleep": 0.5}},
+            {"tool_name": "read"},
+        ]
+        results = self.marketplace.use_tools(calls, max_concurrency=4, timeout=0.1)
+        self.assertEqual([r["status"] for r in results], ["error", "error", "timeout", "ok"])
+        self.assertIn("tool failed", results[0]["error"])
+    
+    def test_timeout_frees_slot(self):
+        """Test that a timed-out call stops counting against the concurrency limit."""
+        executor = self.marketplace._get_executor()
+        calls = [
+            {"tool_name": "read", "arguments": {"sleep": 0.5}},
+            {"tool_name": "read"},
+        ]
+        started = time.monotonic()
+        outcomes = list(iter_tool_calls(executor, self.driver_call, calls, 1, 0.1))
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual([o["status"] for o in outcomes], ["timeout", "ok"])
+    
+    def driver_call(self, tool_name, arguments, server):
+        return self.driver.use_tool(tool_name, arguments)
+
+class CountingMCPServerDriver(MockMCPServerDriver):
+    """Mock MCP server counting the calls that reach it."""
+    
+    def __init__(self):
+        self.listener = None
+        self.use_tool = MagicMock(side_effect=lambda name, args: {"tool": name, "args": args})
+        self.access_resource = MagicMock(side_effect=lambda uri: {"data": uri})
+    
+    def get_tools(self) -> list:
+        return [
+            {"name": "read_file", "annotations": {"readOnlyHint": True}},
+            {"name": "write_file", "annotations": {"readOnlyHint": False}},
+        ]
+    
+    def set_list_changed_listener(self, listener) -> bool:
+        self.listener = listener
+        return True
+
+class TestMCPResultCache(unittest.TestCase):
+    """Test suite for memoized MCP tool calls and resource reads."""
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.marketplace = MCPServerMarketplace()
+        self.marketplace.register_driver("files", CountingMCPServerDriver)
+        self.marketplace.set_active_driver("files")
+        self.driver = self.marketplace._drivers["files"]
+    
+    def test_disabled_by_default(self):
+        """Test that every call reaches the server unless caching is configured."""
+        self.marketplace.use_tool("read_file", {"path": "a"})
+        self.marketplace.use_tool("read_file", {"path": "a"})
+        self.marketplace.access_resource("file:///a")
+        self.marketplace.access_resource("file:///a")
+        self.assertEqual(self.driver.use_tool.call_count, 2)
+        self.assertEqual(self.driver.access_resource.call_count, 2)
+    
+    def test_tool_rule(self):
+        """Test that a tool with a rule is cached by canonicalized arguments."""
+        self.marketplace.set_tool_cache_rule("write_file", 60)
+        first = self.marketplace.use_tool("write_file", {"path": "a", "mode": "w"})
+        second = self.marketplace.use_tool("write_file", {"mode": "w", "path": "a"})
+        self.marketplace.use_tool("write_file", {"path": "b"})
+        self.assertEqual(first, second)
+        self.assertEqual(self.driver.use_tool.call_count, 2)
+        self.assertEqual(self.marketplace.get_result_cache_stats()["hits"], 1)
+    
+    def test_read_only_annotation(self):
+        """Test that only tools annotated as read-only are cached by the default TTL."""
+        self.marketplace.enable_result_cache(tool_ttl=60)
+        for _ in range(2):
+            self.marketplace.use_tool("read_file", {"path": "a"})
+            self.marketplace.use_tool("write_file", {"path": "a"})
+        self.assertEqual(self.driver.use_tool.call_count, 3)
+        self.marketplace.set_tool_cache_rule("read_file", 0, server="files")
+        self.marketplace.use_tool("read_file", {"path": "a"})
+        self.assertEqual(self.driver.use_tool.call_count, 4)
+    
+    def test_resource_cache_and_invalidation(self):
+        """Test caching resource reads and dropping them on invalidation."""
+        self.marketplace.enable_result_cache(resource_ttl=60)
+        self.marketplace.access_resource("file:///a")
+        self.marketplace.access_resource("file:///a")
+        self.assertEqual(self.driver.access_resource.call_count, 1)
+        self.marketplace.invalidate_results("files")
+        self.marketplace.access_resource("file:///a")
+        self.assertEqual(self.driver.access_resource.call_count, 2)
+        self.driver.listener("resources")
+        self.marketplace.access_resource("file:///a")
+        self.assertEqual(self.driver.access_resource.call_count, 3)
+    
+    def test_ttl_expiry_and_none_results(self):
+        """Test that entries expire and None results are not cached."""
+        cache = ResultCache(resource_ttl=0.05, rules={})
+        read = MagicMock(return_value={"data": 1})
+        cache.read_resource("files", "a", read)
+        cache.read_resource("files", "a", read)
+        time.sleep(0.1)
+        cache.read_resource("files", "a", read)
+        self.assertEqual(read.call_count, 2)
+        missing = MagicMock(return_value=None)
+        cache.read_resource("files", "b", missing)
+        cache.read_resource("files", "b", missing)
+        self.assertEqual(missing.call_count, 2)
+    
+    def test_cache_backend(self):
+        """Test storing results in another cache backend."""
+        backend = MagicMock()
+        backend.get.return_value = None
+        self.marketplace.enable_result_cache(backend, resource_ttl=30)
+        self.marketplace.access_resource("file:///a")
+        key, value, ttl = backend.set.call_args[0]
+        self.assertIn("files:resource:file:///a", key)
+        self.assertEqual((value, ttl), ({"data": "file:///a"}, 30))
+    
+    def test_parse_tool_rules(self):
+        """Test parsing tool cache rules from configuration."""
+        self.assertEqual(parse_tool_rules("read_file=60, git/git_log=10"),
+                         {(None, "read_file"): 60.0, ("git", "git_log"): 10.0})
+        with self.assertRaises(ValueError):
+            parse_tool_rules("read_file")
+
+class FlakyMCPServerDriver(MockMCPServerDriver):
+    """Mock MCP server whose connection can be broken and restored."""
+    
+    def __init__(self):
+        self.alive = True
+        self.connects = 0
+        self.pings = 0
+    
+    def connect(self) -> bool:
+        self.connects += 1
+        return self.alive
+    
+    def ping(self) -> bool:
+        self.pings += 1
+        return self.alive
+    
+    def use_tool(self, tool_name: str, arguments: dict) -> dict:
+        if not self.alive:
+            raise ConnectionError("connection lost")
+        time.sleep(arguments.get("sleep", 0))
+        return {"session": id(self)}
+
+class TestMCPSessionPool(unittest.TestCase):
+    """Test suite for pooled MCP sessions."""
+    
+    def make_pool(self, **options):
+        options.setdefault("backoff_base", 0.05)
+        return SessionPool(FlakyMCPServerDriver, **options)
+    
+    def test_connect_warms_every_session(self):
+        """Test that connecting a pool connects each of its sessions."""
+        pool = self.make_pool(size=3)
+        self.assertTrue(pool.connect())
+        self.assertEqual([s["state"] for s in pool.to_dict()["sessions"]], ["connected"] * 3)
+        self.assertEqual([s.driver.connects for s in pool.sessions], [1, 1, 1])
+    
+    def test_in_flight_limit(self):
+        """Test that calls are spread over sessions and wait at the in-flight limit."""
+        pool = self.make_pool(size=2, max_in_flight=1, acquire_timeout=0.05)
+        pool.connect()
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                pool.call(lambda d: d.use_tool("t", {"sleep": 0.2}))
+            )) for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        with self.assertRaises(SessionUnavailableError):
+            pool.call(lambda d: d.use_tool("t", {}))
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({r["session"] for r in results}), 2)
+    
+    def test_reconnect_with_backoff(self):
+        """Test that a failed session is marked broken and reconnected after a backoff."""
+        pool = self.make_pool()
+        pool.connect()
+        driver = pool.primary
+        driver.alive = False
+        with self.assertRaises(ConnectionError):
+            pool.call(lambda d: d.use_tool("t", {}))
+        self.assertEqual(pool.to_dict()["sessions"][0]["state"], "broken")
+        with self.assertRaises(SessionUnavailableError):
+            pool.call(lambda d: d.use_tool("t", {}))
+        driver.alive = True
+        time.sleep(0.06)
+        pool.maintain()
+        self.assertEqual(pool.to_dict()["sessions"][0]["state"], "connected")
+        self.assertEqual(driver.connects, 2)
+        self.assertIn("session", pool.call(lambda d: d.use_tool("t", {})))
+    
+    def test_keepalive_ping(self):
+        """Test that idle sessions are pinged and marked broken when the ping fails."""
+        pool = self.make_pool(keepalive_interval=0)
+        pool.maintain()
+        self.assertEqual(pool.primary.pings, 0)
+        pool.connect()
+        pool.maintain()
+        self.assertEqual(pool.primary.pings, 1)
+        pool.primary.alive = False
+        pool.maintain()
+        self.assertEqual(pool.to_dict()["sessions"][0]["state"], "broken")
+    
+    def test_marketplace_sessions(self):
+        """Test that the marketplace routes calls through session pools."""
+        marketplace = MCPServerMarketplace()
+        marketplace.register_driver("flaky", FlakyMCPServerDriver, pool_size=2)
+        marketplace.set_active_driver("flaky")
+        self.assertEqual(marketplace.connect_all(), {"flaky": True})
+        status = marketplace.get_session_status()["flaky"]
+        self.assertTrue(status["connected"])
+        self.assertEqual(len(status["sessions"]), 2)
+        self.assertIsNotNone(marketplace.use_tool("read", {}))
+        for session in marketplace._sessions.get("flaky").sessions:
+            session.driver.alive = False
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                marketplace.use_tool("read", {})
+        self.assertIsNone(marketplace.use_tool("read", {}))
+        self.assertTrue(marketplace.disconnect())
+    
+    def test_manager_restart(self):
+        """Test that maintenance runs again after the manager is stopped and started."""
+        manager = SessionManager(interval=0.01)
+        pool = MagicMock()
+        manager.add("flaky", pool)
+        manager.start()
+        manager.stop()
+        manager.start()
+        pool.maintain.reset_mock()
+        time.sleep(0.1)
+        self.assertGreater(pool.maintain.call_count, 0)
+        manager.stop()
+    
+    def test_manager_logs_failed_maintenance(self):
+        """Test that a failing pool is logged and does not stop maintenance of the others."""
+        manager = SessionManager(interval=0)
+        failing, healthy = MagicMock(), MagicMock()
+        failing.maintain.side_effect = RuntimeError("boom")
+        manager.add("failing", failing)
+        manager.add("healthy", healthy)
+        with self.assertLogs("zi_coder_agent.mcp_server_management.sessions", "ERROR"):
+            manager.maintain()
+        healthy.maintain.assert_called_once()
+
 if __name__ == '__main__':
     unittest.main()
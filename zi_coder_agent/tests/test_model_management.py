@@ -5,9 +5,18 @@ This file contains unit tests for the Model Management module, ensuring the func
 of the ModelMarketplace and ModelDriver classes.
 """
 
+import threading
+import time
 import unittest
-from unittest.mock import MagicMock
-from zi_coder_agent.model_management import ModelMarketplace, ModelDriver
+from unittest.mock import MagicMock, patch
+from zi_coder_agent.model_management import (
+    ModelMarketplace, ModelDriver, BatchScheduler, ModelResponseCache,
+    ModelRouter, CircuitBreaker, DriverGuard, CircuitOpenError, ModelBusyError,
+    HashingEmbedder, SemanticCache, VectorIndex, Context, ContextStore, ContextOverflowError,
+    estimate_tokens
+)
+from zi_coder_agent.model_management import semantic_cache
+from zi_coder_agent.model_management.response_cache import normalize_prompt
 
 class MockModelDriver(ModelDriver):
     """Mock implementation of ModelDriver for testing purposes."""
@@ -21,6 +30,36 @@ class MockModelDriver(ModelDriver):
     def query(self, input_data: str) -> str:
         return f"Response to {input_data}"
 
+class MockStreamingModelDriver(MockModelDriver):
+    """Mock driver that produces its response incrementally."""
+    
+    def stream(self, input_data: str):
+        yield "Response "
+        yield f"to {input_data}"
+
+class MockBatchModelDriver(MockModelDriver):
+    """Mock driver that accepts batched input and records each batch."""
+    
+    def __init__(self):
+        self.batches = []
+    
+    def query_batch(self, inputs):
+        self.batches.append(list(inputs))
+        return [f"Batched response to {input_data}" for input_data in inputs]
+
+class DictCache:
+    """Minimal cache backend storing values in a dictionary."""
+    
+    def __init__(self):
+        self.values = {}
+    
+    def get(self, key):
+        return self.values.get(key)
+    
+    def set(self, key, value, ttl=None):
+        self.values[key] = value
+        return True
+
 class TestModelMarketplace(unittest.TestCase):
     """Test suite for ModelMarketplace class."""
     
@@ -83,5 +122,633 @@ class TestModelMarketplace(unittest.TestCase):
         response = self.marketplace.query("test input")
         self.assertIsNone(response)
 
+    def test_stream_with_active_driver(self):
+        """Test streaming with a driver that produces chunks."""
+        self.marketplace.register_driver("mock", MockStreamingModelDriver)
+        self.marketplace.set_active_driver("mock")
+        chunks = list(self.marketplace.stream("test input"))
+        self.assertEqual(chunks, ["Response ", "to test input"])
+    
+    def test_stream_falls_back_to_query(self):
+        """Test that drivers without streaming support yield the full response."""
+        self.marketplace.register_driver("mock", MockModelDriver)
+        self.marketplace.set_active_driver("mock")
+        chunks = list(self.marketplace.stream("test input"))
+        self.assertEqual(chunks, ["Response to test input"])
+    
+    def test_stream_without_active_driver(self):
+        """Test streaming without an active driver."""
+        self.assertIsNone(self.marketplace.stream("test input"))
+
+    def test_query_batch_default_falls_back_to_query(self):
+        """Test that the default batch implementation queries each input."""
+        driver = MockModelDriver()
+        self.assertEqual(driver.query_batch(["a", "b"]), ["Response to a", "Response to b"])
+    
+    def test_query_with_batching_enabled(self):
+        """Test that concurrent queries are dispatched as one batch."""
+        self.marketplace.register_driver("mock", MockBatchModelDriver)
+        self.marketplace.set_active_driver("mock")
+        self.marketplace.enable_batching(max_batch_size=4, max_wait=5)
+        results = {}
+        
+        def run(index):
+            results[index] = self.marketplace.query(f"input {index}")
+        
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        driver = self.marketplace._drivers["mock"]
+        self.assertEqual(len(driver.batches), 1)
+        self.assertEqual(sorted(driver.batches[0]), [f"input {i}" for i in range(4)])
+        for i in range(4):
+            self.assertEqual(results[i], f"Batched response to input {i}")
+        self.assertEqual(self.marketplace.get_batching_stats()["average_batch_size"], 4)
+    
+    def test_query_with_batching_window_elapsed(self):
+        """Test that a partial batch is dispatched once the time window elapses."""
+        self.marketplace.register_driver("mock", MockBatchModelDriver)
+        self.marketplace.set_active_driver("mock")
+        self.marketplace.enable_batching(max_batch_size=4, max_wait=0.001)
+        self.assertEqual(self.marketplace.query("only"), "Batched response to only")
+        self.assertEqual(self.marketplace._drivers["mock"].batches, [["only"]])
+    
+    def test_query_with_batching_unsupported_driver(self):
+        """Test that drivers without query_batch are queried directly."""
+        self.marketplace.register_driver("mock", MockModelDriver)
+        self.marketplace.set_active_driver("mock")
+        self.marketplace.enable_batching(max_batch_size=4, max_wait=5)
+        self.assertEqual(self.marketplace.query("test input"), "Response to test input")
+        self.assertEqual(self.marketplace.get_batching_stats()["batches"], 0)
+    
+    def test_query_with_batching_error_propagates(self):
+        """Test that a failing batch raises in the waiting callers."""
+        class FailingBatchModelDriver(MockBatchModelDriver):
+            def query_batch(self, inputs):
+                raise RuntimeError("backend failed")
+        
+        scheduler = BatchScheduler(max_batch_size=2, max_wait=0.001)
+        with self.assertRaises(RuntimeError):
+            scheduler.submit(FailingBatchModelDriver(), "test input")
+    
+    def test_disable_batching(self):
+        """Test disabling batching."""
+        self.marketplace.enable_batching()
+        self.marketplace.disable_batching()
+        self.assertIsNone(self.marketplace.get_batching_stats())
+
+    def test_query_with_response_cache(self):
+        """Test that repeated prompts are answered from the response cache."""
+        self.marketplace.register_driver("mock", MockModelDriver)
+        self.marketplace.set_active_driver("mock")
+        self.marketplace.enable_response_cache(DictCache(), ttl=60)
+        driver = self.marketplace._drivers["mock"]
+        driver.query = MagicMock(return_value="Cached response")
+        self.assertEqual(self.marketplace.query("test input"), "Cached response")
+        self.assertEqual(self.marketplace.query("  test input \r\n"), "Cached response")
+        driver.query.assert_called_once_with("test input")
+        stats = self.marketplace.get_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["stores"]), (1, 1, 1))
+        self.assertEqual(stats["hit_ratio"], 0.5)
+    
+    def test_query_with_response_cache_coalesces_misses(self):
+        """Test that concurrent misses for one prompt query the model once."""
+        self.marketplace.register_driver("mock", MockModelDriver)
+        self.marketplace.set_active_driver("mock")
+        self.marketplace.enable_response_cache(DictCache(), ttl=60)
+        release = threading.Event()
+        driver = self.marketplace._drivers["mock"]
+        driver.query = MagicMock(side_effect=lambda input_data: release.wait(5) and "response")
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.marketplace.query("prompt")))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        while not driver.query.called:
+            release.wait(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        driver.query.assert_called_once()
+        self.assertEqual(results, ["response"] * 4)
+    
+    def test_query_with_response_cache_keys_on_driver(self):
+        """Test that cached responses are not shared between drivers."""
+        self.marketplace.register_driver("first", MockModelDriver)
+        self.marketplace.register_driver("second", MockModelDriver)
+        self.marketplace.enable_response_cache(DictCache(), ttl=60)
+        self.marketplace.set_active_driver("first")
+        self.marketplace.query("test input")
+        self.marketplace.set_active_driver("second")
+        self.marketplace.query("test input")
+        self.assertEqual(self.marketplace.get_cache_stats()["misses"], 2)
+    
+    def test_query_with_response_cache_failure(self):
+        """Test that a failing cache backend does not fail the query."""
+        cache = MagicMock()
+        cache.get.side_effect = ConnectionError("cache down")
+        cache.set.side_effect = ConnectionError("cache down")
+        self.marketplace.register_driver("mock", MockModelDriver)
+        self.marketplace.set_active_driver("mock")
+        self.marketplace.enable_response_cache(cache)
+        self.assertEqual(self.marketplace.query("test input"), "Response to test input")
+        self.assertEqual(self.marketplace.get_cache_stats()["errors"], 2)
+    
+    def test_response_cache_key_includes_parameters(self):
+        """Test that generation parameters are part of the cache key."""
+        cache = ModelResponseCache(DictCache())
+        self.assertNotEqual(cache.make_key("mock", "prompt", {"temperature": 0}),
+                            cache.make_key("mock", "prompt", {"temperature": 1}))
+        self.assertEqual(cache.make_key("mock", "prompt", {"a": 1, "b": 2}),
+                         cache.make_key("mock", "prompt", {"b": 2, "a": 1}))
+    
+    def test_normalize_prompt(self):
+        """Test prompt normalization."""
+        self.assertEqual(normalize_prompt("  line one  \r\nline two\t\n\n"),
+                         "line one\nline two")
+    
+    def test_get_cache_stats_disabled(self):
+        """Test cache statistics when the response cache is disabled."""
+        self.assertIsNone(self.marketplace.get_cache_stats())
+
+class FailingModelDriver(MockModelDriver):
+    """Mock driver whose backend is down."""
+    
+    def query(self, input_data: str) -> str:
+        raise TimeoutError("backend timed out")
+    
+    def stream(self, input_data: str):
+        raise ConnectionError("backend down")
+        yield
+
+class TestModelRouting(unittest.TestCase):
+    """Test suite for model groups, load balancing and failover."""
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.marketplace = ModelMarketplace()
+        for name in ("replica-1", "replica-2"):
+            self.marketplace.register_driver(name, MockModelDriver)
+            self.marketplace._drivers[name].query = MagicMock(return_value=name)
+        self.marketplace.register_driver("down", FailingModelDriver)
+    
+    def test_per_request_model(self):
+        """Test that a query can name its driver without changing the active one."""
+        self.marketplace.set_active_driver("replica-1")
+        self.assertEqual(self.marketplace.query("prompt", model="replica-2"), "replica-2")
+        self.assertEqual(self.marketplace.query("prompt"), "replica-1")
+        self.assertIsNone(self.marketplace.query("prompt", model="missing"))
+    
+    def test_weighted_round_robin(self):
+        """Test that queries are spread over a group in proportion to the weights."""
+        self.marketplace.register_group("pool", ["replica-1", "replica-2"], weights=[3, 1])
+        results = [self.marketplace.query("prompt", model="pool") for _ in range(8)]
+        self.assertEqual(results.count("replica-1"), 6)
+        self.assertEqual(results.count("replica-2"), 2)
+    
+    def test_least_outstanding(self):
+        """Test that the member with the fewest requests in flight is chosen."""
+        router = ModelRouter()
+        router.add_group("pool", ["a", "b"], strategy="least_outstanding")
+        with router.track("a"):
+            self.assertEqual(router.candidates("pool"), ["b", "a"])
+        self.assertEqual(router.candidates("pool")[0], "a")
+    
+    def test_failover(self):
+        """Test that a failing driver is replaced by the next member of the group."""
+        self.marketplace.register_group("pool", ["down", "replica-1"], weights=[2, 1])
+        self.marketplace.set_active_driver("pool")
+        self.assertEqual(self.marketplace.query("prompt"), "replica-1")
+        stats = self.marketplace.get_routing_stats()["drivers"]
+        self.assertEqual(stats["down"]["failures"], 1)
+        self.assertEqual(stats["replica-1"], {"requests": 1, "failures": 0, "in_flight": 0})
+        self.assertEqual(list(self.marketplace.stream("prompt")), ["replica-1"])
+    
+    def test_all_members_fail(self):
+        """Test that the last error is raised when every member fails."""
+        self.marketplace.register_group("pool", ["down"])
+        with self.assertRaises(TimeoutError):
+            self.marketplace.query("prompt", model="pool")
+    
+    def test_error_kept_when_last_member_has_no_response(self):
+        """Test that an earlier member's error is raised when the last one has no response."""
+        router = ModelRouter()
+        router.add_group("pool", ["a", "b"], weights=[2, 1])
+        responses = {"a": TimeoutError("deadline"), "b": None}
+        
+        def call(name):
+            if isinstance(responses[name], Exception):
+                raise responses[name]
+            return responses[name]
+        
+        with self.assertRaises(TimeoutError):
+            router.execute("pool", call)
+        self.assertIsNone(router.execute("b", call))
+    
+    def test_invalid_groups(self):
+        """Test rejecting invalid group definitions."""
+        with self.assertRaises(ValueError):
+            self.marketplace.register_group("pool", ["missing"])
+        with self.assertRaises(ValueError):
+            self.marketplace.register_group("replica-1", ["replica-2"])
+        with self.assertRaises(ValueError):
+            self.marketplace.register_group("pool", ["replica-1"], strategy="random")
+        with self.assertRaises(ValueError):
+            self.marketplace.register_group("pool", ["replica-1"], weights=[0])
+
+class TestModelResilience(unittest.TestCase):
+    """Test suite for per-driver limits, deadlines and circuit breakers."""
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.marketplace = ModelMarketplace()
+        self.marketplace.register_driver("mock", MockModelDriver)
+        self.marketplace.set_active_driver("mock")
+        self.driver = self.marketplace._drivers["mock"]
+    
+    def test_breaker_opens_and_recovers(self):
+        """Test that the breaker opens after repeated failures and closes after a good trial."""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "closed")
+        breaker.record_failure()
+        with self.assertRaises(CircuitOpenError):
+            breaker.allow()
+        time.sleep(0.06)
+        self.assertEqual(breaker.state, "half_open")
+        breaker.allow()
+        with self.assertRaises(CircuitOpenError):
+            breaker.allow()
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+        stats = breaker.to_dict()
+        self.assertEqual((stats["opened"], stats["rejected"]), (1, 2))
+    
+    def test_failed_trial_reopens(self):
+        """Test that a failed trial call opens the breaker again."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        breaker.allow()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+    
+    def test_query_deadline(self):
+        """Test that a slow driver call times out and counts as a failure."""
+        self.marketplace.configure_driver_limits("mock", timeout=0.05, failure_threshold=1)
+        self.driver.query = MagicMock(side_effect=lambda input_data: time.sleep(0.3) or "late")
+        with self.assertRaises(TimeoutError):
+            self.marketplace.query("prompt")
+        with self.assertRaises(CircuitOpenError):
+            self.marketplace.query("prompt")
+        health = self.marketplace.get_driver_health()["mock"]
+        self.assertEqual(health["timeouts"], 1)
+        self.assertEqual(health["breaker"]["state"], "open")
+        self.assertTrue(self.marketplace.reset_circuit_breaker("mock"))
+        self.assertEqual(self.marketplace.get_driver_health()["mock"]["breaker"]["state"], "closed")
+    
+    def test_concurrency_limit(self):
+        """Test that calls beyond the limit wait and are shed at the deadline."""
+        guard = DriverGuard(max_concurrency=1)
+        release = threading.Event()
+        thread = threading.Thread(target=lambda: guard.call(lambda: release.wait(1)))
+        thread.start()
+        while guard.to_dict()["in_flight"] == 0:
+            time.sleep(0.01)
+        guard.timeout = 0.05
+        with self.assertRaises(ModelBusyError):
+            guard.call(lambda: "second")
+        release.set()
+        thread.join()
+        self.assertEqual(guard.call(lambda: "third"), "third")
+        self.assertEqual(guard.breaker.to_dict()["failures"], 0)
+    
+    def test_open_breaker_fails_over(self):
+        """Test that a group skips a member whose breaker is open."""
+        self.marketplace.register_driver("backup", MockModelDriver)
+        self.marketplace.register_group("pool", ["mock", "backup"], weights=[2, 1])
+        self.marketplace.configure_driver_limits("mock", failure_threshold=1)
+        self.driver.query = MagicMock(side_effect=ConnectionError("down"))
+        for _ in range(3):
+            self.assertEqual(self.marketplace.query("prompt", model="pool"), "Response to prompt")
+        self.driver.query.assert_called_once()
+    
+    def test_deadline_raises_builtin_timeout(self):
+        """Test that a missed deadline surfaces as the builtin TimeoutError."""
+        guard = DriverGuard(timeout=0.05)
+        with patch("zi_coder_agent.model_management.resilience.FutureTimeoutError",
+                   type("FutureTimeout", (Exception,), {})) as future_timeout:
+            with patch.object(guard, "_get_executor") as executor:
+                executor.return_value.submit.return_value.result.side_effect = future_timeout()
+                with self.assertRaises(TimeoutError):
+                    guard.call(lambda: "late")
+        self.assertEqual(guard.to_dict()["timeouts"], 1)
+    
+    def test_stream_rejected_before_first_chunk(self):
+        """Test that a rejected stream raises when it is requested, not while iterating."""
+        self.marketplace.configure_driver_limits("mock", failure_threshold=1)
+        self.marketplace._guards["mock"].breaker.record_failure()
+        with self.assertRaises(CircuitOpenError):
+            self.marketplace.stream("prompt")
+    
+    def test_closed_trial_stream_frees_breaker(self):
+        """Test that a half-open trial stream closed by the client allows another trial."""
+        guard = DriverGuard(max_concurrency=1, failure_threshold=1, reset_timeout=0.05)
+        guard.breaker.record_failure()
+        time.sleep(0.06)
+        chunks = guard.stream(lambda: iter(["a", "b"]))
+        self.assertEqual(next(chunks), "a")
+        chunks.close()
+        self.assertEqual(guard.to_dict()["in_flight"], 0)
+        self.assertEqual(list(guard.stream(lambda: iter(["c"]))), ["c"])
+        self.assertEqual(guard.breaker.state, "closed")
+    
+    def test_unstarted_stream_releases_slot(self):
+        """Test that closing a stream before its first chunk gives back its slot."""
+        guard = DriverGuard(max_concurrency=1)
+        guard.stream(lambda: iter(["a"])).close()
+        self.assertEqual(guard.to_dict()["in_flight"], 0)
+        self.assertEqual(guard.breaker.to_dict()["failures"], 0)
+    
+    def test_configure_unknown_driver(self):
+        """Test configuring limits of a driver that does not exist."""
+        self.assertFalse(self.marketplace.configure_driver_limits("missing", timeout=1))
+        self.assertFalse(self.marketplace.reset_circuit_breaker("missing"))
+
+class TestSemanticCache(unittest.TestCase):
+    """Test cases for the semantic cache and its vector index."""
+    
+    def test_embedder_ignores_formatting_and_identifier_style(self):
+        embedder = HashingEmbedder(dimension=128)
+        first = embedder.embed("Rename the variable userName in parse_config")
+        second = embedder.embed("rename  the variable user_name in parseConfig\n")
+        other = embedder.embed("Write a haiku about autumn leaves")
+        cosine = lambda a, b: sum(x * y for x, y in zip(a, b))
+        self.assertAlmostEqual(cosine(first, second), 1.0, places=5)
+        self.assertLess(cosine(first, other), 0.5)
+    
+    def test_embedder_depends_on_word_order(self):
+        embedder = HashingEmbedder()
+        cosine = lambda a, b: sum(x * y for x, y in zip(a, b))
+        swapped = cosine(embedder.embed("Convert 100 USD to EUR"),
+                         embedder.embed("Convert 100 EUR to USD"))
+        self.assertLess(swapped, 0.9)
+    
+    def test_default_threshold_rejects_one_word_change(self):
+        cache = SemanticCache(ttl=None)
+        compute = MagicMock(side_effect=["tuple answer", "set answer"])
+        scope = SemanticCache.make_scope("mock")
+        question = ("Explain the difference between a list and a {} in Python, with examples "
+                    "of when each one should be used in production code and how they affect "
+                    "performance")
+        self.assertEqual(cache.get_or_compute(scope, question.format("tuple"), compute),
+                         "tuple answer")
+        self.assertEqual(cache.get_or_compute(scope, question.format("set"), compute),
+                         "set answer")
+        self.assertEqual(compute.call_count, 2)
+    
+    def test_index_add_remove_search(self):
+        index = VectorIndex(3)
+        index.add("a", [1.0, 0.0, 0.0])
+        index.add("b", [0.0, 1.0, 0.0])
+        index.add("c", [0.0, 0.0, 1.0])
+        self.assertEqual(index.search([0.9, 0.1, 0.0])[0], "a")
+        self.assertTrue(index.remove("a"))
+        self.assertFalse(index.remove("a"))
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.search([0.0, 0.0, 2.0]), ("c", 1.0))
+        self.assertEqual(index.search([0.1, 1.0, 0.0])[0], "b")
+    
+    @unittest.skipUnless(semantic_cache.np is not None, "NumPy is not installed")
+    def test_index_bucketed_search(self):
+        embedder = HashingEmbedder()
+        index = VectorIndex(embedder.dimension, exact_limit=8)
+        for i in range(50):
+            index.add(str(i), embedder.embed(f"prompt number {i} about topic {i * 7}"))
+        key, score = index.search(embedder.embed("prompt number 17 about topic 119"))
+        self.assertEqual(key, "17")
+        self.assertAlmostEqual(score, 1.0, places=5)
+    
+    def test_get_or_compute_reuses_similar_prompt(self):
+        cache = SemanticCache(ttl=None)
+        compute = MagicMock(return_value="answer")
+        scope = SemanticCache.make_scope("mock", {"temperature": 0})
+        self.assertEqual(cache.get_or_compute(scope, "Explain getUserId()", compute), "answer")
+        self.assertEqual(cache.get_or_compute(scope, "explain  get_user_id()", compute), "answer")
+        self.assertEqual(compute.call_count, 1)
+        cache.get_or_compute(scope, "Summarize the release notes", compute)
+        self.assertEqual(compute.call_count, 2)
+        other_scope = SemanticCache.make_scope("mock", {"temperature": 1})
+        cache.get_or_compute(other_scope, "Explain getUserId()", compute)
+        self.assertEqual(compute.call_count, 3)
+        stats = cache.get_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 3, 3))
+    
+    def test_expiry_and_eviction(self):
+        cache = SemanticCache(ttl=None, max_entries=2)
+        scope = SemanticCache.make_scope("mock")
+        for prompt in ("alpha beta", "gamma delta", "epsilon zeta"):
+            cache.get_or_compute(scope, prompt, lambda: prompt.upper())
+        self.assertEqual(cache.get_stats()["evictions"], 1)
+        compute = MagicMock(return_value="again")
+        self.assertEqual(cache.get_or_compute(scope, "alpha beta", compute), "again")
+        expiring = SemanticCache(ttl=1)
+        expiring.get_or_compute(scope, "alpha beta", lambda: "old")
+        with patch.object(semantic_cache.time, "monotonic",
+                          return_value=time.monotonic() + 2):
+            self.assertEqual(expiring.get_or_compute(scope, "alpha beta", lambda: "new"), "new")
+    
+    def test_none_is_not_cached(self):
+        cache = SemanticCache(ttl=None)
+        scope = SemanticCache.make_scope("mock")
+        self.assertIsNone(cache.get_or_compute(scope, "prompt", lambda: None))
+        self.assertEqual(cache.get_stats()["entries"], 0)
+    
+    def test_marketplace_semantic_cache(self):
+        marketplace = ModelMarketplace()
+        marketplace.register_driver("mock", MockModelDriver)
+        marketplace.set_active_driver("mock")
+        self.assertIsNone(marketplace.get_semantic_cache_stats())
+        marketplace.enable_semantic_cache(threshold=0.9, ttl=None)
+        marketplace.enable_response_cache(DictCache(), ttl=60)
+        driver = marketplace._drivers["mock"]
+        driver.query = MagicMock(return_value="cached")
+        self.assertEqual(marketplace.query("Fix the bug in loadUser"), "cached")
+        self.assertEqual(marketplace.query("fix the bug in load_user"), "cached")
+        self.assertEqual(marketplace.query("Fix the bug in loadUser"), "cached")
+        self.assertEqual(driver.query.call_count, 1)
+        self.assertEqual(marketplace.get_semantic_cache_stats()["hits"], 1)
+        marketplace.disable_semantic_cache()
+        self.assertIsNone(marketplace.get_semantic_cache_stats())
+
+class MockPrefixCacheModelDriver(MockModelDriver):
+    """Mock driver that records the prefixes it receives and counts words as tokens."""
+    
+    def __init__(self):
+        self.prompts = []
+    
+    def count_tokens(self, text: str) -> int:
+        return len(text.split())
+    
+    def query_context(self, prefix: str, suffix: str, prefix_key: str) -> str:
+        self.prompts.append((prefix, suffix, prefix_key))
+        return f"reply {len(self.prompts)}"
+
+class TestModelContext(unittest.TestCase):
+    """Test cases for context handles and prompt assembly."""
+    
+    def setUp(self):
+        self.counted = []
+        self.context = Context("handle", None, self._count)
+    
+    def _count(self, text):
+        self.counted.append(text)
+        return len(text.split())
+    
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens(""), 0)
+        self.assertEqual(estimate_tokens("def parse(x):"), 7)
+        self.assertEqual(estimate_tokens("internationalization"), 5)
+    
+    def test_apply_deltas_counts_incrementally(self):
+        self.context.apply([
+            {"op": "set", "key": "system", "text": "You are helpful"},
+            {"op": "set", "key": "a.py", "text": "print(1)"},
+            {"op": "append", "text": "hello there"},
+        ])
+        self.assertEqual(self.context.to_dict()["tokens"], 3 + 1 + 3)
+        self.context.apply([{"op": "set", "key": "a.py", "text": "print(1)"}])
+        self.context.apply([{"op": "append", "text": "next question"}])
+        self.assertEqual(self.counted, ["You are helpful", "print(1)", "User: hello there",
+                                        "User: next question"])
+        self.context.apply([{"op": "set", "key": "a.py", "text": "print(1) # two"}])
+        self.context.apply([{"op": "remove", "key": "system"}, {"op": "clear"}])
+        described = self.context.to_dict()
+        self.assertEqual(described["pinned"], {"a.py": 3})
+        self.assertEqual((described["messages"], described["tokens"]), (0, 3))
+    
+    def test_invalid_delta_leaves_context_unchanged(self):
+        for deltas in ([{"op": "append", "text": "ok"}, {"op": "set", "text": "no key"}],
+                       [{"op": "rename"}], [{"op": "append"}], {"op": "clear"}):
+            with self.assertRaises(ValueError):
+                self.context.apply(deltas)
+        self.assertEqual(self.context.version, 0)
+    
+    def test_assemble_keeps_prefix_and_newest_messages(self):
+        self.context.apply([
+            {"op": "set", "key": "system", "text": "sys prompt"},
+            {"op": "set", "key": "file", "text": "file body here"},
+            {"op": "append", "text": "one"},
+            {"op": "append", "text": "two", "role": "assistant"},
+            {"op": "append", "text": "three"},
+        ])
+        full = self.context.assemble()
+        self.assertEqual(full.prefix, "sys prompt\n\nfile body here")
+        self.assertEqual(full.suffix, "User: one\n\nAssistant: two\n\nUser: three")
+        self.assertEqual((full.tokens, full.dropped), (11, 0))
+        truncated = self.context.assemble(budget=9)
+        self.assertEqual(truncated.suffix, "Assistant: two\n\nUser: three")
+        self.assertEqual((truncated.tokens, truncated.dropped), (9, 1))
+        self.assertEqual(truncated.prefix_key, full.prefix_key)
+        self.assertEqual(truncated.text, truncated.prefix + "\n\n" + truncated.suffix)
+        with self.assertRaises(ContextOverflowError):
+            self.context.assemble(budget=6)
+        self.context.apply([{"op": "set", "key": "file", "text": "changed"}])
+        self.assertNotEqual(self.context.assemble().prefix_key, full.prefix_key)
+    
+    def test_store_expires_and_evicts_handles(self):
+        store = ContextStore(ttl=10, max_handles=2)
+        first = store.create("mock", len)
+        second = store.create("mock", len)
+        store.get(first.handle)
+        third = store.create("mock", len)
+        self.assertIsNone(store.get(second.handle))
+        self.assertEqual(len(store), 2)
+        with patch.object(time, "monotonic", return_value=time.monotonic() + 11):
+            self.assertIsNone(store.get(third.handle))
+        self.assertFalse(store.delete(first.handle))
+        self.assertFalse(store.delete("missing"))
+    
+    def test_marketplace_query_context(self):
+        marketplace = ModelMarketplace()
+        self.assertIsNone(marketplace.create_context())
+        marketplace.register_driver("mock", MockPrefixCacheModelDriver)
+        marketplace.set_active_driver("mock")
+        created = marketplace.create_context(deltas=[
+            {"op": "set", "key": "system", "text": "Be brief"}
+        ])
+        handle = created["handle"]
+        result = marketplace.query_context(handle, [{"op": "append", "text": "first"}])
+        self.assertEqual(result["result"], "reply 1")
+        self.assertEqual(result["context"]["messages"], 2)
+        marketplace.query_context(handle, [{"op": "append", "text": "second"}])
+        prompts = marketplace._drivers["mock"].prompts
+        self.assertEqual(prompts[1][0], "Be brief")
+        self.assertEqual(prompts[1][1], "User: first\n\nAssistant: reply 1\n\nUser: second")
+        self.assertEqual(prompts[0][2], prompts[1][2])
+        self.assertTrue(marketplace.configure_driver_limits("mock", token_budget=7))
+        self.assertEqual(marketplace.get_driver_health()["mock"]["token_budget"], 7)
+        result = marketplace.query_context(handle, [{"op": "append", "text": "third"}],
+                                           record_response=False)
+        self.assertEqual(prompts[2][1], "Assistant: reply 2\n\nUser: third")
+        self.assertEqual((result["tokens"], result["dropped"]), (7, 3))
+        self.assertEqual(result["context"]["messages"], 5)
+        with self.assertRaises(ContextOverflowError):
+            marketplace.query_context(handle, [{"op": "append", "text": "a b c d e"}])
+        self.assertEqual(marketplace.get_context(handle)["messages"], 5)
+        self.assertEqual(marketplace.query_context(handle, [{"op": "append", "text": "ok"}])
+                         ["context"]["messages"], 7)
+        self.assertIsNone(marketplace.query_context("missing"))
+        self.assertTrue(marketplace.delete_context(handle))
+        self.assertIsNone(marketplace.get_context(handle))
+    
+    def test_failed_query_context_keeps_context(self):
+        marketplace = ModelMarketplace()
+        marketplace.register_driver("mock", MockModelDriver)
+        handle = marketplace.create_context("mock")["handle"]
+        driver = marketplace._drivers["mock"]
+        driver.query = MagicMock(side_effect=ConnectionError("down"))
+        with self.assertRaises(ConnectionError):
+            marketplace.query_context(handle, [{"op": "append", "text": "hi"}])
+        before = marketplace.get_context(handle)
+        self.assertEqual(before["messages"], 0)
+        driver.query = MagicMock(return_value="hello")
+        result = marketplace.query_context(handle, [{"op": "append", "text": "hi"}])
+        self.assertEqual(result["context"]["messages"], 2)
+        self.assertEqual(driver.query.call_args[0][0], "User: hi")
+        self.assertGreater(result["context"]["version"], before["version"])
+    
+    def test_query_context_keeps_concurrent_changes(self):
+        marketplace = ModelMarketplace()
+        marketplace.register_driver("mock", MockModelDriver)
+        handle = marketplace.create_context("mock")["handle"]
+        context = marketplace._contexts.get(handle)
+        
+        def query(prompt):
+            with context.lock:
+                context.apply([{"op": "set", "key": "system", "text": "Be brief"}])
+            return "hello"
+        
+        marketplace._drivers["mock"].query = query
+        result = marketplace.query_context(handle, [{"op": "append", "text": "hi"}])
+        self.assertEqual(result["context"]["pinned"], {"system": estimate_tokens("Be brief")})
+        self.assertEqual(result["context"]["messages"], 2)
+    
+    def test_default_query_context_sends_complete_prompt(self):
+        marketplace = ModelMarketplace()
+        marketplace.register_driver("mock", MockModelDriver)
+        handle = marketplace.create_context("mock", [
+            {"op": "set", "key": "system", "text": "Be brief"}
+        ])["handle"]
+        result = marketplace.query_context(handle, [{"op": "append", "text": "hi"}])
+        self.assertEqual(result["result"], "Response to Be brief\n\nUser: hi")
+        self.assertEqual(result["tokens"],
+                         estimate_tokens("Be brief") + estimate_tokens("User: hi"))
+
 if __name__ == '__main__':
     unittest.main()
@@ -5,9 +5,29 @@ This file contains unit tests for the Worker Management module, ensuring the fun
 of the QueueToolMarketplace and WorkerDriver classes.
 """
 
+import operator
+import os
+import tempfile
+import threading
+import time
 import unittest
 from unittest.mock import MagicMock
-from zi_coder_agent.worker_management import QueueToolMarketplace, WorkerDriver
+from zi_coder_agent.worker_management import (
+    QueueToolMarketplace, WorkerDriver, LocalWorkerDriver, QueueFullError, register_task,
+    TaskNotifier, LocalResultBackend, ResultHandle, TaskDeduplicator, task_content_hash,
+    WorkflowRunner
+)
+from zi_coder_agent.cache_management import CacheToolMarketplace, InMemoryCacheDriver
+
+def wait_for_status(driver, task_id, statuses=("completed", "failed"), timeout=5):
+    """Poll a driver until a task reaches one of the given statuses."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = driver.get_task_status(task_id)
+        if status and status["status"] in statuses:
+            return status
+        time.sleep(0.005)
+    raise AssertionError(f"Task {task_id} did not finish")
 
 class MockWorkerDriver(WorkerDriver):
     """Mock implementation of WorkerDriver for testing purposes."""
@@ -113,5 +133,624 @@ class TestQueueToolMarketplace(unittest.TestCase):
         result = self.marketplace.get_task_result("task_123")
         self.assertIsNone(result)
 
+    def test_enqueue_task_with_priority(self):
+        """Test that a priority is passed to the active driver when given."""
+        self.marketplace.register_driver("mock", MockWorkerDriver)
+        self.marketplace.set_active_driver("mock")
+        driver = self.marketplace._drivers["mock"]
+        driver.enqueue_task = MagicMock(return_value="task_123")
+        self.marketplace.enqueue_task("test_task", (1,), {}, priority=5)
+        driver.enqueue_task.assert_called_once_with("test_task", (1,), {}, priority=5)
+
+    def test_enqueue_many_fallback(self):
+        """Test that the default enqueue_many calls enqueue_task for each task."""
+        self.marketplace.register_driver("mock", MockWorkerDriver)
+        self.marketplace.set_active_driver("mock")
+        driver = self.marketplace._drivers["mock"]
+        driver.enqueue_task = MagicMock(side_effect=["task_1", "task_2"])
+        task_ids = self.marketplace.enqueue_many([
+            {"task_name": "a", "args": [1]},
+            {"task_name": "b", "kwargs": {"x": 2}, "priority": 3},
+        ])
+        self.assertEqual(task_ids, ["task_1", "task_2"])
+        driver.enqueue_task.assert_any_call("a", (1,), {})
+        driver.enqueue_task.assert_any_call("b", (), {"x": 2}, priority=3)
+    
+    def test_get_status_many_fallback(self):
+        """Test that the default get_status_many skips unknown tasks."""
+        self.marketplace.register_driver("mock", MockWorkerDriver)
+        self.marketplace.set_active_driver("mock")
+        driver = self.marketplace._drivers["mock"]
+        driver.get_task_status = MagicMock(side_effect=lambda task_id: (
+            {"status": "completed"} if task_id == "known" else None
+        ))
+        statuses = self.marketplace.get_status_many(["known", "unknown"])
+        self.assertEqual(statuses, {"known": {"status": "completed"}})
+    
+    def test_bulk_operations_no_active_driver(self):
+        """Test bulk operations with no active driver."""
+        self.assertIsNone(self.marketplace.enqueue_many([{"task_name": "a"}]))
+        self.assertEqual(self.marketplace.get_status_many(["task_1"]), {})
+
+class TestLocalWorkerDriver(unittest.TestCase):
+    """Test suite for LocalWorkerDriver class."""
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.driver = LocalWorkerDriver(mode="thread", max_workers=2, max_queue_size=10)
+        self.driver.register_task("add", operator.add)
+    
+    def tearDown(self):
+        """Stop the driver's workers after each test."""
+        self.driver.disconnect()
+    
+    def test_run_task(self):
+        """Test running a registered task and reading its result."""
+        task_id = self.driver.enqueue_task("add", (2, 3))
+        status = wait_for_status(self.driver, task_id)
+        self.assertEqual(status["status"], "completed")
+        self.assertEqual(status["task_name"], "add")
+        self.assertEqual(self.driver.get_task_result(task_id), 5)
+    
+    def test_failed_task(self):
+        """Test that task exceptions are recorded as failures."""
+        self.driver.register_task("fail", MagicMock(side_effect=RuntimeError("boom")))
+        task_id = self.driver.enqueue_task("fail")
+        status = wait_for_status(self.driver, task_id)
+        self.assertEqual(status["status"], "failed")
+        self.assertEqual(status["error"], "RuntimeError: boom")
+        self.assertIsNone(self.driver.get_task_result(task_id))
+    
+    def test_unknown_task(self):
+        """Test enqueuing a task that is not registered."""
+        with self.assertRaises(ValueError):
+            self.driver.enqueue_task("unknown")
+    
+    def test_global_task_registry(self):
+        """Test that tasks registered globally are available to every driver."""
+        register_task("test_multiply", operator.mul)
+        task_id = self.driver.enqueue_task("test_multiply", (3, 4))
+        wait_for_status(self.driver, task_id)
+        self.assertEqual(self.driver.get_task_result(task_id), 12)
+    
+    def test_unknown_task_status(self):
+        """Test getting the status of an unknown task."""
+        self.assertIsNone(self.driver.get_task_status("missing"))
+    
+    def test_priority_order(self):
+        """Test that higher-priority tasks are started first."""
+        driver = LocalWorkerDriver(mode="thread", max_workers=1, max_queue_size=10)
+        self.addCleanup(driver.disconnect)
+        release = threading.Event()
+        order = []
+        driver.register_task("block", lambda: release.wait(5))
+        driver.register_task("record", order.append)
+        blocker = driver.enqueue_task("block")
+        while driver.get_task_status(blocker)["status"] != "running":
+            time.sleep(0.005)
+        low = driver.enqueue_task("record", ("low",), priority=0)
+        high = driver.enqueue_task("record", ("high",), priority=10)
+        release.set()
+        wait_for_status(driver, low)
+        wait_for_status(driver, high)
+        self.assertEqual(order, ["high", "low"])
+    
+    def test_queue_full_backpressure(self):
+        """Test that enqueuing into a full queue raises QueueFullError."""
+        driver = LocalWorkerDriver(mode="thread", max_workers=1, max_queue_size=1)
+        self.addCleanup(driver.disconnect)
+        release = threading.Event()
+        driver.register_task("block", lambda: release.wait(5))
+        blocker = driver.enqueue_task("block")
+        while driver.get_task_status(blocker)["status"] != "running":
+            time.sleep(0.005)
+        driver.enqueue_task("block")
+        with self.assertRaises(QueueFullError):
+            driver.enqueue_task("block")
+        self.assertEqual(driver.get_queue_depth(), 1)
+        release.set()
+    
+    def test_finished_task_retention(self):
+        """Test that only the most recent finished tasks are retained."""
+        driver = LocalWorkerDriver(mode="thread", max_workers=1, max_finished=2)
+        self.addCleanup(driver.disconnect)
+        driver.register_task("add", operator.add)
+        task_ids = [driver.enqueue_task("add", (i, i)) for i in range(3)]
+        for task_id in task_ids:
+            try:
+                wait_for_status(driver, task_id, timeout=0.5)
+            except AssertionError:
+                pass
+        wait_for_status(driver, task_ids[-1])
+        self.assertIsNone(driver.get_task_status(task_ids[0]))
+        self.assertEqual(driver.get_task_result(task_ids[-1]), 4)
+    
+    def test_process_mode(self):
+        """Test running a task on the process pool."""
+        driver = LocalWorkerDriver(mode="process", max_workers=1)
+        self.addCleanup(driver.disconnect)
+        driver.register_task("pow", pow)
+        task_id = driver.enqueue_task("pow", (2, 10))
+        wait_for_status(driver, task_id, timeout=30)
+        self.assertEqual(driver.get_task_result(task_id), 1024)
+    
+    def test_enqueue_many(self):
+        """Test enqueuing and checking several tasks at once."""
+        task_ids = self.driver.enqueue_many([
+            {"task_name": "add", "args": (i, 1)} for i in range(5)
+        ])
+        self.assertEqual(len(set(task_ids)), 5)
+        for task_id in task_ids:
+            wait_for_status(self.driver, task_id)
+        statuses = self.driver.get_status_many(task_ids + ["missing"])
+        self.assertEqual(set(statuses), set(task_ids))
+        self.assertTrue(all(s["status"] == "completed" for s in statuses.values()))
+        self.assertEqual([self.driver.get_task_result(t) for t in task_ids], [1, 2, 3, 4, 5])
+    
+    def test_enqueue_many_is_all_or_nothing(self):
+        """Test that a batch with an unknown task or too many tasks enqueues nothing."""
+        with self.assertRaises(ValueError):
+            self.driver.enqueue_many([
+                {"task_name": "add", "args": (1, 1)},
+                {"task_name": "unknown"},
+            ])
+        with self.assertRaises(QueueFullError):
+            self.driver.enqueue_many([{"task_name": "add", "args": (1, 1)}] * 11)
+        self.assertEqual(self.driver.get_queue_depth(), 0)
+    
+    def test_invalid_mode(self):
+        """Test creating a driver with an unknown mode."""
+        with self.assertRaises(ValueError):
+            LocalWorkerDriver(mode="fiber")
+
+class TestLocalResultBackend(unittest.TestCase):
+    """Test suite for LocalResultBackend class."""
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.spill_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.spill_dir.cleanup)
+        self.backend = LocalResultBackend(ttl=60, spill_bytes=16, spill_dir=self.spill_dir.name)
+    
+    def test_small_result_in_memory(self):
+        """Test that small results are kept in the cache."""
+        self.backend.store("task_1", {"files": 3})
+        self.backend.store("task_2", "short")
+        self.assertEqual(self.backend.fetch("task_1"), {"files": 3})
+        self.assertEqual(self.backend.fetch("task_2"), "short")
+        self.assertEqual(os.listdir(self.spill_dir.name), [])
+    
+    def test_large_result_spills_to_disk(self):
+        """Test that large text and binary results are stored as files."""
+        self.backend.store("text", "x" * 100)
+        self.backend.store("binary", b"\x00" * 100)
+        text = self.backend.fetch("text")
+        self.assertIsInstance(text, ResultHandle)
+        self.assertEqual(text.size, 100)
+        self.assertEqual(text.read(), "x" * 100)
+        with text.open() as mapped:
+            self.assertEqual(mapped[:3], b"xxx")
+        binary = self.backend.fetch("binary")
+        self.assertEqual(binary.read(), b"\x00" * 100)
+        self.assertEqual(list(binary.iter_chunks(chunk_size=40)),
+                         [b"\x00" * 40, b"\x00" * 40, b"\x00" * 20])
+        self.assertEqual(binary.to_dict(), {"type": "file", "size": 100, "encoding": None})
+    
+    def test_streamed_result(self):
+        """Test that iterator results are written to disk chunk by chunk."""
+        self.backend.store("task_1", (f"line {i}\n" for i in range(3)))
+        handle = self.backend.fetch("task_1")
+        self.assertEqual(handle.read(), "line 0\nline 1\nline 2\n")
+        with self.assertRaises(TypeError):
+            self.backend.store("task_2", iter([1, 2]))
+        self.assertEqual(os.listdir(self.spill_dir.name), ["task_1.result"])
+    
+    def test_failed_stream_removes_partial_file(self):
+        """Test that a stream raising part-way through leaves no partial file behind."""
+        def failing():
+            yield "partial"
+            raise RuntimeError("task failed")
+        with self.assertRaises(RuntimeError):
+            self.backend.store("task_1", failing())
+        self.assertEqual(os.listdir(self.spill_dir.name), [])
+    
+    def test_purge_removes_stale_partial_files(self):
+        """Test that the sweep removes partial files of interrupted writes."""
+        path = os.path.join(self.spill_dir.name, "task_1.result.tmp")
+        with open(path, "wb") as f:
+            f.write(b"partial")
+        os.utime(path, (time.time() - 120, time.time() - 120))
+        self.assertEqual(self.backend.purge_expired(), 1)
+        self.assertEqual(os.listdir(self.spill_dir.name), [])
+    
+    def test_delete(self):
+        """Test that deleting a result removes its file."""
+        self.backend.store("task_1", "x" * 100)
+        self.backend.delete("task_1")
+        self.assertIsNone(self.backend.fetch("task_1"))
+        self.assertEqual(os.listdir(self.spill_dir.name), [])
+    
+    def test_result_ttl(self):
+        """Test that results expire after the TTL."""
+        backend = LocalResultBackend(ttl=0.05, spill_bytes=16, spill_dir=self.spill_dir.name)
+        backend.store("task_1", "short")
+        backend.store("task_2", "x" * 100)
+        time.sleep(0.1)
+        self.assertIsNone(backend.fetch("task_1"))
+        self.assertIsNone(backend.fetch("task_2"))
+        self.assertEqual(backend.purge_expired(), 1)
+        self.assertEqual(os.listdir(self.spill_dir.name), [])
+    
+    def test_shared_cache(self):
+        """Test storing results in a given cache backend."""
+        cache = InMemoryCacheDriver()
+        backend = LocalResultBackend(cache=cache, spill_bytes=16, spill_dir=self.spill_dir.name)
+        backend.store("task_1", [1, 2])
+        self.assertEqual(cache.get("task_result:task_1"), [1, 2])
+    
+    def test_serialized_cache_falls_back_to_memory(self):
+        """Test that results the cache codec cannot encode do not fail their task."""
+        for codec in ("json", "raw"):
+            cache = CacheToolMarketplace()
+            cache.register_driver("memory", InMemoryCacheDriver)
+            cache.set_active_driver("memory")
+            cache.enable_serialization(codec)
+            backend = LocalResultBackend(cache=cache, spill_bytes=16,
+                                         spill_dir=self.spill_dir.name)
+            driver = LocalWorkerDriver(mode="thread", max_workers=1, result_backend=backend)
+            self.addCleanup(driver.disconnect)
+            driver.register_task("tags", lambda: {"a", "b"})
+            driver.register_task("patch", lambda: iter(["+"] * 100))
+            tags, patch = driver.enqueue_task("tags"), driver.enqueue_task("patch")
+            self.assertEqual(wait_for_status(driver, tags)["status"], "completed")
+            self.assertEqual(wait_for_status(driver, patch)["status"], "completed")
+            self.assertEqual(driver.get_task_result(tags), {"a", "b"})
+            self.assertEqual(driver.get_task_result(patch).read(), "+" * 100)
+            backend.delete(tags)
+            self.assertIsNone(backend.fetch(tags))
+    
+    def test_driver_uses_result_backend(self):
+        """Test that the local driver stores results in its result backend."""
+        driver = LocalWorkerDriver(mode="thread", max_workers=1, result_backend=self.backend)
+        self.addCleanup(driver.disconnect)
+        driver.register_task("patch", lambda: "+" * 100)
+        task_id = driver.enqueue_task("patch")
+        wait_for_status(driver, task_id)
+        self.assertEqual(driver.get_task_result(task_id).read(), "+" * 100)
+
+class TestTaskDeduplication(unittest.TestCase):
+    """Test suite for task deduplication and idempotency keys."""
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.marketplace = QueueToolMarketplace()
+        self.marketplace.register_driver("mock", MockWorkerDriver)
+        self.marketplace.set_active_driver("mock")
+        self.driver = self.marketplace._drivers["mock"]
+        self.statuses = {}
+        self.driver.enqueue_task = MagicMock(side_effect=[f"task_{i}" for i in range(10)])
+        self.driver.get_task_status = \
+            lambda task_id: self.statuses.get(task_id, {"status": "pending"})
+    
+    def test_content_hash(self):
+        """Test that the content hash ignores keyword argument order."""
+        self.assertEqual(task_content_hash("t", (1,), {"a": 1, "b": 2}),
+                         task_content_hash("t", [1], {"b": 2, "a": 1}))
+        self.assertNotEqual(task_content_hash("t", (1,)), task_content_hash("t", (2,)))
+    
+    def test_deduplicate_pending_task(self):
+        """Test that identical submissions reuse a pending task."""
+        first = self.marketplace.enqueue_task("analyze", ("a.py",), deduplicate=True)
+        second = self.marketplace.enqueue_task("analyze", ("a.py",), deduplicate=True)
+        third = self.marketplace.enqueue_task("analyze", ("b.py",), deduplicate=True)
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, third)
+        self.assertEqual(self.driver.enqueue_task.call_count, 2)
+    
+    def test_without_deduplication(self):
+        """Test that submissions are not deduplicated by default."""
+        first = self.marketplace.enqueue_task("analyze", ("a.py",))
+        second = self.marketplace.enqueue_task("analyze", ("a.py",))
+        self.assertNotEqual(first, second)
+    
+    def test_idempotency_key(self):
+        """Test that submissions with the same idempotency key reuse a task."""
+        first = self.marketplace.enqueue_task("analyze", ("a.py",), idempotency_key="req-1")
+        second = self.marketplace.enqueue_task("analyze", ("b.py",), idempotency_key="req-1")
+        self.assertEqual(first, second)
+    
+    def test_completed_task_window(self):
+        """Test that completed tasks are reused only within the window."""
+        self.marketplace._deduplicator = TaskDeduplicator(window=0.05)
+        first = self.marketplace.enqueue_task("analyze", deduplicate=True)
+        self.statuses[first] = {"status": "completed", "finished_at": time.time()}
+        self.assertEqual(self.marketplace.enqueue_task("analyze", deduplicate=True), first)
+        time.sleep(0.1)
+        self.assertNotEqual(self.marketplace.enqueue_task("analyze", deduplicate=True), first)
+    
+    def test_failed_and_unknown_tasks_rerun(self):
+        """Test that failed and forgotten tasks are enqueued again."""
+        first = self.marketplace.enqueue_task("analyze", deduplicate=True)
+        self.statuses[first] = {"status": "failed"}
+        second = self.marketplace.enqueue_task("analyze", deduplicate=True)
+        self.assertNotEqual(first, second)
+        self.driver.get_task_status = lambda task_id: None
+        self.assertNotEqual(self.marketplace.enqueue_task("analyze", deduplicate=True), second)
+    
+    def test_enqueue_many_deduplicates(self):
+        """Test that bulk tasks honour idempotency keys and deduplication."""
+        first = self.marketplace.enqueue_task("report", idempotency_key="req-1")
+        task_ids = self.marketplace.enqueue_many([
+            {"task_name": "analyze", "args": ["a.py"], "deduplicate": True},
+            {"task_name": "lint"},
+            {"task_name": "analyze", "args": ["a.py"], "deduplicate": True},
+            {"task_name": "report", "idempotency_key": "req-1"},
+        ])
+        self.assertEqual(task_ids[0], task_ids[2])
+        self.assertEqual(task_ids[3], first)
+        self.assertEqual(len(set(task_ids)), 3)
+        self.assertEqual(self.driver.enqueue_task.call_count, 3)
+    
+    def test_concurrent_submissions(self):
+        """Test that concurrent identical submissions enqueue one task."""
+        release = threading.Event()
+        
+        def slow_enqueue(*args, **kwargs):
+            release.wait(5)
+            return "task_slow"
+        
+        self.driver.enqueue_task = MagicMock(side_effect=slow_enqueue)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                self.marketplace.enqueue_task("analyze", deduplicate=True)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ["task_slow"] * 5)
+        self.assertEqual(self.driver.enqueue_task.call_count, 1)
+
+def wait_for_workflow(marketplace, workflow_id, timeout=5):
+    """Poll a marketplace until a workflow finishes."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = marketplace.get_workflow_status(workflow_id)
+        if status["finished_at"] is not None:
+            return status
+        time.sleep(0.005)
+    raise AssertionError(f"Workflow {workflow_id} did not finish")
+
+class TestWorkflows(unittest.TestCase):
+    """Test suite for workflows of dependent tasks."""
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.marketplace = QueueToolMarketplace()
+        self.marketplace.register_driver("local", lambda: LocalWorkerDriver(max_workers=4))
+        self.marketplace.set_active_driver("local")
+        self.driver = self.marketplace._drivers["local"]
+        self.addCleanup(self.driver.disconnect)
+        self.driver.register_task("fetch", lambda name: f"<{name}>")
+        self.driver.register_task("concat", lambda left, right: left + right)
+        self.driver.register_task("fail", MagicMock(side_effect=RuntimeError("boom")))
+    
+    def test_results_passed_along_edges(self):
+        """Test a diamond workflow passing results between steps."""
+        workflow_id = self.marketplace.submit_workflow({
+            "a": {"task_name": "fetch", "args": ["a"]},
+            "b": {"task_name": "fetch", "args": ["b"]},
+            "join": {"task_name": "concat", "inputs": {"left": "a", "right": "b"}},
+        })
+        status = wait_for_workflow(self.marketplace, workflow_id)
+        self.assertEqual(status["status"], "completed")
+        self.assertEqual(set(status["steps"]), {"a", "b", "join"})
+        results = self.marketplace.get_workflow_results(workflow_id)
+        self.assertEqual(results, {"a": "<a>", "b": "<b>", "join": "<a><b>"})
+    
+    def test_independent_branches_run_concurrently(self):
+        """Test that steps without dependencies between them run at the same time."""
+        barrier = threading.Barrier(2, timeout=5)
+        self.driver.register_task("meet", lambda: barrier.wait() is not None)
+        workflow_id = self.marketplace.submit_workflow({
+            "left": {"task_name": "meet"},
+            "right": {"task_name": "meet"},
+        })
+        self.assertEqual(wait_for_workflow(self.marketplace, workflow_id)["status"], "completed")
+    
+    def test_failed_step_skips_dependents(self):
+        """Test that steps depending on a failed step are skipped."""
+        workflow_id = self.marketplace.submit_workflow({
+            "broken": {"task_name": "fail"},
+            "after": {"task_name": "fetch", "args": ["x"], "depends_on": ["broken"]},
+            "last": {"task_name": "fetch", "args": ["y"], "depends_on": ["after"]},
+            "other": {"task_name": "fetch", "args": ["z"]},
+        })
+        status = wait_for_workflow(self.marketplace, workflow_id)
+        self.assertEqual(status["status"], "failed")
+        self.assertEqual(status["steps"]["broken"]["status"], "failed")
+        self.assertEqual(status["steps"]["after"]["status"], "skipped")
+        self.assertEqual(status["steps"]["last"]["status"], "skipped")
+        self.assertEqual(status["steps"]["other"]["status"], "completed")
+    
+    def test_unknown_task_fails_step(self):
+        """Test that a step whose task cannot be enqueued fails."""
+        workflow_id = self.marketplace.submit_workflow({"bad": {"task_name": "unknown"}})
+        status = wait_for_workflow(self.marketplace, workflow_id)
+        self.assertEqual(status["status"], "failed")
+        self.assertIn("Unknown task", status["steps"]["bad"]["error"])
+    
+    def test_invalid_workflows(self):
+        """Test that invalid workflows are rejected."""
+        with self.assertRaises(ValueError):
+            self.marketplace.submit_workflow({})
+        with self.assertRaises(ValueError):
+            self.marketplace.submit_workflow({"a": {"args": [1]}})
+        with self.assertRaises(ValueError):
+            self.marketplace.submit_workflow({
+                "a": {"task_name": "fetch", "depends_on": ["missing"]}
+            })
+        with self.assertRaises(ValueError):
+            self.marketplace.submit_workflow({
+                "a": {"task_name": "fetch", "depends_on": ["b"]},
+                "b": {"task_name": "fetch", "depends_on": ["a"]},
+            })
+        for step in ({"task_name": "fetch", "depends_on": "ab"},
+                     {"task_name": "fetch", "depends_on": [["a"]]},
+                     {"task_name": "fetch", "inputs": {"value": {"step": "a"}}},
+                     {"task_name": "fetch", "args": 5},
+                     {"task_name": "fetch", "kwargs": ["x"]},
+                     {"task_name": "fetch", "priority": "high"},
+                     {"task_name": "fetch", "priority": True}):
+            with self.assertRaises(ValueError):
+                self.marketplace.submit_workflow({"a": {"task_name": "fetch"}, "b": step})
+    
+    def test_full_queue_defers_steps(self):
+        """Test that steps finding the queue full are retried off the worker threads."""
+        marketplace = MagicMock()
+        threads = []
+        
+        def enqueue(task_name, args, kwargs, priority=None):
+            threads.append(threading.current_thread().name)
+            if len(threads) == 1:
+                raise QueueFullError("Queue is full")
+            return f"task_{len(threads)}"
+        
+        marketplace.enqueue_task.side_effect = enqueue
+        runner = WorkflowRunner(marketplace, retry_interval=0.01)
+        workflow_id = runner.submit({
+            "a": {"task_name": "fetch"},
+            "b": {"task_name": "fetch", "depends_on": ["a"]},
+        })
+        self.assertEqual(runner.get_status(workflow_id)["steps"]["a"]["status"], "pending")
+        deadline = time.monotonic() + 5
+        while not marketplace.subscribe.called and time.monotonic() < deadline:
+            time.sleep(0.005)
+        task_id, callback = marketplace.subscribe.call_args[0]
+        self.assertEqual(task_id, "task_2")
+        callback(task_id, {"status": "completed"})
+        while marketplace.subscribe.call_count < 2 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self.assertEqual(runner.get_status(workflow_id)["steps"]["b"]["task_id"], "task_3")
+        self.assertTrue(threads[2].startswith("workflow"))
+    
+    def test_no_active_driver(self):
+        """Test workflows with no active driver."""
+        marketplace = QueueToolMarketplace()
+        self.assertIsNone(marketplace.submit_workflow({"a": {"task_name": "fetch"}}))
+        self.assertIsNone(marketplace.get_workflow_status("missing"))
+        self.assertIsNone(marketplace.get_workflow_results("missing"))
+
+class TestTaskNotifications(unittest.TestCase):
+    """Test suite for task status subscriptions."""
+    
+    def test_push_notifications(self):
+        """Test that a driver reporting status changes notifies subscribers directly."""
+        marketplace = QueueToolMarketplace()
+        marketplace.register_driver("local", LocalWorkerDriver)
+        marketplace.set_active_driver("local")
+        driver = marketplace._drivers["local"]
+        self.addCleanup(driver.disconnect)
+        release = threading.Event()
+        driver.register_task("block", lambda: release.wait(5) and "done")
+        task_id = marketplace.enqueue_task("block")
+        updates = []
+        finished = threading.Event()
+        
+        def callback(_, status):
+            updates.append(status["status"])
+            if status["status"] == "completed":
+                finished.set()
+        
+        marketplace.subscribe(task_id, callback)
+        future = marketplace.get_task_future(task_id)
+        release.set()
+        self.assertEqual(future.result(timeout=5)["status"], "completed")
+        self.assertTrue(finished.wait(5))
+        self.assertEqual(updates[-1], "completed")
+        self.assertFalse(marketplace._get_notifier()._poller)
+    
+    def test_notifier_created_once(self):
+        """Test that concurrent first subscriptions share one notifier."""
+        marketplace = QueueToolMarketplace()
+        marketplace.register_driver("mock", MockWorkerDriver)
+        marketplace.set_active_driver("mock")
+        barrier = threading.Barrier(8, timeout=5)
+        notifiers = []
+        
+        def get():
+            barrier.wait()
+            notifiers.append(marketplace._get_notifier())
+        
+        threads = [threading.Thread(target=get) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(notifier) for notifier in notifiers}), 1)
+    
+    def test_switching_driver_keeps_subscriptions(self):
+        """Test that subscriptions on a previously active driver still fire."""
+        marketplace = QueueToolMarketplace()
+        marketplace.register_driver("first", LocalWorkerDriver)
+        marketplace.register_driver("second", LocalWorkerDriver)
+        for driver in marketplace._drivers.values():
+            self.addCleanup(driver.disconnect)
+        marketplace.set_active_driver("first")
+        release = threading.Event()
+        marketplace._drivers["first"].register_task("block", lambda: release.wait(5))
+        future = marketplace.get_task_future(marketplace.enqueue_task("block"))
+        marketplace.set_active_driver("second")
+        marketplace.get_task_future("unknown").cancel()
+        release.set()
+        self.assertEqual(future.result(timeout=5)["status"], "completed")
+        marketplace.get_task_future("unknown").cancel()
+        self.assertEqual(len(marketplace._notifiers), 1)
+    
+    def test_subscribe_finished_task(self):
+        """Test that subscribing to a finished task calls back immediately."""
+        driver = MockWorkerDriver()
+        notifier = TaskNotifier(driver, poll_interval=0.01)
+        self.addCleanup(notifier.close)
+        callback = MagicMock()
+        notifier.subscribe("task_1", callback)
+        callback.assert_called_once_with("task_1", {"status": "completed", "task_id": "task_1"})
+        self.assertTrue(notifier.future("task_1").done())
+    
+    def test_polling_notifications(self):
+        """Test that status changes are detected by polling for other drivers."""
+        driver = MockWorkerDriver()
+        statuses = {"task_1": {"status": "pending"}}
+        driver.get_task_status = lambda task_id: statuses.get(task_id)
+        driver.get_status_many = MagicMock(side_effect=lambda task_ids: dict(statuses))
+        notifier = TaskNotifier(driver, poll_interval=0.01)
+        self.addCleanup(notifier.close)
+        future = notifier.future("task_1")
+        self.assertFalse(future.done())
+        statuses["task_1"] = {"status": "completed"}
+        self.assertEqual(future.result(timeout=5), {"status": "completed"})
+        driver.get_status_many.assert_called_with(["task_1"])
+    
+    def test_cancelled_future_unsubscribes(self):
+        """Test that cancelling a task future ends its subscription."""
+        driver = MockWorkerDriver()
+        driver.get_task_status = MagicMock(return_value={"status": "running"})
+        notifier = TaskNotifier(driver, poll_interval=60)
+        self.addCleanup(notifier.close)
+        future = notifier.future("task_1")
+        self.assertIn("task_1", notifier._subscribers)
+        future.cancel()
+        self.assertNotIn("task_1", notifier._subscribers)
+    
+    def test_no_active_driver(self):
+        """Test subscriptions with no active driver."""
+        marketplace = QueueToolMarketplace()
+        self.assertIsNone(marketplace.subscribe("task_1", MagicMock()))
+        self.assertIsNone(marketplace.get_task_future("task_1"))
+
 if __name__ == '__main__':
     unittest.main()